@@ -1,18 +1,27 @@
 # backend/agent/assistant.py
 import asyncio
 import json
-import aiohttp
+import time
 import logging
 from livekit import api, rtc
 from livekit.agents import llm
 from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
-from livekit.agents.stt import SpeechEventType
 
 from core.config import settings
 from core.exceptions import LiveKitConnectionError
-from integrations.aliyun.stt import AliyunSTT
-from integrations.aliyun.llm import create_llm
-from integrations.aliyun.tts import create_tts
+from core.utils import PhaseTimer
+from agent.filler import FillerScheduler, PlaybackTracker, ToolLatencyTracker
+from agent.profiles import ProfileRegistry, profile_registry
+from agent.recorder import Recorder
+from agent.runtime import AgentRuntime, agent_runtime
+from agent.session import ParticipantSession, SessionRegistry
+from agent.stream_parser import StreamParser
+from audio.preprocess import AudioPreprocessor
+from integrations.database import ConversationTurn, create_conversation_store
+from integrations.http_client import http_clients
+from integrations.language import LANGUAGE_NAMES, base_language
+from integrations.aliyun.resilience import default_retry, get_breaker, hedged_stream, retry_first_item
+from integrations.aliyun.tts import prewarm_tts
 from integrations.tools.manager import tool_manager
 
 logger = logging.getLogger(__name__)
@@ -21,53 +30,184 @@ logger = logging.getLogger(__name__)
 class AIAssistant:
     """AI 语音助手"""
 
-    def __init__(self):
+    def __init__(self, startup: PhaseTimer = None, room_name: str = None, leave_when_empty: bool = False,
+                 profiles: ProfileRegistry = None, runtime: AgentRuntime = None):
+        self.room_name = room_name or settings.ROOM_NAME
+        # 按房间名选择 Agent 配置 (提示词 / STT / LLM / TTS / 工具)
+        self.profiles = profiles or profile_registry
+        self.profile = self.profiles.for_room(self.room_name)
+        # 由调度器分配房间时，最后一个用户离开后退出
+        self.leave_when_empty = leave_when_empty
         self.room = None
         self.audio_source = None
         self.http_session = None
         self.stt = None
         self.llm = None
         self.tts = None
+        self.tts_breaker = None
+        # LLM/TTS 请求在首个结果之前失败时的重试策略
+        self.retry = default_retry()
+        self.filler = None
+        self.reask = None
+        # 所有参与者共用一个音源: 登记正在进行的播放，打断填充时不清掉别人的音频
+        self.playbacks = PlaybackTracker()
+        self.preprocessor = None
+        self.conversations = None
+        # 进程级资源 (指标/监控/工具执行器)，由进程入口启动和关闭，这里只登记房间
+        self.runtime = runtime or agent_runtime
+        # 问题录制 (RECORDING_ENABLED 时创建)
+        self.recorder = None
+        # 参与者音频流 (重放时替换为按录制时间产出的音频流)
+        self.audio_stream_factory = rtc.AudioStream
+        self.sessions = SessionRegistry()
+        self._reattaching: set = set()
         self.tool_manager = tool_manager
+        self._tool_ctx = None
+        self.startup = startup or PhaseTimer()
+        self._done = asyncio.Event()
 
     async def initialize(self):
-        """初始化组件"""
+        """初始化组件 (只构造本地对象，网络连接在 _prewarm / connect_to_room 中并行建立)"""
         logger.info("初始化 AI 组件...")
+        with self.startup.phase("components"):
+            self._create_components()
+        logger.info("✅ AI 组件初始化完成")
+
+    def _create_components(self):
+        # 共享连接池: 同一进程内的多个助手 (worker) 复用连接，由进程退出时统一关闭
+        self.http_session = http_clients.session
+
+        self.runtime.add_room(self.room_name, self._room_stats)
 
-        self.http_session = aiohttp.ClientSession()
+        # 客户端按配置缓存，同一进程内相同配置的房间共享
+        clients = self.profiles.clients(self.profile, self.http_session)
+        self.stt = clients.stt
+        self.llm = clients.llm
+        self.tts = clients.tts
+        logger.info(f"📋 房间 {self.room_name} 使用配置: {self.profile.name}")
+        self.tts_breaker = get_breaker("aliyun-tts")
 
-        self.stt = AliyunSTT(
-            api_key=settings.DASHSCOPE_API_KEY,
-            model='paraformer-realtime-v2',
-            language='zh-CN'
+        self.preprocessor = AudioPreprocessor(
+            output_rate=16000,
+            tick_ms=settings.AUDIO_PREPROCESS_TICK_MS,
+            max_workers=settings.AUDIO_PREPROCESS_WORKERS
+        )
+        self.preprocessor.start()
+
+        if settings.CONVERSATION_STORE_ENABLED:
+            self.conversations = create_conversation_store()
+            self.conversations.start()
+
+        if settings.RECORDING_ENABLED:
+            self.recorder = Recorder.create(self.room_name, settings.RECORDING_DIR, meta={"profile": self.profile.name})
+
+        if settings.FILLER_ENABLED:
+            self.filler = FillerScheduler(
+                self.tts,
+                text=settings.FILLER_TEXT,
+                threshold=settings.FILLER_LATENCY_THRESHOLD,
+                tracker=ToolLatencyTracker(default_latency=settings.FILLER_DEFAULT_LATENCY),
+                playbacks=self.playbacks
+            )
+            # 没有实测数据时使用工具声明的预计耗时
+            for spec in self.tool_manager.tools.values():
+                self.filler.tracker.set_prior(spec.name, spec.expected_latency)
+
+        if settings.STT_REASK_CONFIDENCE > 0:
+            # 低置信度重问语音预渲染，播放时不经过 LLM/TTS
+            self.reask = FillerScheduler(self.tts, text=settings.STT_REASK_TEXT, playbacks=self.playbacks)
+
+    def _room_stats(self) -> dict:
+        """房间统计 (/debug/loop 的 rooms 下)"""
+        return {
+            "profile": self.profile.name,
+            "sessions": len(self.sessions),
+            "startup": self.startup.report(),
+        }
+
+    async def _prewarm(self):
+        """房间连接期间预热 STT/TTS 连接 (失败不影响启动)"""
+        await asyncio.gather(
+            self.startup.timed("stt_prewarm", self.stt.warm()),
+            self.startup.timed("tts_prewarm", prewarm_tts(self.tts)),
         )
 
-        self.llm = create_llm()
-        self.tts = create_tts(self.http_session)
+    async def _prepare_filler(self, filler: FillerScheduler):
+        """后台预渲染填充音频 (失败不影响主流程)"""
+        try:
+            await filler.prepare()
+        except Exception as e:
+            logger.warning(f"⚠️ 填充音频预渲染失败: {e}")
 
-        logger.info("✅ AI 组件初始化完成")
+    async def _reask(self):
+        """请用户重复 (优先播放预渲染的语音，未就绪时实时合成)"""
+        if self.reask.ready:
+            await self.reask.play(self.audio_source).wait()
+            return
+        tts_stream = self.tts.stream()
+        try:
+            tts_stream.push_text(self.reask.text)
+            tts_stream.flush()
+            tts_stream.end_input()
+            with self.playbacks.playing("", self.audio_source):
+                async for audio_chunk in self._guard_tts(tts_stream, self.reask.text):
+                    await self.audio_source.capture_frame(getattr(audio_chunk, "frame", audio_chunk))
+        finally:
+            await tts_stream.aclose()
+
+    def _record_turn(self, turn: ConversationTurn):
+        """写入对话存储 (非阻塞)"""
+        if self.conversations is not None and turn.participant:
+            self.conversations.record(turn)
 
-    async def _execute_tool(self, function_name: str, arguments: dict) -> str:
+    async def _execute_tool(self, function_name: str, arguments: dict,
+                            participant: str = "", call_id: str = "") -> str:
         """执行工具调用"""
+        started = time.perf_counter()
+        result = ""
         try:
             logger.info(f"🔧 执行工具: {function_name}({arguments})")
             result = await self.tool_manager.execute_tool(function_name, arguments)
             logger.info(f"✅ 工具结果: {result}")
             return result
         except Exception as e:
-            error_msg = f"工具执行失败: {str(e)}"
+            result = error_msg = f"工具执行失败: {str(e)}"
             logger.error(f"❌ {error_msg}", exc_info=True)
             return error_msg
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.filler:
+                self.filler.record(function_name, elapsed)
+            if self.recorder:
+                self.recorder.tool_result(participant, function_name, call_id, str(result), round(elapsed * 1000, 1))
+            self._record_turn(ConversationTurn(
+                participant, "tool_result", str(result),
+                name=function_name, call_id=call_id, latency_ms=round(elapsed * 1000, 1)
+            ))
+
+    def _is_idempotent(self, function_name: str) -> bool:
+        spec = self.tool_manager.get_spec(function_name)
+        return spec is not None and spec.idempotent
+
+    def _get_tool_ctx(self):
+        """当前配置的工具上下文 (第一次使用时创建)"""
+        if self._tool_ctx is None:
+            from livekit.agents.llm import ToolContext
+            tools = self._create_tool_functions()
+            self._tool_ctx = ToolContext(tools) if tools else False
+        return self._tool_ctx or None
 
     def _create_tool_functions(self):
         """创建工具函数列表"""
         from livekit.agents.llm import function_tool
 
         tools = []
-        for tool_name, tool_config in self.tool_manager.tools.items():
+        for tool_name, spec in self.tool_manager.tools.items():
+            if not self.profile.allows_tool(tool_name):
+                continue
             # 提取工具描述和参数
-            description = tool_config.get('description', f'工具: {tool_name}')
-            parameters = tool_config.get('parameters', {})
+            description = spec.description
+            parameters = spec.parameters
 
             # ✅ 使用闭包捕获正确的变量
             def make_tool_func(name: str):
@@ -101,10 +241,92 @@ class AIAssistant:
 
         return tools
 
-    async def process_llm_response(self, chat_context: ChatContext):
-        """处理 LLM 响应并播放 (支持工具调用)"""
-        tts_stream = self.tts.stream()
+    def _system_prompt(self, language: str = None) -> str:
+        """配置的系统提示；判定的语言与配置语言不同时要求用该语言回答"""
+        prompt = self.profile.system_prompt
+        if language and base_language(language) != base_language(self.profile.language):
+            prompt += f"\n请使用{LANGUAGE_NAMES.get(base_language(language), language)}回答。"
+        return prompt
+
+    def _tts_for(self, language: str = None):
+        """按判定的语言选择 TTS 音色"""
+        if not language:
+            return self.tts
+        return self.profiles.tts_for(self.profile, language, self.http_session)
+
+    async def _guard_tts(self, tts_stream, text: str, tts=None):
+        """
+        TTS 首帧截止时间 + 熔断 + 重试，首帧过慢时用同样的文本再合成一次 (对冲)
+
+        首帧之前失败时按重试策略用同样的文本重新合成；调用方负责关闭 tts_stream。
+        """
+        tts = tts or self.tts
+
+        def new_stream():
+            stream = tts.stream()
+            stream.push_text(text)
+            stream.flush()
+            stream.end_input()
+            return stream
+
+        hedge_after = settings.TTS_HEDGE_AFTER_MS / 1000 if settings.TTS_HEDGE_AFTER_MS > 0 else None
+        primaries = []
+
+        def attempt():
+            # 第一次使用调用方的流，重试时重新合成
+            primary = new_stream() if primaries else tts_stream
+            primaries.append(primary)
+            return hedged_stream(
+                primary,
+                new_stream if hedge_after else None,
+                breaker=self.tts_breaker,
+                hedge_after=hedge_after,
+                first_item_timeout=settings.TTS_FIRST_FRAME_TIMEOUT or None
+            )
+
+        try:
+            async for audio_chunk in retry_first_item(attempt, name=self.tts_breaker.name, retry=self.retry):
+                yield audio_chunk
+        finally:
+            for stream in primaries[1:]:
+                await stream.aclose()
+
+    async def _send_text(self, text: str, participant: str = ""):
+        """TTS 不可用时把回答以文字消息发给用户 (不静默丢弃)"""
+        if self.room is None or not text:
+            return
+        try:
+            await self.room.local_participant.send_text(
+                text,
+                destination_identities=[participant] if participant else None,
+                topic="lk.chat"
+            )
+            logger.info(f"💬 已改为发送文字回答: {participant or '所有人'}")
+        except Exception as e:
+            logger.warning(f"⚠️ 发送文字回答失败: {e}")
+
+    async def _play(self, audio_chunk, participant: str = ""):
+        """播放一帧 TTS 音频 (开启录制时同时写入录制)"""
+        frame = getattr(audio_chunk, "frame", audio_chunk)
+        if self.recorder:
+            self.recorder.audio_out(participant, frame)
+        await self.audio_source.capture_frame(frame)
+
+    async def process_llm_response(self, chat_context: ChatContext, filler=None, participant: str = "",
+                                   language: str = None):
+        """处理 LLM 响应并播放 (支持工具调用)
+
+        Args:
+            chat_context: 对话上下文
+            filler: 正在播放的填充音频，真实回答开始播放前打断
+            participant: 参与者 identity (用于对话存储)
+            language: STT 判定的用户语言 (选择回复语言和 TTS 音色)
+        """
+        tts = self._tts_for(language)
+        tts_stream = tts.stream()
         full_response = ""
+        started = time.perf_counter()
+        first_token_ms = None
 
         try:
             # 添加系统提示 (只添加一次)
@@ -112,91 +334,54 @@ class AIAssistant:
             has_system_message = any(msg.role == "system" for msg in messages)
 
             if not has_system_message:
-                chat_context.add_message(
-                    role="system",
-                    content=(
-                        "你是一个智能语音助手。"
-                        "当用户询问天气时，使用 get_weather 工具获取实时信息。"
-                        "用简洁友好的语气回答，直接说出温度和天气状况，不要说'根据查询结果'之类的话。"
-                    )
-                )
+                chat_context.add_message(role="system", content=self._system_prompt(language))
 
-            # 创建工具上下文
-            from livekit.agents.llm import ToolContext
-            tools = self._create_tool_functions()
-            tool_ctx = ToolContext(tools) if tools else None
+            tool_ctx = self._get_tool_ctx()
+            tools = list(tool_ctx.function_tools.values()) if tool_ctx else []
 
-            # ✅ 调用 LLM (兼容阿里云插件)
-            try:
-                # 方式 1: 使用 tool_ctx (标准方式)
-                llm_stream = self.llm.chat(
-                    chat_ctx=chat_context,
-                    tool_ctx=tool_ctx
-                )
-                logger.debug("✅ 使用 tool_ctx 模式")
+            # ✅ 调用 LLM (livekit LLM.chat 通过 tools 传入工具)
+            def request():
+                return self.llm.chat(chat_ctx=chat_context, tools=tools)
+
+            # 首个 token 之前失败时按重试策略重新请求
+            llm_stream = retry_first_item(request, name="llm", retry=self.retry)
 
-            except TypeError as e:
-                # 方式 2: 不使用工具 (降级)
-                logger.warning(f"⚠️ LLM 不支持 tool_ctx，降级到普通模式: {e}")
-                llm_stream = self.llm.chat(chat_ctx=chat_context)
+            if self.recorder:
+                self.recorder.llm_start(participant, len(chat_context.items))
 
-            # 处理流式响应
-            pending_tool_calls = []
+            # 处理流式响应 (格式每个流只判断一次)
+            parser = StreamParser()
 
             async for chunk in llm_stream:
-                # ✅ 检查 LiveKit 原生的工具调用格式
-                if isinstance(chunk, FunctionCall):
-                    logger.info(f"🔧 检测到工具调用: {chunk.name}")
-                    pending_tool_calls.append(chunk)
-                    continue
-
-                # ✅ 检查 OpenAI 风格的工具调用
-                if hasattr(chunk, 'choices') and chunk.choices:
-                    choice = chunk.choices[0]
-
-                    # 工具调用请求
-                    if hasattr(choice, 'message') and hasattr(choice.message,
-                                                              'tool_calls') and choice.message.tool_calls:
-                        for tool_call in choice.message.tool_calls:
-                            pending_tool_calls.append(tool_call)
-                        continue
-
-                    # 文本内容
-                    if hasattr(choice, 'delta') and choice.delta and choice.delta.content:
-                        content = choice.delta.content
-                        tts_stream.push_text(content)
-                        full_response += content
-
-                # ✅ 直接的 delta 格式
-                elif hasattr(chunk, 'delta') and chunk.delta and hasattr(chunk.delta,
-                                                                         'content') and chunk.delta.content:
-                    content = chunk.delta.content
+                content = parser.feed(chunk)
+                if content:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+                    if self.recorder:
+                        self.recorder.llm_chunk(participant, content)
                     tts_stream.push_text(content)
-                    full_response += content
 
-                # ✅ 简单的 content 格式
-                elif hasattr(chunk, 'content') and chunk.content:
-                    content = chunk.content
-                    tts_stream.push_text(content)
-                    full_response += content
+            full_response = parser.text
+            pending_tool_calls = parser.tool_calls
+            if self.recorder:
+                for tool_call in pending_tool_calls:
+                    self.recorder.tool_call(participant, tool_call.name, tool_call.arguments, tool_call.call_id)
+                self.recorder.llm_end(participant, full_response)
 
             # ✅ 执行待处理的工具调用
             if pending_tool_calls:
                 logger.info(f"📋 处理 {len(pending_tool_calls)} 个工具调用")
 
+                # 预计耗时较长时先播放填充语音
+                if self.filler and filler is None:
+                    tool_names = [call.name for call in pending_tool_calls]
+                    filler = self.filler.start(tool_names, self.audio_source, participant)
+
+                calls = []
                 for tool_call in pending_tool_calls:
-                    # 兼容多种格式
-                    if isinstance(tool_call, FunctionCall):
-                        # LiveKit 原生格式
-                        function_name = tool_call.name
-                        arguments = json.loads(tool_call.arguments) if isinstance(tool_call.arguments,
-                                                                                  str) else tool_call.arguments
-                        call_id = tool_call.call_id
-                    else:
-                        # OpenAI 格式
-                        function_name = tool_call.function.name
-                        arguments = json.loads(tool_call.function.arguments)
-                        call_id = tool_call.id
+                    function_name = tool_call.name
+                    arguments = json.loads(tool_call.arguments)
+                    call_id = tool_call.call_id
 
                     logger.info(f"🔧 执行: {function_name}({arguments})")
 
@@ -207,11 +392,25 @@ class AIAssistant:
                         arguments=json.dumps(arguments, ensure_ascii=False)
                     )
                     chat_context.items.append(func_call)
-
-                    # 执行工具
-                    tool_result = await self._execute_tool(function_name, arguments)
-
-                    # 添加函数输出到上下文
+                    calls.append((call_id, function_name, arguments))
+                    self._record_turn(ConversationTurn(
+                        participant, "tool_call", func_call.arguments, name=function_name, call_id=call_id
+                    ))
+
+                # 执行工具: 全部是幂等工具时并行执行，否则按顺序执行
+                if len(calls) > 1 and all(self._is_idempotent(name) for _, name, _ in calls):
+                    results = await asyncio.gather(*(
+                        self._execute_tool(name, arguments, participant, call_id)
+                        for call_id, name, arguments in calls
+                    ))
+                else:
+                    results = [
+                        await self._execute_tool(name, arguments, participant, call_id)
+                        for call_id, name, arguments in calls
+                    ]
+
+                # 添加函数输出到上下文
+                for (call_id, function_name, _), tool_result in zip(calls, results):
                     func_output = FunctionCallOutput(
                         call_id=call_id,
                         name=function_name,
@@ -222,42 +421,71 @@ class AIAssistant:
 
                 # ✅ 递归调用，让 AI 根据工具结果生成自然语言回答
                 logger.info("🔄 根据工具结果生成回答...")
-                await self.process_llm_response(chat_context)
+                await tts_stream.aclose()
+                await self.process_llm_response(chat_context, filler=filler, participant=participant,
+                                                language=language)
                 return
 
             # 保存并播放助手回复
             if full_response:
                 tts_stream.flush()
+                # 结束输入: 合成流在最后一帧之后才会结束
+                tts_stream.end_input()
                 chat_context.add_message(
                     role="assistant",
                     content=full_response
                 )
                 logger.info(f"🤖 AI: {full_response}")
+                self._record_turn(ConversationTurn(
+                    participant, "assistant", full_response,
+                    latency_ms=round((time.perf_counter() - started) * 1000, 1),
+                    metadata={"first_token_ms": first_token_ms}
+                ))
 
                 # 播放音频
-                async for audio_chunk in tts_stream:
-                    if hasattr(audio_chunk, 'frame'):
-                        await self.audio_source.capture_frame(audio_chunk.frame)
-                    else:
-                        await self.audio_source.capture_frame(audio_chunk)
+                if self.recorder:
+                    self.recorder.tts_text(participant, full_response)
+                try:
+                    with self.playbacks.playing(participant, self.audio_source):
+                        async for audio_chunk in self._guard_tts(tts_stream, full_response, tts):
+                            if filler:
+                                await filler.stop()
+                                filler = None
+                            await self._play(audio_chunk, participant)
+                except Exception as e:
+                    # TTS 不可用 (熔断/重试用尽): 回答已生成，改为文字发送
+                    logger.error(f"❌ TTS 失败: {e!r}")
+                    await self._send_text(full_response, participant)
 
             await tts_stream.aclose()
 
         except Exception as e:
             logger.error(f"❌ LLM/TTS 错误: {e}", exc_info=True)
             # 发送错误提示
+            error_text = "抱歉，我遇到了一些问题，请稍后再试。"
             try:
-                error_text = "抱歉，我遇到了一些问题，请稍后再试。"
+                if filler:
+                    await filler.stop()
+                    filler = None
+                # 原合成流可能已结束输入，错误提示用新的合成流
+                await tts_stream.aclose()
+                tts_stream = tts.stream()
                 tts_stream.push_text(error_text)
                 tts_stream.flush()
-                async for audio_chunk in tts_stream:
-                    if hasattr(audio_chunk, 'frame'):
-                        await self.audio_source.capture_frame(audio_chunk.frame)
-                    else:
-                        await self.audio_source.capture_frame(audio_chunk)
+                tts_stream.end_input()
+                if self.recorder:
+                    self.recorder.tts_text(participant, error_text)
+                with self.playbacks.playing(participant, self.audio_source):
+                    async for audio_chunk in self._guard_tts(tts_stream, error_text, tts):
+                        await self._play(audio_chunk, participant)
                 await tts_stream.aclose()
-            except:
-                pass
+            except Exception as tts_error:
+                logger.error(f"❌ 错误提示语音合成失败: {tts_error!r}")
+                await self._send_text(error_text, participant)
+
+        finally:
+            if filler:
+                await filler.stop()
 
     async def connect_to_room(self):
         """连接到 LiveKit 房间"""
@@ -267,7 +495,7 @@ class AIAssistant:
             .with_name("AI Assistant")
             .with_grants(api.VideoGrants(
                 room_join=True,
-                room=settings.ROOM_NAME,
+                room=self.room_name,
                 can_publish=True,
                 can_publish_data=True,
                 agent=True,
@@ -278,7 +506,7 @@ class AIAssistant:
 
         try:
             await self.room.connect(settings.LIVEKIT_URL, token)
-            logger.info(f"✅ 已连接到房间: {settings.ROOM_NAME}")
+            logger.info(f"✅ 已连接到房间: {self.room_name}")
         except Exception as e:
             raise LiveKitConnectionError(f"连接失败: {e}")
 
@@ -294,77 +522,87 @@ class AIAssistant:
         await self.room.local_participant.publish_track(track)
         logger.info("🎤 AI 语音轨道已发布")
 
-    async def process_participant_audio(self, participant: rtc.Participant):
-        """处理参与者音频"""
+    async def process_participant_audio(self, participant: rtc.Participant, track: rtc.Track = None):
+        """处理参与者音频 (同一参与者/轨道重复调用是幂等的)"""
         if participant.identity == settings.AGENT_IDENTITY:
             return
 
-        # 查找麦克风轨道
-        audio_stream = None
-        for pub in participant.track_publications.values():
-            if (pub.track and
-                    pub.kind == rtc.TrackKind.KIND_AUDIO and
-                    pub.source == rtc.TrackSource.SOURCE_MICROPHONE):
-                audio_stream = rtc.AudioStream(pub.track)
-                break
+        # 未指定轨道时查找麦克风轨道
+        if track is None:
+            for pub in participant.track_publications.values():
+                if (pub.track and
+                        pub.kind == rtc.TrackKind.KIND_AUDIO and
+                        pub.source == rtc.TrackSource.SOURCE_MICROPHONE):
+                    track = pub.track
+                    break
 
-        if not audio_stream:
+        if not track:
             logger.warning(f"未找到 {participant.identity} 的麦克风")
             return
 
-        logger.info(f"🎧 开始处理: {participant.identity}")
-
-        stt_stream = self.stt.stream()
-        chat_context = ChatContext()
+        identity = participant.identity
 
-        async def feed_stt():
-            """音频重采样并发送到 STT"""
-            resampler = rtc.AudioResampler(
-                input_rate=48000,
-                output_rate=16000,
-                num_channels=1,
-                quality=rtc.AudioResamplerQuality.QUICK
+        # 新会话 (首次加入或重连) 先读出最近的历史对话
+        history = []
+        if self.conversations is not None and identity not in self.sessions:
+            try:
+                history = await self.conversations.recent(identity, settings.CONVERSATION_HISTORY_TURNS)
+            except Exception as e:
+                logger.warning(f"⚠️ 读取历史对话失败 ({identity}): {e}")
+
+        def create_session(audio_track: rtc.Track) -> ParticipantSession:
+            logger.info(f"🎧 开始处理: {identity}")
+            session = ParticipantSession(
+                identity,
+                audio_track,
+                stt=self.stt,
+                preprocessor=self.preprocessor,
+                audio_stream_factory=self.audio_stream_factory,
+                respond=lambda chat_context: self.process_llm_response(
+                    chat_context, participant=identity, language=session.language),
+                conversation=self.conversations,
+                reask=self._reask if self.reask else None,
+                min_confidence=settings.STT_REASK_CONFIDENCE,
+                recorder=self.recorder
             )
-
-            async for frame_event in audio_stream:
-                frame = frame_event.frame
-                for resampled_frame in resampler.push(frame):
-                    stt_stream.push_frame(resampled_frame)
-
-            for resampled_frame in resampler.flush():
-                stt_stream.push_frame(resampled_frame)
-
-            await stt_stream.aclose()
-
-        async def handle_stt():
-            """处理 STT 结果"""
-            async for event in stt_stream:
-                if (event.type == SpeechEventType.FINAL_TRANSCRIPT and
-                        event.alternatives):
-                    user_text = event.alternatives[0].text.strip()
-                    if not user_text:
-                        continue
-
-                    logger.info(f"💬 用户: {user_text}")
-                    chat_context.add_message(
-                        role="user",
-                        content=user_text
-                    )
-
-                    # 异步处理 LLM + TTS
-                    asyncio.create_task(self.process_llm_response(chat_context))
-
-        await asyncio.gather(
-            feed_stt(),
-            handle_stt(),
-            return_exceptions=True
-        )
+            session.restore(history)
+            session.add_failure_callback(lambda: self._reattach_soon(participant, audio_track))
+            return session
+
+        return await self.sessions.attach(identity, track, create_session)
+
+    def _reattach_soon(self, participant: rtc.Participant, track: rtc.Track):
+        """STT 不可用时会话由注册表释放，这里在熔断器放行探测后用同一轨道重建"""
+        task = asyncio.create_task(self._reattach(participant, track))
+        self._reattaching.add(task)
+        task.add_done_callback(self._reattaching.discard)
+
+    async def _reattach(self, participant: rtc.Participant, track: rtc.Track):
+        await asyncio.sleep(settings.BREAKER_RESET_SECONDS)
+        identity = participant.identity
+        if self._done.is_set() or identity in self.sessions:
+            return
+        if self.room is not None and identity not in self.room.remote_participants:
+            return
+        publication = participant.track_publications.get(getattr(track, "sid", ""))
+        if publication is None or publication.track is None:
+            logger.info(f"轨道已取消，不再重建会话: {identity}")
+            return
+        logger.info(f"🔄 重建 STT 会话: {identity}")
+        await self.process_participant_audio(participant, track)
 
     async def start(self):
         """启动助手"""
         try:
             await self.initialize()
-            await self.connect_to_room()
+            await asyncio.gather(
+                self.startup.timed("room", self.connect_to_room()),
+                self._prewarm()
+            )
+
+            for filler in (self.filler, self.reask):
+                if filler:
+                    asyncio.create_task(self._prepare_filler(filler))
 
             @self.room.on("track_subscribed")
             def on_track_subscribed(
@@ -375,24 +613,56 @@ class AIAssistant:
                 if (publication.kind == rtc.TrackKind.KIND_AUDIO and
                         publication.source == rtc.TrackSource.SOURCE_MICROPHONE):
                     logger.info(f"🎤 检测到麦克风: {participant.identity}")
-                    asyncio.create_task(self.process_participant_audio(participant))
+                    asyncio.create_task(self.process_participant_audio(participant, track))
+
+            @self.room.on("track_unsubscribed")
+            def on_track_unsubscribed(
+                    track: rtc.Track,
+                    publication: rtc.RemoteTrackPublication,
+                    participant: rtc.RemoteParticipant
+            ):
+                session = self.sessions.get(participant.identity)
+                if session and session.track_sid == publication.sid:
+                    logger.info(f"🔇 麦克风取消订阅: {participant.identity}")
+                    self.sessions.close_soon(participant.identity, session)
 
             @self.room.on("participant_connected")
             def on_participant_connected(participant: rtc.RemoteParticipant):
                 logger.info(f"👤 用户加入: {participant.identity}")
 
-            logger.info("✨ AI Agent 就绪")
-            await asyncio.Event().wait()
+            @self.room.on("participant_disconnected")
+            def on_participant_disconnected(participant: rtc.RemoteParticipant):
+                logger.info(f"👋 用户离开: {participant.identity}")
+                self.sessions.close_soon(participant.identity)
+                if self.leave_when_empty and not self.room.remote_participants:
+                    logger.info(f"🏁 房间已空，Agent 退出: {self.room_name}")
+                    self.stop()
+
+            logger.info(f"✨ AI Agent 就绪，启动耗时 {self.startup.summary()}")
+            await self._done.wait()
 
         except Exception as e:
             logger.error(f"错误: {e}", exc_info=True)
         finally:
             await self.cleanup()
 
+    def stop(self):
+        """让 start() 返回并清理资源"""
+        self._done.set()
+
     async def cleanup(self):
-        """清理资源"""
-        if self.http_session:
-            await self.http_session.close()
+        """清理本房间的资源 (进程级资源由 AgentRuntime 在进程退出时关闭)"""
+        self.runtime.remove_room(self.room_name)
+        for task in list(self._reattaching):
+            task.cancel()
+        await asyncio.gather(*self._reattaching, return_exceptions=True)
+        await self.sessions.close_all()
+        if self.conversations:
+            await self.conversations.aclose()
+        if self.preprocessor:
+            await self.preprocessor.aclose()
         if self.room:
             await self.room.disconnect()
+        if self.recorder:
+            self.recorder.close()
         logger.info("🚪 AI 助手已关闭")
\ No newline at end of file
@@ -0,0 +1,212 @@
+# backend/agent/filler.py
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+
+class ToolLatencyTracker:
+    """工具耗时统计 (按工具的指数滑动平均)"""
+
+    def __init__(self, alpha: float = 0.3, default_latency: float = 0.0):
+        self.alpha = alpha
+        self.default_latency = default_latency
+        self._latencies: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._priors: Dict[str, float] = {}
+
+    def set_prior(self, tool_name: str, seconds: float):
+        """工具声明的预计耗时，没有历史记录时使用"""
+        self._priors[tool_name] = seconds
+
+    def expected(self, tool_name: str) -> float:
+        """预计耗时 (秒)，没有历史记录时返回工具声明值或默认值"""
+        latency = self._latencies.get(tool_name)
+        if latency is None:
+            return self._priors.get(tool_name, self.default_latency)
+        return latency
+
+    def record(self, tool_name: str, seconds: float):
+        """记录一次实际耗时"""
+        previous = self._latencies.get(tool_name)
+        if previous is None:
+            self._latencies[tool_name] = seconds
+        else:
+            self._latencies[tool_name] = previous + self.alpha * (seconds - previous)
+        self._counts[tool_name] = self._counts.get(tool_name, 0) + 1
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {"expected": round(latency, 3), "count": self._counts.get(name, 0)}
+            for name, latency in self._latencies.items()
+        }
+
+
+class PlaybackTracker:
+    """
+    共享音源上的播放登记
+
+    房间内所有参与者的回答、填充和重问写入同一个 AudioSource，
+    打断填充音频时据此判断音源队列里是否还有其他参与者的音频。
+    """
+
+    def __init__(self):
+        self._active: Dict[str, int] = {}
+        # 写入结束后，已排队的音频预计播完的时间
+        self._draining: Dict[str, float] = {}
+
+    @contextmanager
+    def playing(self, owner: str, audio_source: Optional[rtc.AudioSource] = None):
+        """登记 owner 的一次播放 (传入 audio_source 时把写入后仍在排队的音频也算作播放中)"""
+        self._active[owner] = self._active.get(owner, 0) + 1
+        try:
+            yield
+        finally:
+            self._active[owner] -= 1
+            if not self._active[owner]:
+                del self._active[owner]
+            if audio_source is not None and audio_source.queued_duration > 0:
+                self._draining[owner] = time.monotonic() + audio_source.queued_duration
+
+    def others_active(self, owner: str) -> bool:
+        """除 owner 之外是否还有播放在进行"""
+        now = time.monotonic()
+        for other, until in list(self._draining.items()):
+            if until <= now:
+                del self._draining[other]
+        return any(other != owner for other in (*self._active, *self._draining))
+
+
+class FillerPlayback:
+    """一次填充音频播放 (可随时打断)"""
+
+    def __init__(self, audio_source: rtc.AudioSource, frames: List[rtc.AudioFrame],
+                 playbacks: Optional[PlaybackTracker] = None, owner: str = ""):
+        self._audio_source = audio_source
+        self._playbacks = playbacks or PlaybackTracker()
+        self._owner = owner
+        self._task = asyncio.create_task(self._play(frames))
+        self._stopped = False
+
+    async def _play(self, frames: List[rtc.AudioFrame]):
+        with self._playbacks.playing(self._owner):
+            for frame in frames:
+                await self._audio_source.capture_frame(frame)
+
+    async def wait(self):
+        """等待播放结束，等待期间被取消时停止播放"""
+        try:
+            await asyncio.shield(self._task)
+        except asyncio.CancelledError:
+            await self.stop()
+            raise
+
+    async def stop(self):
+        """停止播放，音源上没有其他参与者的音频时清掉尚未播出的填充音频"""
+        if self._stopped:
+            return
+        self._stopped = True
+
+        if not self._task.done():
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ 填充音频播放异常: {e}")
+
+        # 音源为房间共享: 队列里有其他参与者的音频时不能清空，只停止继续写入
+        if self._playbacks.others_active(self._owner):
+            return
+        # 丢弃队列里剩余的填充音频，保证真实回答不与其重叠
+        self._audio_source.clear_queue()
+
+
+class FillerScheduler:
+    """工具调用期间的填充音频调度器"""
+
+    # 预渲染音频按 20ms 切片，打断时最多多播 20ms
+    FRAME_MS = 20
+
+    def __init__(
+            self,
+            tts,
+            text: str = "我查一下",
+            threshold: float = 0.8,
+            tracker: Optional[ToolLatencyTracker] = None,
+            playbacks: Optional[PlaybackTracker] = None,
+    ):
+        self._tts = tts
+        self.text = text
+        self.threshold = threshold
+        self.tracker = tracker or ToolLatencyTracker()
+        self.playbacks = playbacks or PlaybackTracker()
+        self._frames: List[rtc.AudioFrame] = []
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._frames)
+
+    async def prepare(self):
+        """预渲染填充语音"""
+        started = time.perf_counter()
+        tts_stream = self._tts.stream()
+        frames = []
+
+        try:
+            tts_stream.push_text(self.text)
+            tts_stream.end_input()
+            async for audio in tts_stream:
+                frame = audio.frame if hasattr(audio, 'frame') else audio
+                frames.extend(self._split_frame(frame))
+        finally:
+            await tts_stream.aclose()
+
+        self._frames = frames
+        logger.info(
+            f"✅ 填充音频已预渲染: '{self.text}' "
+            f"({len(frames) * self.FRAME_MS}ms, 耗时 {time.perf_counter() - started:.2f}s)"
+        )
+
+    def _split_frame(self, frame: rtc.AudioFrame) -> List[rtc.AudioFrame]:
+        samples = frame.sample_rate * self.FRAME_MS // 1000
+        step = samples * frame.num_channels
+        data = frame.data
+        chunks = []
+        for start in range(0, len(data), step):
+            chunk = data[start:start + step]
+            chunks.append(rtc.AudioFrame(
+                data=chunk.tobytes(),
+                sample_rate=frame.sample_rate,
+                num_channels=frame.num_channels,
+                samples_per_channel=len(chunk) // frame.num_channels
+            ))
+        return chunks
+
+    def should_fill(self, tool_names: List[str]) -> bool:
+        if not self._frames:
+            return False
+        expected = max((self.tracker.expected(name) for name in tool_names), default=0.0)
+        return expected > self.threshold
+
+    def start(self, tool_names: List[str], audio_source: rtc.AudioSource,
+              owner: str = "") -> Optional[FillerPlayback]:
+        """工具调用开始时调用，预计耗时超过阈值则开始播放填充音频"""
+        if not self.should_fill(tool_names):
+            return None
+
+        logger.info(f"💬 播放填充音频: '{self.text}' (工具: {', '.join(tool_names)})")
+        return self.play(audio_source, owner)
+
+    def play(self, audio_source: rtc.AudioSource, owner: str = "") -> FillerPlayback:
+        """播放预渲染的语音 (owner: 为哪个参与者播放)"""
+        return FillerPlayback(audio_source, self._frames, self.playbacks, owner)
+
+    def record(self, tool_name: str, seconds: float):
+        self.tracker.record(tool_name, seconds)
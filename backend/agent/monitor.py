@@ -0,0 +1,277 @@
+# backend/agent/monitor.py
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:  # pragma: no cover - prometheus_client 为可选依赖
+    Counter = Gauge = None
+
+logger = logging.getLogger(__name__)
+
+if Gauge is not None:
+    _LAG = Gauge("voice_assistant_loop_lag_seconds", "事件循环调度延迟 (最近一次)")
+    _SLOW = Counter("voice_assistant_loop_slow_callbacks_total", "超过阈值的阻塞回调次数")
+else:
+    _LAG = _SLOW = None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """
+    采样分析器: 后台线程定时抓取事件循环线程的调用栈，按栈计数
+
+    结果为 collapsed stack 格式 (每行 "a;b;c 次数")，可直接交给 flamegraph.pl / speedscope。
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: collections.Counter = collections.Counter()
+        self.started_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        self.samples.clear()
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loop-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> str:
+        """停止采样并返回 collapsed stack 文本"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class LoopMonitor:
+    """
+    事件循环健康监控
+
+    - 调度延迟: 每 tick 秒安排一次回调，实际执行时间与预期的差值即为延迟
+    - 阻塞回调: 看门狗线程发现超过 slow_threshold 秒没有 tick 时，抓取事件循环线程的调用栈
+    - 任务统计: 按协程名统计当前存活的任务数
+    - 运行时开启/停止采样分析 (SamplingProfiler)
+    """
+
+    def __init__(self, tick: float = 0.1, slow_threshold: float = 0.1, history: int = 600):
+        self.tick = tick
+        self.slow_threshold = slow_threshold
+        self.lags: Deque[float] = collections.deque(maxlen=history)
+        self.slow_callbacks: Deque[dict] = collections.deque(maxlen=50)
+        self.slow_count = 0
+        self.profiler: Optional[SamplingProfiler] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id = 0
+        self._expected = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stall: Optional[dict] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._sections: Dict[str, Callable[[], dict]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    def start(self):
+        """在事件循环线程中调用"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._expected = time.monotonic() + self.tick
+        self._handle = self._loop.call_later(self.tick, self._on_tick)
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"✅ 事件循环监控已启动 (阻塞阈值 {self.slow_threshold * 1000:.0f}ms)")
+
+    def _on_tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+        self.lags.append(lag)
+        if _LAG is not None:
+            _LAG.set(lag)
+        self._expected = now + self.tick
+        self._handle = self._loop.call_later(self.tick, self._on_tick)
+
+        stall = self._stall
+        if stall is not None:
+            # 看门狗已抓到栈，这里补上完整的阻塞时长
+            self._stall = None
+            stall["duration_ms"] = round(lag * 1000, 1)
+            logger.warning(
+                f"⚠️ 事件循环阻塞 {stall['duration_ms']:.0f}ms，位置: {stall['where']}"
+            )
+
+    def _watch(self):
+        interval = min(self.tick, self.slow_threshold) / 2
+        while not self._stop.wait(interval):
+            overdue = time.monotonic() - self._expected
+            if overdue < self.slow_threshold or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_stack(frame)
+            event = {
+                "at": time.time(),
+                "duration_ms": round(overdue * 1000, 1),
+                "where": _frame_label(frame),
+                "stack": stack[-12:],
+            }
+            self.slow_callbacks.append(event)
+            self.slow_count += 1
+            if _SLOW is not None:
+                _SLOW.inc()
+            self._stall = event
+
+    def task_counts(self) -> Dict[str, int]:
+        """按协程名统计存活任务"""
+        counts: Dict[str, int] = collections.Counter()
+        for task in asyncio.all_tasks(self._loop):
+            coro = task.get_coro()
+            counts[getattr(coro, "__qualname__", None) or type(coro).__name__] += 1
+        return dict(counts.most_common())
+
+    def lag_stats(self) -> dict:
+        if not self.lags:
+            return {"samples": 0}
+        ordered = sorted(self.lags)
+        return {
+            "samples": len(ordered),
+            "last_ms": round(self.lags[-1] * 1000, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+
+    def add_section(self, name: str, provider: Callable[[], dict]):
+        """在 /debug/loop 中附加其它组件的统计"""
+        self._sections[name] = provider
+
+    def stats(self) -> dict:
+        tasks = self.task_counts()
+        result = {
+            "lag": self.lag_stats(),
+            "slow_callbacks": self.slow_count,
+            "tasks": sum(tasks.values()),
+            "profiling": bool(self.profiler and self.profiler.running),
+        }
+        for name, provider in self._sections.items():
+            try:
+                result[name] = provider()
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
+
+    # ---- 采样分析 ----
+
+    def start_profile(self, interval: float = 0.005) -> bool:
+        """开始采样，已在采样时返回 False"""
+        if self.profiler and self.profiler.running:
+            return False
+        self.profiler = SamplingProfiler(self._thread_id, interval)
+        self.profiler.start()
+        logger.info(f"🔧 开始采样分析 (间隔 {interval * 1000:.1f}ms)")
+        return True
+
+    def stop_profile(self) -> Optional[str]:
+        """停止采样并返回 collapsed stack 文本，未在采样时返回 None"""
+        if not (self.profiler and self.profiler.running):
+            return None
+        result = self.profiler.stop()
+        logger.info(f"🔧 采样分析结束: {sum(self.profiler.samples.values())} 个样本")
+        return result
+
+    # ---- 调试 HTTP 接口 ----
+
+    def _app(self) -> web.Application:
+        async def loop_stats(request):
+            return web.json_response(self.stats())
+
+        async def tasks(request):
+            return web.json_response(self.task_counts())
+
+        async def slow(request):
+            return web.json_response(list(self.slow_callbacks))
+
+        async def profile_start(request):
+            interval = float(request.query.get("interval_ms", 5)) / 1000
+            if not self.start_profile(interval):
+                return web.json_response({"error": "profiling already running"}, status=409)
+            return web.json_response({"profiling": True})
+
+        async def profile_stop(request):
+            result = self.stop_profile()
+            if result is None:
+                return web.json_response({"error": "profiling not running"}, status=409)
+            return web.Response(text=result)
+
+        app = web.Application()
+        app.router.add_get("/debug/loop", loop_stats)
+        app.router.add_get("/debug/tasks", tasks)
+        app.router.add_get("/debug/slow", slow)
+        app.router.add_post("/debug/profile/start", profile_start)
+        app.router.add_post("/debug/profile/stop", profile_stop)
+        return app
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> List[str]:
+        """
+        启动调试 HTTP 接口
+
+        Returns:
+            实际监听的地址列表 (port=0 时由系统分配端口)
+        """
+        self._runner = web.AppRunner(self._app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        addresses = [f"http://{a[0]}:{a[1]}" for a in self._runner.addresses]
+        logger.info(f"✅ 调试接口: {addresses[0]}/debug/loop")
+        return addresses
+
+    async def aclose(self):
+        if self.profiler and self.profiler.running:
+            self.profiler.stop()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._loop = None
@@ -0,0 +1,202 @@
+# backend/agent/profiles.py
+
+import fnmatch
+import json
+import logging
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.config import settings
+from integrations.language import base_language
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AgentProfile:
+    """一个产品的 Agent 配置: 提示词、STT/LLM/TTS 参数和可用工具"""
+    name: str
+    system_prompt: str
+    stt_model: str = "paraformer-realtime-v2"
+    language: str = "zh-CN"
+    language_hints: Tuple[str, ...] = ("zh",)
+    detect_languages: Tuple[str, ...] = ()  # 自动判定语言的候选，为空时不判定
+    stt_models: Dict[str, str] = field(default_factory=dict)  # 语言 -> STT 模型 (未列出的使用 stt_model)
+    llm_models: Tuple[str, ...] = ()  # 为空时使用 LLM_MODELS
+    tts_model: str = "cosyvoice-v1"
+    tts_voice: str = "longxiaochun"
+    voices: Dict[str, str] = field(default_factory=dict)  # 语言 -> TTS 音色 (未列出的使用 tts_voice)
+    tools: Optional[Tuple[str, ...]] = None  # None 表示全部已注册工具
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict, base: Optional["AgentProfile"] = None) -> "AgentProfile":
+        """从配置文件创建，未给出的字段沿用 base (默认配置)"""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"profile {name!r}: unknown fields {sorted(unknown)}")
+        values = {f.name: getattr(base, f.name) for f in fields(cls)} if base else {}
+        values.update({k: tuple(v) if isinstance(v, list) else v for k, v in data.items()})
+        values["name"] = name
+        return cls(**values)
+
+    def allows_tool(self, tool_name: str) -> bool:
+        return self.tools is None or tool_name in self.tools
+
+    def voice_for(self, language: Optional[str]) -> str:
+        if not language:
+            return self.tts_voice
+        return self.voices.get(base_language(language), self.tts_voice)
+
+
+@dataclass
+class ProfileClients:
+    """按配置创建的客户端，同一进程内使用相同配置的房间共享"""
+    stt: object
+    llm: object
+    tts: object
+
+
+def _split(value: str) -> Tuple[str, ...]:
+    return tuple(v.strip() for v in value.split(",") if v.strip())
+
+
+def default_profile() -> AgentProfile:
+    """由 Settings 构造的默认配置"""
+    return AgentProfile(
+        name=settings.AGENT_DEFAULT_PROFILE,
+        system_prompt=settings.AGENT_SYSTEM_PROMPT,
+        stt_model=settings.STT_MODEL,
+        language=settings.STT_LANGUAGE,
+        language_hints=_split(settings.STT_LANGUAGE_HINTS),
+        detect_languages=_split(settings.STT_DETECT_LANGUAGES),
+        tts_model=settings.TTS_MODEL,
+        tts_voice=settings.TTS_VOICE,
+        voices=dict(item.split("=", 1) for item in _split(settings.TTS_VOICES)),
+    )
+
+
+class ProfileRegistry:
+    """
+    Agent 配置注册表
+
+    按房间名选择配置 (配置文件中的 rooms 为 fnmatch 模式，按顺序匹配，未匹配时使用默认配置)。
+    配置对象和由它创建的 STT/LLM/TTS 客户端都会缓存，每轮对话不再重复构造。
+    """
+
+    def __init__(self, default: AgentProfile, profiles: Optional[Dict[str, AgentProfile]] = None,
+                 rooms: Optional[List[Tuple[str, str]]] = None):
+        self.default = default
+        self.profiles: Dict[str, AgentProfile] = {default.name: default, **(profiles or {})}
+        self.rooms = list(rooms or [])
+        for pattern, name in self.rooms:
+            if name not in self.profiles:
+                raise ValueError(f"room pattern {pattern!r} refers to unknown profile {name!r}")
+        self._by_room: Dict[str, AgentProfile] = {}
+        self._clients: Dict[str, ProfileClients] = {}
+        self._voices: Dict[Tuple[str, str], object] = {}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, default: Optional[AgentProfile] = None) -> "ProfileRegistry":
+        """
+        从 JSON 文件加载
+
+        文件格式: {"profiles": {"<name>": {<AgentProfile 字段>}}, "rooms": {"<房间名模式>": "<name>"}}
+        """
+        default = default or default_profile()
+        if not path:
+            return cls(default)
+
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        entries = dict(data.get("profiles", {}))
+        # 文件中与默认配置同名的条目先覆盖默认配置，其它配置再以它为基础
+        if default.name in entries:
+            default = AgentProfile.from_dict(default.name, entries.pop(default.name), base=default)
+        profiles = {
+            name: AgentProfile.from_dict(name, values, base=default)
+            for name, values in entries.items()
+        }
+        registry = cls(default, profiles, list(data.get("rooms", {}).items()))
+        logger.info(f"✅ 加载 Agent 配置: {sorted(registry.profiles)} ({len(registry.rooms)} 条房间规则)")
+        return registry
+
+    def get(self, name: str) -> AgentProfile:
+        try:
+            return self.profiles[name]
+        except KeyError:
+            raise KeyError(f"unknown agent profile {name!r}") from None
+
+    def for_room(self, room_name: str) -> AgentProfile:
+        profile = self._by_room.get(room_name)
+        if profile is None:
+            profile = self.default
+            for pattern, name in self.rooms:
+                if fnmatch.fnmatchcase(room_name, pattern):
+                    profile = self.profiles[name]
+                    break
+            self._by_room[room_name] = profile
+        return profile
+
+    def clients(self, profile: AgentProfile, http_session=None) -> ProfileClients:
+        """该配置的客户端 (第一次使用时创建)"""
+        clients = self._clients.get(profile.name)
+        if clients is None:
+            clients = self._clients[profile.name] = self._create_clients(profile, http_session)
+            logger.info(f"✅ 创建配置 {profile.name} 的客户端 (STT {profile.stt_model}，TTS {profile.tts_voice})")
+        return clients
+
+    def tts_for(self, profile: AgentProfile, language: Optional[str], http_session=None):
+        """按判定的语言选择 TTS 音色 (每个音色只创建一次)"""
+        clients = self.clients(profile, http_session)
+        voice = profile.voice_for(language)
+        if voice == profile.tts_voice:
+            return clients.tts
+        tts = self._voices.get((profile.name, voice))
+        if tts is None:
+            from integrations.aliyun.tts import create_tts
+            tts = self._voices[(profile.name, voice)] = create_tts(http_session, model=profile.tts_model, voice=voice)
+        return tts
+
+    def _create_clients(self, profile: AgentProfile, http_session) -> ProfileClients:
+        from integrations.aliyun.stt import AliyunSTT
+        from integrations.aliyun.tts import create_tts
+        from integrations.llm_router import create_llm_router
+
+        stt = AliyunSTT(
+            api_key=settings.DASHSCOPE_API_KEY,
+            model=profile.stt_model,
+            language=profile.language,
+            language_hints=list(profile.language_hints),
+            detect_languages=list(profile.detect_languages),
+            language_models=profile.stt_models,
+            queue_max_ms=settings.STT_QUEUE_MAX_MS,
+            overflow_policy=settings.STT_QUEUE_POLICY,
+            max_reconnects=settings.STT_MAX_RECONNECTS,
+            replay_ms=settings.STT_REPLAY_MS,
+            connect_timeout=settings.STT_CONNECT_TIMEOUT,
+            start_timeout=settings.STT_START_TIMEOUT,
+            audio_format=settings.STT_AUDIO_FORMAT,
+            opus_bitrate=settings.STT_OPUS_BITRATE,
+            encode_workers=settings.STT_ENCODE_WORKERS,
+            http_session=http_session
+        )
+        llm = create_llm_router(list(profile.llm_models) or None)
+        tts = create_tts(http_session, model=profile.tts_model, voice=profile.tts_voice)
+        return ProfileClients(stt=stt, llm=llm, tts=tts)
+
+    async def aclose(self):
+        """关闭所有客户端 (进程退出时调用)"""
+        for clients in self._clients.values():
+            await clients.stt.aclose()
+        self._clients.clear()
+        self._voices.clear()
+
+
+def create_profile_registry() -> ProfileRegistry:
+    """根据配置创建注册表"""
+    return ProfileRegistry.load(settings.AGENT_PROFILES_PATH)
+
+
+# 全局实例
+profile_registry = create_profile_registry()
@@ -0,0 +1,249 @@
+# backend/agent/recorder.py
+import enum
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from livekit import rtc
+
+from core.utils import compact_json
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"VAREC001"
+# 记录头: 类型 u8 / 参与者序号 u16 / 负载长度 u32 / 相对录制开始的单调时间 ns u64
+_HEADER = struct.Struct("<BHIQ")
+# 音频负载头: 采样率 u32 / 声道数 u16，之后是 int16 PCM
+_AUDIO = struct.Struct("<IH")
+
+
+class RecordKind(enum.IntEnum):
+    """记录类型 (0 保留: 预分配但未写入的区域全为 0，读到 0 即结束)"""
+    META = 1
+    PARTICIPANT = 2
+    AUDIO_IN = 3
+    STT_EVENT = 4
+    LLM_START = 5
+    LLM_CHUNK = 6
+    LLM_END = 7
+    TOOL_CALL = 8
+    TOOL_RESULT = 9
+    TTS_TEXT = 10
+    AUDIO_OUT = 11
+
+
+_AUDIO_KINDS = (RecordKind.AUDIO_IN, RecordKind.AUDIO_OUT)
+
+# participant 为参与者 identity，t_ns 为相对录制开始的纳秒数，
+# data 为音频记录的 rtc.AudioFrame 或其它记录的 dict
+Record = namedtuple("Record", "kind participant t_ns data")
+
+
+class MmapWriter:
+    """
+    只追加的内存映射文件
+
+    文件按 chunk_size 预分配并映射到内存，写入只是内存拷贝；写满时扩大文件重新映射。
+    进程崩溃时已写入的记录仍在页缓存中，由内核写回，尾部未写入的区域为 0。
+    close() 时截断到实际写入长度。
+    """
+
+    def __init__(self, path: str, chunk_size: int = 4 * 1024 * 1024):
+        self.path = path
+        self.chunk_size = max(mmap.ALLOCATIONGRANULARITY, chunk_size)
+        self._file = open(path, "w+b")
+        self._mmap: Optional[mmap.mmap] = None
+        self._size = 0
+        self.position = 0
+        self.remaps = 0
+        self._grow(self.chunk_size)
+
+    def _grow(self, needed: int):
+        size = self._size
+        while size < self.position + needed:
+            size += self.chunk_size
+        if self._mmap is not None:
+            self._mmap.close()
+            self.remaps += 1
+        os.ftruncate(self._file.fileno(), size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._size = size
+
+    def reserve(self, length: int) -> int:
+        """预留 length 字节，返回写入位置"""
+        if self.position + length > self._size:
+            self._grow(length)
+        offset = self.position
+        self.position += length
+        return offset
+
+    def pack_into(self, fmt: struct.Struct, offset: int, *values):
+        fmt.pack_into(self._mmap, offset, *values)
+
+    def write_at(self, offset: int, data) -> None:
+        self._mmap[offset:offset + len(data)] = data
+
+    def flush(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap is None:
+            return
+        self._mmap.flush()
+        self._mmap.close()
+        self._mmap = None
+        os.ftruncate(self._file.fileno(), self.position)
+        self._file.close()
+
+
+class Recorder:
+    """
+    生产问题录制
+
+    按单调时间记录输入音频帧、STT 事件、LLM 输出块、工具调用/结果、TTS 文本和输出音频帧，
+    写入紧凑的二进制文件 (见 RecordKind / _HEADER)，可用 agent.replay 按原始时间重放。
+    所有写入都在事件循环线程中进行，只是一次内存拷贝。
+    """
+
+    def __init__(self, path: str, meta: Optional[dict] = None, chunk_size: int = 4 * 1024 * 1024):
+        self.path = path
+        self._writer = MmapWriter(path, chunk_size)
+        self._writer.write_at(self._writer.reserve(len(MAGIC)), MAGIC)
+        self._started = time.monotonic_ns()
+        self._participants: Dict[str, int] = {}
+        self.records = 0
+        self.closed = False
+        self._json(RecordKind.META, "", {
+            "started_at": datetime.now().isoformat(timespec="seconds"), **(meta or {})
+        })
+
+    @classmethod
+    def create(cls, room_name: str, directory: str, meta: Optional[dict] = None) -> "Recorder":
+        """在 directory 下为房间创建录制文件: <房间名>-<时间>.rec"""
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = Path(directory) / f"{room_name}-{datetime.now():%Y%m%d-%H%M%S}.rec"
+        recorder = cls(str(path), meta={"room": room_name, **(meta or {})})
+        logger.info(f"⏺️ 开始录制: {path}")
+        return recorder
+
+    def _index(self, identity: str) -> int:
+        """参与者序号 (0 表示不属于任何参与者)"""
+        if not identity:
+            return 0
+        index = self._participants.get(identity)
+        if index is None:
+            index = self._participants[identity] = len(self._participants) + 1
+            self._write(RecordKind.PARTICIPANT, index, compact_json({"identity": identity}).encode())
+        return index
+
+    def _write(self, kind: RecordKind, participant: int, payload, prefix: bytes = b""):
+        length = len(prefix) + len(payload)
+        offset = self._writer.reserve(_HEADER.size + length)
+        self._writer.pack_into(_HEADER, offset, kind, participant, length, time.monotonic_ns() - self._started)
+        offset += _HEADER.size
+        if prefix:
+            self._writer.write_at(offset, prefix)
+            offset += len(prefix)
+        self._writer.write_at(offset, payload)
+        self.records += 1
+
+    def _json(self, kind: RecordKind, identity: str, data: dict):
+        if self.closed:
+            return
+        self._write(kind, self._index(identity), compact_json(data).encode())
+
+    def _audio(self, kind: RecordKind, identity: str, frame: rtc.AudioFrame):
+        if self.closed:
+            return
+        prefix = _AUDIO.pack(frame.sample_rate, frame.num_channels)
+        self._write(kind, self._index(identity), memoryview(frame.data).cast("B"), prefix)
+
+    def audio_in(self, identity: str, frame: rtc.AudioFrame):
+        self._audio(RecordKind.AUDIO_IN, identity, frame)
+
+    def audio_out(self, identity: str, frame: rtc.AudioFrame):
+        self._audio(RecordKind.AUDIO_OUT, identity, frame)
+
+    def stt_event(self, identity: str, event):
+        data = {"type": event.type.value}
+        if event.alternatives:
+            speech = event.alternatives[0]
+            data.update(
+                text=speech.text, language=speech.language, confidence=speech.confidence,
+                start_time=speech.start_time, end_time=speech.end_time,
+                words=[asdict(word) for word in getattr(speech, "words", ())],
+                confidence_reported=getattr(speech, "confidence_reported", False),
+                endpoint_delay_ms=getattr(speech, "endpoint_delay_ms", None),
+            )
+        self._json(RecordKind.STT_EVENT, identity, data)
+
+    def llm_start(self, identity: str, messages: int):
+        self._json(RecordKind.LLM_START, identity, {"messages": messages})
+
+    def llm_chunk(self, identity: str, text: str):
+        self._json(RecordKind.LLM_CHUNK, identity, {"text": text})
+
+    def llm_end(self, identity: str, text: str):
+        self._json(RecordKind.LLM_END, identity, {"text": text})
+
+    def tool_call(self, identity: str, name: str, arguments: str, call_id: str):
+        self._json(RecordKind.TOOL_CALL, identity, {"name": name, "arguments": arguments, "call_id": call_id})
+
+    def tool_result(self, identity: str, name: str, call_id: str, result: str, latency_ms: float):
+        self._json(RecordKind.TOOL_RESULT, identity, {
+            "name": name, "call_id": call_id, "result": result, "latency_ms": latency_ms
+        })
+
+    def tts_text(self, identity: str, text: str):
+        self._json(RecordKind.TTS_TEXT, identity, {"text": text})
+
+    def stats(self) -> dict:
+        return {"path": self.path, "records": self.records, "bytes": self._writer.position,
+                "participants": len(self._participants)}
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._writer.close()
+        logger.info(f"⏹️ 录制结束: {self.path} ({self.records} 条记录, {self._writer.position} 字节)")
+
+
+def read_recording(path: str) -> Iterator[Record]:
+    """按顺序读出录制文件中的记录 (遇到未写入的 0 区域或截断的尾部即结束)"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f"{path}: not a recording")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path}: not a recording")
+            participants: Dict[int, str] = {}
+            offset = len(MAGIC)
+            while offset + _HEADER.size <= size:
+                kind, participant, length, t_ns = _HEADER.unpack_from(data, offset)
+                offset += _HEADER.size
+                if kind == 0 or offset + length > size:
+                    break
+                payload = data[offset:offset + length]
+                offset += length
+
+                kind = RecordKind(kind)
+                if kind in _AUDIO_KINDS:
+                    sample_rate, channels = _AUDIO.unpack_from(payload)
+                    pcm = payload[_AUDIO.size:]
+                    value = rtc.AudioFrame(pcm, sample_rate, channels, len(pcm) // (2 * channels))
+                else:
+                    value = json.loads(payload)
+                    if kind == RecordKind.PARTICIPANT:
+                        participants[participant] = value["identity"]
+                yield Record(kind, participants.get(participant, ""), t_ns, value)
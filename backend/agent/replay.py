@@ -0,0 +1,469 @@
+# backend/agent/replay.py
+"""
+按原始时间重放问题录制
+
+用法: python -m agent.replay <录制文件> [-o 输出录制文件] [--tail 秒]
+
+把录制的输入音频、STT 事件、LLM 输出、工具结果和 TTS 音频交给模拟服务，
+让 AIAssistant 的处理链 (预处理 -> 会话 -> LLM 响应处理 -> 工具 -> TTS 播放) 按原始时间重新运行一遍，
+重放过程本身也录制下来，最后对比每轮的 用户说完 -> 首 token -> 首帧音频 延迟。
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from livekit import rtc
+from livekit.agents import llm, stt
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.config import settings
+from agent.assistant import AIAssistant
+from agent.recorder import Recorder, RecordKind, read_recording
+from audio.preprocess import AudioPreprocessor
+from integrations.aliyun.resilience import get_breaker
+from integrations.aliyun.stt import AliyunSpeechData, WordTiming
+from integrations.tools.manager import tool_manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """一次 LLM 调用的输出 (时间为相对请求开始的秒数)"""
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+    tool_calls: List[dict] = field(default_factory=list)
+    duration: float = 0.0
+
+
+@dataclass
+class Synthesis:
+    """一次 TTS 合成的输出帧 (时间为相对提交文本的秒数)"""
+    frames: List[Tuple[float, rtc.AudioFrame]] = field(default_factory=list)
+
+
+class Recording:
+    """按服务拆分的录制内容"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: dict = {}
+        self.participants: List[str] = []
+        self.audio_in: Dict[str, List[Tuple[int, rtc.AudioFrame]]] = {}
+        self.stt_events: Dict[str, List[Tuple[int, dict]]] = {}
+        # 按调用顺序 (多个参与者的调用交错时按全局顺序)
+        self.llm_responses: List[LLMResponse] = []
+        self.tool_results: Dict[str, Deque[Tuple[str, float]]] = {}
+        self.syntheses: Dict[str, Deque[Synthesis]] = {}
+        self.output_format: Optional[Tuple[int, int]] = None
+        self.duration_ns = 0
+        self.records: list = []
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        recording = cls(path)
+        responses: Dict[str, Tuple[int, LLMResponse]] = {}
+        syntheses: Dict[str, Tuple[int, Synthesis]] = {}
+
+        for record in read_recording(path):
+            recording.records.append(record)
+            recording.duration_ns = record.t_ns
+            kind, identity, t_ns, data = record
+            if kind == RecordKind.META:
+                recording.meta.update(data)
+            elif kind == RecordKind.PARTICIPANT:
+                recording.participants.append(identity)
+            elif kind == RecordKind.AUDIO_IN:
+                recording.audio_in.setdefault(identity, []).append((t_ns, data))
+            elif kind == RecordKind.STT_EVENT:
+                recording.stt_events.setdefault(identity, []).append((t_ns, data))
+            elif kind == RecordKind.LLM_START:
+                response = LLMResponse()
+                recording.llm_responses.append(response)
+                responses[identity] = (t_ns, response)
+            elif kind in (RecordKind.LLM_CHUNK, RecordKind.TOOL_CALL, RecordKind.LLM_END) and identity in responses:
+                started, response = responses[identity]
+                offset = (t_ns - started) / 1e9
+                if kind == RecordKind.LLM_CHUNK:
+                    response.chunks.append((offset, data["text"]))
+                elif kind == RecordKind.TOOL_CALL:
+                    response.tool_calls.append(data)
+                else:
+                    response.duration = offset
+            elif kind == RecordKind.TOOL_RESULT:
+                recording.tool_results.setdefault(data["name"], deque()).append((data["result"], data["latency_ms"]))
+            elif kind == RecordKind.TTS_TEXT:
+                synthesis = Synthesis()
+                recording.syntheses.setdefault(data["text"], deque()).append(synthesis)
+                syntheses[identity] = (t_ns, synthesis)
+            elif kind == RecordKind.AUDIO_OUT:
+                recording.output_format = recording.output_format or (data.sample_rate, data.num_channels)
+                if identity in syntheses:
+                    started, synthesis = syntheses[identity]
+                    synthesis.frames.append(((t_ns - started) / 1e9, data))
+        return recording
+
+
+class ReplayClock:
+    """重放时间线 (与录制开始对齐)"""
+
+    def __init__(self):
+        self._started: Optional[float] = None
+
+    def start(self):
+        self._started = time.monotonic()
+
+    async def until(self, t_ns: int):
+        await _sleep_until(self._started + t_ns / 1e9)
+
+
+async def _sleep_until(deadline: float):
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class ReplayAudioStream:
+    """按录制时间产出参与者的原始输入音频，产出完后保持打开直到被关闭"""
+
+    def __init__(self, clock: ReplayClock, frames: List[Tuple[int, rtc.AudioFrame]]):
+        self._clock = clock
+        self._frames = frames
+        self._closed = asyncio.Event()
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for t_ns, frame in self._frames:
+            await self._clock.until(t_ns)
+            yield rtc.AudioFrameEvent(frame=frame)
+        await self._closed.wait()
+
+    async def aclose(self):
+        self._closed.set()
+
+
+def _speech_event(data: dict) -> stt.SpeechEvent:
+    alternatives = []
+    if "text" in data:
+        alternatives.append(AliyunSpeechData(
+            language=data["language"], text=data["text"], confidence=data["confidence"],
+            start_time=data["start_time"], end_time=data["end_time"],
+            words=[WordTiming(**word) for word in data["words"]],
+            confidence_reported=data["confidence_reported"], endpoint_delay_ms=data["endpoint_delay_ms"],
+        ))
+    return stt.SpeechEvent(type=stt.SpeechEventType(data["type"]), alternatives=alternatives)
+
+
+class ReplaySTTStream:
+    """丢弃输入音频，按录制时间产出 STT 事件"""
+
+    def __init__(self, clock: ReplayClock, events: List[Tuple[int, dict]]):
+        self._clock = clock
+        self._events = events
+        self.closed = False
+
+    async def push_frame_wait(self, frame: rtc.AudioFrame):
+        pass
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for t_ns, data in self._events:
+            await self._clock.until(t_ns)
+            if self.closed:
+                return
+            yield _speech_event(data)
+
+    async def aclose(self):
+        self.closed = True
+
+
+class ReplaySTT:
+    """按会话创建顺序为每个参与者返回其录制的 STT 事件"""
+
+    def __init__(self, clock: ReplayClock, events: List[List[Tuple[int, dict]]]):
+        self._clock = clock
+        self._events = deque(events)
+
+    def stream(self) -> ReplaySTTStream:
+        return ReplaySTTStream(self._clock, self._events.popleft() if self._events else [])
+
+
+class ReplayLLM(llm.LLM):
+    """第 n 次调用按原始时间重放录制的第 n 次输出 (文本块 + 工具调用)"""
+
+    def __init__(self, responses: List[LLMResponse]):
+        super().__init__()
+        self._responses = deque(responses)
+        self.calls = 0
+
+    @property
+    def model(self) -> str:
+        return "replay"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> "ReplayLLMStream":
+        self.calls += 1
+        response = self._responses.popleft() if self._responses else LLMResponse()
+        return ReplayLLMStream(self, response, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class ReplayLLMStream(llm.LLMStream):
+    def __init__(self, replay_llm: ReplayLLM, response: LLMResponse, **kwargs):
+        self._response = response
+        super().__init__(replay_llm, **kwargs)
+
+    async def _run(self) -> None:
+        request_id = str(uuid.uuid4())
+        started = time.monotonic()
+        for offset, text in self._response.chunks:
+            await _sleep_until(started + offset)
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id, delta=llm.ChoiceDelta(role="assistant", content=text)
+            ))
+        await _sleep_until(started + self._response.duration)
+        if self._response.tool_calls:
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", tool_calls=[
+                    llm.FunctionToolCall(name=call["name"], arguments=call["arguments"], call_id=call["call_id"])
+                    for call in self._response.tool_calls
+                ])
+            ))
+
+
+class ReplayTools:
+    """按录制的耗时返回录制的工具结果 (同名工具按调用顺序)"""
+
+    def __init__(self, results: Dict[str, Deque[Tuple[str, float]]]):
+        self._results = results
+
+    @property
+    def tools(self) -> dict:
+        # 重放的 LLM 不使用工具声明
+        return {}
+
+    def get_spec(self, tool_name: str):
+        # 是否并行执行取决于工具声明，与线上保持一致
+        return tool_manager.get_spec(tool_name)
+
+    async def execute_tool(self, tool_name: str, arguments: dict) -> str:
+        queue = self._results.get(tool_name)
+        if not queue:
+            raise KeyError(f"no recorded result for tool {tool_name!r}")
+        result, latency_ms = queue.popleft()
+        await asyncio.sleep(latency_ms / 1000)
+        return result
+
+    def close(self):
+        pass
+
+
+class ReplayTTSStream:
+    """
+    flush 后按录制的首帧延迟和帧间隔产出该文本录制的音频帧
+
+    与 livekit SynthesizeStream 一致，录制的帧播完后要等 end_input() 流才结束
+    (线上漏调 end_input 时重放同样会卡住)。
+    """
+
+    def __init__(self, tts: "ReplayTTS"):
+        self._tts = tts
+        self._parts: List[str] = []
+        self._flushed = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._frames = None
+        self._started = 0.0
+
+    def push_text(self, text: str):
+        self._parts.append(text)
+
+    def flush(self):
+        self._flushed.set()
+
+    def end_input(self):
+        self._flushed.set()
+        self._ended.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        if self._frames is None:
+            await self._flushed.wait()
+            synthesis = self._tts.take("".join(self._parts))
+            self._frames = iter(synthesis.frames if synthesis else ())
+            self._started = time.monotonic()
+        item = next(self._frames, None)
+        if item is None:
+            await self._ended.wait()
+            raise StopAsyncIteration
+        offset, frame = item
+        await _sleep_until(self._started + offset)
+        return frame
+
+    async def aclose(self):
+        self._frames = iter(())
+        self._ended.set()
+
+
+class ReplayTTS:
+    def __init__(self, syntheses: Dict[str, Deque[Synthesis]], output_format: Optional[Tuple[int, int]] = None):
+        self._syntheses = syntheses
+        self.sample_rate, self.num_channels = output_format or (24000, 1)
+
+    def stream(self) -> ReplayTTSStream:
+        return ReplayTTSStream(self)
+
+    def take(self, text: str) -> Optional[Synthesis]:
+        """同一文本按顺序取录制；只剩最后一次时重复使用 (对冲请求)"""
+        queue = self._syntheses.get(text)
+        if not queue:
+            return None
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+class CaptureSource:
+    """代替 rtc.AudioSource: 只统计播放的帧"""
+
+    def __init__(self, sample_rate: int, num_channels: int):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.frames = 0
+        self.queued_duration = 0.0
+
+    async def capture_frame(self, frame: rtc.AudioFrame):
+        self.frames += 1
+
+    def clear_queue(self):
+        pass
+
+
+@dataclass
+class _Participant:
+    identity: str
+    track_publications: dict = field(default_factory=dict)
+
+
+@dataclass
+class _Track:
+    sid: str
+
+
+class ReplayAssistant(AIAssistant):
+    """使用模拟服务的 AIAssistant，参与者、音频输入和服务输出都来自录制"""
+
+    def __init__(self, recording: Recording, output: Optional[str] = None):
+        super().__init__(room_name=recording.meta.get("room"))
+        self.recording = recording
+        self.clock = ReplayClock()
+        self._output = output
+        self.audio_stream_factory = self._audio_stream
+
+    def _create_components(self):
+        recording = self.recording
+        self.stt = ReplaySTT(self.clock, [recording.stt_events.get(p, []) for p in recording.participants])
+        self.llm = ReplayLLM(recording.llm_responses)
+        self.tts = ReplayTTS(recording.syntheses, recording.output_format)
+        self.tts_breaker = get_breaker("replay-tts")
+        self.tool_manager = ReplayTools(recording.tool_results)
+        self.audio_source = CaptureSource(self.tts.sample_rate, self.tts.num_channels)
+        self.preprocessor = AudioPreprocessor(
+            output_rate=16000,
+            tick_ms=settings.AUDIO_PREPROCESS_TICK_MS,
+            max_workers=settings.AUDIO_PREPROCESS_WORKERS
+        )
+        self.preprocessor.start()
+        if self._output:
+            self.recorder = Recorder(self._output, meta={**recording.meta, "replay_of": recording.path})
+
+    def _tts_for(self, language: str = None):
+        return self.tts
+
+    def _audio_stream(self, track: _Track) -> ReplayAudioStream:
+        return ReplayAudioStream(self.clock, self.recording.audio_in.get(track.sid, []))
+
+    def _responding(self) -> bool:
+        return any(name.endswith(":respond") for info in self.sessions.snapshot() for name in info["tasks"])
+
+    async def run(self, tail: float = 5.0):
+        """重放整段录制；录制结束后最多再等 tail 秒让最后一轮回复完成"""
+        await self.initialize()
+        self.clock.start()
+        try:
+            for identity in self.recording.participants:
+                await self.process_participant_audio(_Participant(identity), _Track(identity))
+            await self.clock.until(self.recording.duration_ns)
+            deadline = time.monotonic() + tail
+            while self._responding() and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        finally:
+            await self.cleanup()
+
+
+def turn_latencies(records) -> List[dict]:
+    """每轮 用户说完 (STT 最终结果) -> 首个 LLM 文本块 / 首帧输出音频 的延迟 (ms)"""
+    turns = []
+    pending: Dict[str, dict] = {}
+    for kind, identity, t_ns, data in records:
+        if (kind == RecordKind.STT_EVENT and data["type"] == stt.SpeechEventType.FINAL_TRANSCRIPT.value
+                and data.get("text", "").strip()):
+            turn = pending[identity] = {"participant": identity, "text": data["text"], "final_ns": t_ns,
+                                        "first_token_ms": None, "first_audio_ms": None}
+            turns.append(turn)
+        elif kind == RecordKind.LLM_CHUNK and identity in pending:
+            turn = pending[identity]
+            if turn["first_token_ms"] is None:
+                turn["first_token_ms"] = round((t_ns - turn["final_ns"]) / 1e6, 1)
+        elif kind == RecordKind.AUDIO_OUT and identity in pending:
+            turn = pending.pop(identity)
+            turn["first_audio_ms"] = round((t_ns - turn["final_ns"]) / 1e6, 1)
+    return turns
+
+
+async def replay(path: str, output: Optional[str] = None, tail: float = 5.0) -> Tuple[List[dict], List[dict]]:
+    """重放录制，返回 (录制中的每轮延迟, 重放的每轮延迟)"""
+    recording = Recording.load(path)
+    output = output or str(Path(path).with_suffix(".replay.rec"))
+    logger.info(f"▶️ 重放 {path}: {len(recording.participants)} 个参与者, "
+                f"{len(recording.llm_responses)} 次 LLM 调用, {recording.duration_ns / 1e9:.1f}s")
+    assistant = ReplayAssistant(recording, output)
+    await assistant.run(tail)
+    return turn_latencies(recording.records), turn_latencies(read_recording(output))
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="按原始时间重放问题录制并对比每轮延迟")
+    parser.add_argument("path", help="录制文件")
+    parser.add_argument("-o", "--output", help="重放过程的录制文件 (默认 <录制文件>.replay.rec)")
+    parser.add_argument("--tail", type=float, default=5.0, help="录制结束后等待最后一轮回复的秒数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    recorded, replayed = await replay(args.path, args.output, args.tail)
+    print(f"{'轮次':<4} {'首 token (录制 -> 重放)':<28} {'首帧音频 (录制 -> 重放)':<28} 文本")
+    for i, (before, after) in enumerate(zip(recorded, replayed)):
+        print(f"{i:<6} {_format_ms(before['first_token_ms']):>8} -> {_format_ms(after['first_token_ms']):<16} "
+              f"{_format_ms(before['first_audio_ms']):>8} -> {_format_ms(after['first_audio_ms']):<16} "
+              f"{before['text']}")
+    if len(recorded) != len(replayed):
+        print(f"⚠️ 轮数不一致: 录制 {len(recorded)} 轮，重放 {len(replayed)} 轮")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+# backend/agent/runtime.py
+import logging
+from typing import Callable, Dict, Optional
+
+from core.config import settings
+from core.logger import logging_stats
+from core.utils import PhaseTimer
+from agent.monitor import LoopMonitor
+from agent.profiles import profile_registry
+from integrations.aliyun.resilience import breaker_stats, start_metrics_server
+from integrations.http_client import http_clients
+from integrations.tools.manager import tool_manager
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRuntime:
+    """
+    进程级资源: 指标端口、事件循环监控和调试接口、共享客户端、工具执行器和缓存
+
+    由进程入口 (agent/server.py、agent/worker.py) 启动和关闭一次；
+    同一进程内的多个 AIAssistant (worker 中每个房间一个) 只登记/注销自己的房间统计。
+    """
+
+    def __init__(self):
+        self.monitor: Optional[LoopMonitor] = None
+        self.started = False
+        self._rooms: Dict[str, Callable[[], dict]] = {}
+
+    async def start(self, startup: Optional[PhaseTimer] = None):
+        """启动进程级服务 (重复调用无效果)"""
+        if self.started:
+            return
+        self.started = True
+
+        if settings.METRICS_PORT:
+            start_metrics_server(settings.METRICS_PORT)
+
+        if settings.LOOP_MONITOR_ENABLED:
+            self.monitor = LoopMonitor(slow_threshold=settings.LOOP_MONITOR_SLOW_MS / 1000)
+            self.monitor.start()
+            self.monitor.add_section("rooms", self.room_stats)
+            self.monitor.add_section("logging", logging_stats)
+            self.monitor.add_section("breakers", breaker_stats)
+            self.monitor.add_section("tools", tool_manager.executor.stats)
+            self.monitor.add_section("http", http_clients.stats)
+            if settings.LOOP_MONITOR_PORT:
+                serve = self._serve_debug()
+                await (startup.timed("debug_server", serve) if startup is not None else serve)
+
+    async def _serve_debug(self):
+        try:
+            await self.monitor.serve(settings.LOOP_MONITOR_HOST, settings.LOOP_MONITOR_PORT)
+        except OSError as e:
+            logger.warning(f"⚠️ 调试接口启动失败: {e}")
+
+    def add_room(self, room_name: str, provider: Callable[[], dict]):
+        """登记房间的统计 (在 /debug/loop 的 rooms 下显示)"""
+        self._rooms[room_name] = provider
+
+    def remove_room(self, room_name: str):
+        self._rooms.pop(room_name, None)
+
+    def room_stats(self) -> dict:
+        return {name: provider() for name, provider in self._rooms.items()}
+
+    async def aclose(self):
+        """进程退出时调用: 关闭监控、工具执行器/缓存和共享客户端"""
+        if self.monitor is not None:
+            await self.monitor.aclose()
+            self.monitor = None
+        tool_manager.close()
+        await profile_registry.aclose()
+        await http_clients.aclose()
+        self.started = False
+
+
+# 全局实例
+agent_runtime = AgentRuntime()
@@ -1,21 +1,32 @@
 # backend/agent/server.py
 import asyncio
 import sys
+import time
 from pathlib import Path
 
+_STARTED = time.perf_counter()
+
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from core.logger import setup_logger
+from core.utils import PhaseTimer
 from agent.assistant import AIAssistant
+from agent.runtime import agent_runtime
+
+startup = PhaseTimer(origin=_STARTED)
+startup.mark("imports")
 
 logger = setup_logger("agent_server")
 
 
 async def main():
     logger.info("🚀 启动 AI Agent...")
-    assistant = AIAssistant()
-    await assistant.start()
+    try:
+        await agent_runtime.start(startup)
+        await AIAssistant(startup=startup).start()
+    finally:
+        await agent_runtime.aclose()
 
 
 if __name__ == "__main__":
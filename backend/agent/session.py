@@ -0,0 +1,385 @@
+# backend/agent/session.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from livekit import rtc
+from livekit.agents import APIError
+from livekit.agents.llm import ChatContext
+from livekit.agents.stt import SpeechEventType
+
+from integrations.database import ConversationTurn
+
+logger = logging.getLogger(__name__)
+
+
+class ParticipantSession:
+    """
+    单个参与者的会话
+
+    持有该参与者的音频流、STT 流、对话上下文、预处理注册以及所有后台任务
+    (包括每轮回复任务)，aclose() 时按固定顺序全部取消和释放。
+    """
+
+    # 轨道结束后等待预处理尾部和 STT 最后结果的时间
+    FINISH_TIMEOUT = 5.0
+
+    def __init__(
+            self,
+            identity: str,
+            track: rtc.Track,
+            *,
+            stt,
+            preprocessor,
+            respond: Callable[[ChatContext], Awaitable[None]],
+            audio_stream_factory: Callable[[rtc.Track], rtc.AudioStream] = rtc.AudioStream,
+            conversation=None,
+            reask: Optional[Callable[[], Awaitable[None]]] = None,
+            min_confidence: float = 0.0,
+            recorder=None,
+    ):
+        self.identity = identity
+        self.track = track
+        self.track_sid = getattr(track, "sid", "")
+        self.chat_context: Optional[ChatContext] = ChatContext()
+        self.created_at = time.monotonic()
+        self.turns = 0
+        # STT 判定的用户语言 (未开启判定时为配置的语言)
+        self.language: Optional[str] = None
+
+        self._stt = stt
+        self._preprocessor = preprocessor
+        self._respond = respond
+        self._audio_stream_factory = audio_stream_factory
+        self._conversation = conversation
+        # 最终结果置信度过低时请用户重复，不调用 LLM (连续两次低置信度时第二次照常回答)
+        self._reask = reask
+        self._min_confidence = min_confidence
+        self._reasked = False
+        self.reasks = 0
+        # 问题录制 (可选): 原始输入音频帧和全部 STT 事件
+        self._recorder = recorder
+        self._audio_stream: Optional[rtc.AudioStream] = None
+        self.stt_stream = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._feed_task: Optional[asyncio.Task] = None
+        self._end_callbacks: list = []
+        self._failure_callbacks: list = []
+        # STT 流以错误结束 (熔断/重连用尽) 时的异常，此后会话不可复用
+        self.failed: Optional[Exception] = None
+        # 轨道已结束，输入正在收尾 (不再接受新轨道)
+        self._input_ended = False
+        self._closed = False
+        self._done = asyncio.Event()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def can_reuse(self) -> bool:
+        """STT 连接仍可用，换轨道时可以复用"""
+        return (not self._closed and not self._input_ended and self.failed is None
+                and self.stt_stream is not None and not getattr(self.stt_stream, "closed", False))
+
+    def restore(self, turns: list):
+        """用存储的历史记录恢复对话上下文 (只恢复用户和助手的文本)"""
+        restored = 0
+        for turn in turns:
+            if turn.role in ("user", "assistant") and turn.content:
+                self.chat_context.add_message(role=turn.role, content=turn.content)
+                restored += 1
+        if restored:
+            logger.info(f"📜 恢复 {self.identity} 的 {restored} 条历史对话")
+
+    def spawn(self, coro, name: str = "") -> asyncio.Task:
+        """创建受会话管理的任务，会话关闭时统一取消"""
+        task = asyncio.create_task(coro, name=f"{self.identity}:{name}" if name else None)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def start(self):
+        """建立音频 -> 预处理 -> STT -> 回复 的处理链"""
+        self.stt_stream = self._stt.stream()
+        processed = self._preprocessor.register(self.identity)
+
+        self._start_feed()
+        self.spawn(self._forward(processed), "forward")
+        self.spawn(self._handle_stt(), "stt")
+
+    def _start_feed(self):
+        self._audio_stream = self._audio_stream_factory(self.track)
+        task = self._feed_task = self.spawn(self._feed(self._audio_stream), "feed")
+        task.add_done_callback(self._on_feed_done)
+
+    def _on_feed_done(self, task: asyncio.Task):
+        # 换轨道时旧的 feed 任务被取消，不算轨道结束
+        if task is not self._feed_task or self._closed:
+            return
+        self._input_ended = True
+        self.spawn(self._finish_input(), "finish")
+
+    async def _finish_input(self):
+        """轨道结束: 预处理冲刷尾部 -> STT 返回最后结果 -> 通知释放"""
+        self._preprocessor.unregister(self.identity)
+        try:
+            await asyncio.wait_for(self._done.wait(), self.FINISH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 等待 STT 最后结果超时: {self.identity}")
+        for callback in list(self._end_callbacks):
+            callback()
+
+    async def _feed(self, audio_stream: rtc.AudioStream):
+        """提交原始音频到批量预处理 (重采样/去直流/增益归一化)"""
+        async for frame_event in audio_stream:
+            if self._recorder is not None:
+                self._recorder.audio_in(self.identity, frame_event.frame)
+            self._preprocessor.submit(self.identity, frame_event.frame)
+
+    async def replace_track(self, track: rtc.Track):
+        """
+        原子地切换到新轨道
+
+        只替换音频流和 feed 任务；预处理注册、STT 连接和对话上下文保持不变。
+        """
+        old_task, old_stream = self._feed_task, self._audio_stream
+        logger.info(f"🔄 切换轨道: {self.identity} {self.track_sid} -> {getattr(track, 'sid', '')}")
+
+        self.track = track
+        self.track_sid = getattr(track, "sid", "")
+        self._start_feed()
+
+        if old_task is not None:
+            old_task.cancel()
+            await asyncio.gather(old_task, return_exceptions=True)
+        if old_stream is not None:
+            try:
+                await old_stream.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ 关闭旧音频流失败 ({self.identity}): {e}")
+
+    async def _forward(self, processed):
+        """把预处理后的音频发送到 STT"""
+        while True:
+            frame = await processed.get()
+            if frame is None:
+                break
+            # 有界队列: BLOCK 策略下在这里等待 STT 消费
+            await self.stt_stream.push_frame_wait(frame)
+
+        await self.stt_stream.aclose()
+
+    async def _handle_stt(self):
+        """处理 STT 结果"""
+        try:
+            async for event in self.stt_stream:
+                if self._recorder is not None:
+                    self._recorder.stt_event(self.identity, event)
+                if (event.type == SpeechEventType.FINAL_TRANSCRIPT and
+                        event.alternatives):
+                    user_text = event.alternatives[0].text.strip()
+                    if not user_text:
+                        continue
+
+                    speech = event.alternatives[0]
+                    self.language = speech.language or self.language
+                    metadata = self._speech_metadata(speech)
+
+                    if self._should_reask(speech):
+                        logger.info(f"🤔 置信度过低 ({speech.confidence:.2f})，请用户重复: {user_text}")
+                        self.reasks += 1
+                        if self._conversation is not None:
+                            self._conversation.record(ConversationTurn(
+                                self.identity, "user", user_text, metadata={**metadata, "reasked": True}))
+                        self.spawn(self._reask(), "reask")
+                        continue
+                    self._reasked = False
+
+                    logger.info(f"💬 用户: {user_text}")
+                    self.chat_context.add_message(
+                        role="user",
+                        content=user_text
+                    )
+                    self.turns += 1
+                    if self._conversation is not None:
+                        self._conversation.record(ConversationTurn(self.identity, "user", user_text, metadata=metadata))
+
+                    # 异步处理 LLM + TTS (任务归会话所有)
+                    self.spawn(self._respond(self.chat_context), "respond")
+        except APIError as e:
+            # STT 不再可用: 通知注册表释放会话，由助手决定是否重建
+            self.failed = e
+            logger.error(f"❌ STT 不可用 ({self.identity}): {e}")
+            for callback in list(self._failure_callbacks):
+                callback()
+        finally:
+            self._done.set()
+
+    def _should_reask(self, speech) -> bool:
+        if self._reask is None or self._reasked or not getattr(speech, "confidence_reported", False):
+            return False
+        if speech.confidence >= self._min_confidence:
+            return False
+        self._reasked = True
+        return True
+
+    @staticmethod
+    def _speech_metadata(speech) -> dict:
+        """识别置信度和端点延迟 (写入对话存储)"""
+        metadata = {}
+        if getattr(speech, "confidence_reported", False):
+            metadata["confidence"] = round(speech.confidence, 3)
+        delay = getattr(speech, "endpoint_delay_ms", None)
+        if delay is not None:
+            metadata["endpoint_delay_ms"] = delay
+        return metadata
+
+    def add_end_callback(self, callback: Callable[[], None]):
+        """音频轨道自然结束时回调"""
+        self._end_callbacks.append(callback)
+
+    def add_failure_callback(self, callback: Callable[[], None]):
+        """STT 流以错误结束时回调"""
+        self._failure_callbacks.append(callback)
+
+    async def wait(self):
+        """等待 STT 流结束 (轨道结束或会话关闭)"""
+        await self._done.wait()
+
+    async def aclose(self):
+        """确定性释放: 预处理注册 -> 任务 -> STT 流 -> 音频流 -> 上下文"""
+        if self._closed:
+            return
+        self._closed = True
+
+        self._preprocessor.unregister(self.identity)
+
+        current = asyncio.current_task()
+        tasks = [t for t in self._tasks if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self.stt_stream is not None:
+            try:
+                await self.stt_stream.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ 关闭 STT 流失败 ({self.identity}): {e}")
+            self.stt_stream = None
+
+        if self._audio_stream is not None:
+            try:
+                await self._audio_stream.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ 关闭音频流失败 ({self.identity}): {e}")
+            self._audio_stream = None
+
+        self.chat_context = None
+        self._end_callbacks.clear()
+        self._failure_callbacks.clear()
+        self._done.set()
+        logger.info(f"🧹 会话已释放: {self.identity} (存活 {time.monotonic() - self.created_at:.1f}s, {self.turns} 轮)")
+
+    def info(self) -> dict:
+        stats = getattr(self.stt_stream, "queue_stats", None)
+        return {
+            "identity": self.identity,
+            "track_sid": self.track_sid,
+            "age": round(time.monotonic() - self.created_at, 1),
+            "turns": self.turns,
+            "language": self.language,
+            "reasks": self.reasks,
+            "failed": str(self.failed) if self.failed else None,
+            "tasks": sorted(t.get_name() for t in self._tasks),
+            "stt_queue": stats,
+        }
+
+
+class SessionRegistry:
+    """参与者会话注册表 (按 identity 索引)"""
+
+    def __init__(self):
+        self._sessions: Dict[str, ParticipantSession] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, identity: str) -> bool:
+        return identity in self._sessions
+
+    def get(self, identity: str) -> Optional[ParticipantSession]:
+        return self._sessions.get(identity)
+
+    async def open(self, session: ParticipantSession) -> ParticipantSession:
+        """登记并启动会话，同一参与者已有会话时先释放旧的"""
+        old = self._sessions.get(session.identity)
+        if old is not None:
+            await self.close(session.identity)
+
+        self._sessions[session.identity] = session
+        session.start()
+        # 音频轨道自然结束或 STT 不可用时自动释放
+        session.add_end_callback(lambda: self.close_soon(session.identity, session))
+        session.add_failure_callback(lambda: self.close_soon(session.identity, session))
+        return session
+
+    async def attach(
+            self,
+            identity: str,
+            track: rtc.Track,
+            factory: Callable[[rtc.Track], ParticipantSession],
+    ) -> ParticipantSession:
+        """
+        幂等地为 (参与者, 轨道 SID) 建立处理链
+
+        - 同一轨道重复订阅: 直接返回现有会话
+        - 轨道重新发布/参与者重连: 复用 STT 连接，只替换音频输入
+        - 现有会话的 STT 已不可用: 用新会话整体替换
+        同一参与者的并发事件按顺序处理。
+        """
+        lock = self._locks.setdefault(identity, asyncio.Lock())
+        async with lock:
+            current = self._sessions.get(identity)
+            track_sid = getattr(track, "sid", "")
+
+            if current is not None and not current.closed:
+                if current.track_sid == track_sid:
+                    logger.debug(f"忽略重复订阅: {identity} {track_sid}")
+                    return current
+                if current.can_reuse:
+                    await current.replace_track(track)
+                    return current
+
+            return await self.open(factory(track))
+
+    async def close(self, identity: str, session: Optional[ParticipantSession] = None):
+        """释放会话；传入 session 时只在它仍是当前会话时释放"""
+        current = self._sessions.get(identity)
+        if current is None or (session is not None and current is not session):
+            return
+        del self._sessions[identity]
+        lock = self._locks.get(identity)
+        if lock is not None and not lock.locked():
+            del self._locks[identity]
+        await current.aclose()
+
+    def close_soon(self, identity: str, session: Optional[ParticipantSession] = None):
+        """在事件回调中调用: 后台释放会话"""
+        task = asyncio.create_task(self.close(identity, session))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def close_all(self):
+        for identity in list(self._sessions):
+            await self.close(identity)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def snapshot(self) -> list:
+        """当前所有会话的状态 (用于调试/监控)"""
+        return [session.info() for session in self._sessions.values()]
@@ -0,0 +1,161 @@
+# backend/agent/stream_parser.py
+import logging
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from livekit.agents.llm import ChatChunk, FunctionCall
+
+logger = logging.getLogger(__name__)
+
+
+class _ToolCallBuilder:
+    """流式工具调用: 参数分片逐个追加，结束时再拼接"""
+
+    __slots__ = ("call_id", "name", "parts")
+
+    def __init__(self):
+        self.call_id = ""
+        self.name = ""
+        self.parts: List[str] = []
+
+    def build(self) -> FunctionCall:
+        return FunctionCall(
+            call_id=self.call_id or f"call_{uuid.uuid4().hex[:12]}",
+            name=self.name,
+            arguments="".join(self.parts) or "{}"
+        )
+
+
+class StreamParser:
+    """
+    LLM 流式输出解析
+
+    每个流只在第一个块 (以及块类型变化时) 判断一次格式，之后按类型走固定的解析函数；
+    文本用列表累积，工具调用参数分片按序号增量拼接。支持的格式:
+    LiveKit ChatChunk、LiveKit FunctionCall、OpenAI choices[0].delta / message、
+    带 content 属性的对象以及纯字符串。
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._calls: Dict[object, _ToolCallBuilder] = {}
+        self._shape: Optional[type] = None
+        self._handler: Optional[Callable[[object], Optional[str]]] = None
+        self._has_message: Optional[bool] = None
+        self.chunks = 0
+
+    def feed(self, chunk) -> Optional[str]:
+        """解析一个块，返回其中的文本 (没有文本时返回 None)"""
+        self.chunks += 1
+        if type(chunk) is not self._shape:
+            self._shape = type(chunk)
+            self._handler = self._detect(chunk)
+        text = self._handler(chunk)
+        if text:
+            self._parts.append(text)
+            return text
+        return None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def tool_calls(self) -> List[FunctionCall]:
+        """统一为 LiveKit FunctionCall (arguments 为 JSON 字符串)"""
+        return [builder.build() for builder in self._calls.values() if builder.name]
+
+    def _detect(self, chunk) -> Callable[[object], Optional[str]]:
+        if isinstance(chunk, ChatChunk):
+            return self._feed_chat_chunk
+        if isinstance(chunk, FunctionCall):
+            return self._feed_function_call
+        if isinstance(chunk, str):
+            return self._feed_str
+        if hasattr(chunk, "choices"):
+            return self._feed_openai
+        if hasattr(chunk, "delta"):
+            return self._feed_chat_chunk
+        if hasattr(chunk, "content"):
+            return self._feed_content
+        logger.warning(f"⚠️ 未知的 LLM 输出格式: {type(chunk).__name__}")
+        return self._feed_unknown
+
+    def _call(self, key) -> _ToolCallBuilder:
+        builder = self._calls.get(key)
+        if builder is None:
+            builder = self._calls[key] = _ToolCallBuilder()
+        return builder
+
+    # ---- 各格式的解析函数 ----
+
+    def _feed_chat_chunk(self, chunk) -> Optional[str]:
+        delta = chunk.delta
+        if delta is None:
+            return None
+        if delta.tool_calls:
+            for tool_call in delta.tool_calls:
+                builder = self._call(tool_call.call_id or len(self._calls))
+                builder.call_id = tool_call.call_id
+                builder.name = tool_call.name or builder.name
+                if tool_call.arguments:
+                    builder.parts.append(tool_call.arguments)
+        return delta.content
+
+    def _feed_function_call(self, chunk: FunctionCall) -> None:
+        builder = self._call(chunk.call_id or len(self._calls))
+        builder.call_id = chunk.call_id
+        builder.name = chunk.name
+        if chunk.arguments:
+            builder.parts.append(chunk.arguments)
+        return None
+
+    def _feed_openai(self, chunk) -> Optional[str]:
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+
+        # 非流式响应带完整的 message，流式响应只有 delta (每个流判断一次)
+        if self._has_message is None:
+            self._has_message = getattr(choice, "message", None) is not None
+        if self._has_message:
+            message = choice.message
+            self._add_openai_tool_calls(message.tool_calls, complete=True)
+            return message.content
+
+        delta = choice.delta
+        if delta is None:
+            return None
+        if delta.tool_calls:
+            self._add_openai_tool_calls(delta.tool_calls, complete=False)
+        return delta.content
+
+    def _add_openai_tool_calls(self, tool_calls, complete: bool):
+        if not tool_calls:
+            return
+        for position, tool_call in enumerate(tool_calls):
+            # 流式分片按 index 归属到同一个调用，后续分片不再带 id/name
+            index = getattr(tool_call, "index", None)
+            key = ("openai", position if index is None or complete else index)
+            builder = self._call(key)
+            if tool_call.id:
+                builder.call_id = tool_call.id
+            function = tool_call.function
+            if function is None:
+                continue
+            if function.name:
+                builder.name = function.name
+            if function.arguments:
+                builder.parts.append(function.arguments)
+
+    @staticmethod
+    def _feed_content(chunk) -> Optional[str]:
+        return chunk.content
+
+    @staticmethod
+    def _feed_str(chunk: str) -> str:
+        return chunk
+
+    @staticmethod
+    def _feed_unknown(chunk) -> None:
+        return None
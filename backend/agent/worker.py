@@ -0,0 +1,126 @@
+# backend/agent/worker.py
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aiohttp
+
+from core.config import settings
+from core.logger import setup_logger
+from agent.runtime import agent_runtime
+from integrations.http_client import http_clients
+
+logger = setup_logger("agent_worker")
+
+
+class AgentWorker:
+    """
+    Agent worker
+
+    定期向调度器上报容量和正在服务的房间，为分配到的每个房间启动一个 AIAssistant；
+    收到排空指令且房间全部结束后通知调度器并退出。
+    """
+
+    def __init__(
+            self,
+            dispatcher_url: str,
+            worker_id: str,
+            capacity: int = 4,
+            heartbeat_interval: float = 5.0,
+            token: Optional[str] = None,
+            assistant_factory: Optional[Callable[..., object]] = None,
+    ):
+        self.dispatcher_url = dispatcher_url.rstrip("/")
+        self.worker_id = worker_id
+        self.capacity = capacity
+        self.heartbeat_interval = heartbeat_interval
+        self.token = token
+        self._factory = assistant_factory
+        self._rooms: Dict[str, asyncio.Task] = {}
+
+    @property
+    def rooms(self) -> list:
+        return sorted(self._rooms)
+
+    def _create_assistant(self, room: str):
+        if self._factory is None:
+            from agent.assistant import AIAssistant
+            self._factory = AIAssistant
+        return self._factory(room_name=room, leave_when_empty=True)
+
+    def _launch(self, room: str):
+        if room in self._rooms or len(self._rooms) >= self.capacity:
+            return
+        logger.info(f"🏠 加入房间: {room}")
+        task = asyncio.create_task(self._create_assistant(room).start())
+        self._rooms[room] = task
+        task.add_done_callback(lambda _: self._rooms.pop(room, None))
+
+    async def _heartbeat(self, http: aiohttp.ClientSession, leaving: bool = False) -> dict:
+        payload = {
+            "worker_id": self.worker_id,
+            "capacity": self.capacity,
+            "rooms": self.rooms,
+            "leaving": leaving,
+        }
+        headers = {"X-Dispatcher-Token": self.token} if self.token else None
+        async with http.post(f"{self.dispatcher_url}/heartbeat", json=payload, headers=headers) as resp:
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def run(self):
+        logger.info(f"🚀 worker 启动: {self.worker_id} (容量 {self.capacity})")
+        http = http_clients.session
+        try:
+            while True:
+                try:
+                    reply = await self._heartbeat(http)
+                except Exception as e:
+                    logger.warning(f"⚠️ 心跳失败: {e}")
+                    await asyncio.sleep(self.heartbeat_interval)
+                    continue
+
+                for room in reply.get("assign", []):
+                    self._launch(room)
+
+                if reply.get("drain") and not self._rooms:
+                    logger.info("📉 排空完成，worker 退出")
+                    break
+                await asyncio.sleep(self.heartbeat_interval)
+        finally:
+            for task in list(self._rooms.values()):
+                task.cancel()
+            await asyncio.gather(*self._rooms.values(), return_exceptions=True)
+            try:
+                await self._heartbeat(http, leaving=True)
+            except Exception:
+                pass
+
+
+async def main():
+    worker = AgentWorker(
+        settings.DISPATCHER_URL,
+        os.environ.get("WORKER_ID") or f"worker-{uuid.uuid4().hex[:8]}",
+        capacity=settings.WORKER_CAPACITY,
+        heartbeat_interval=settings.WORKER_HEARTBEAT_SECONDS,
+        token=settings.DISPATCHER_TOKEN,
+    )
+    try:
+        # 指标端口、事件循环监控和工具执行器每个进程只启动一次，所有房间共享
+        await agent_runtime.start()
+        await worker.run()
+    finally:
+        await agent_runtime.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("worker 已停止")
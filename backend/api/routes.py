@@ -1,21 +1,24 @@
 # backend/api/routes.py
 
-from fastapi import APIRouter, Query, HTTPException, Depends, status
+from fastapi import APIRouter, Query, HTTPException, Depends, Header, status
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 import logging
 import uuid
+from typing import List, Optional
 from livekit import api
 
 from services.livekit_service import LiveKitService
 from services.auth_service import auth_service
+from services.dispatcher import create_dispatcher
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 livekit_service = LiveKitService()
 security = HTTPBearer()
+dispatcher = create_dispatcher() if settings.DISPATCHER_ENABLED else None
 
 
 # ============ 数据模型 ============
@@ -32,6 +35,14 @@ class LoginResponse(BaseModel):
     user: dict
 
 
+class WorkerHeartbeat(BaseModel):
+    """worker 心跳"""
+    worker_id: str
+    capacity: int
+    rooms: List[str] = []
+    leaving: bool = False
+
+
 # ============ 认证依赖 ============
 async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -49,6 +60,14 @@ async def get_current_user(
     return user
 
 
+def verify_worker(x_dispatcher_token: Optional[str] = Header(None)):
+    """校验 worker 共享密钥 (未配置时不校验)"""
+    if dispatcher is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="调度器未启用")
+    if settings.DISPATCHER_TOKEN and x_dispatcher_token != settings.DISPATCHER_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的 worker 凭证")
+
+
 # ============ 路由 ============
 @router.post("/login", response_model=LoginResponse)
 async def login(request: LoginRequest):
@@ -102,11 +121,15 @@ async def get_token(current_user: dict = Depends(get_current_user)):
 
         logger.info(f"✅ Token 生成成功: room={settings.ROOM_NAME}, user={user_identity}")
 
-        return {
+        result = {
             "token": jwt_token,
             "url": settings.LIVEKIT_URL,
             "room": settings.ROOM_NAME
         }
+        # 为房间安排 Agent (已有 Agent 时不重复分配)
+        if dispatcher is not None:
+            result["agent"] = dispatcher.request_agent(settings.ROOM_NAME)
+        return result
 
     except Exception as e:
         logger.error(f"❌ Token 生成失败: {e}", exc_info=True)
@@ -116,4 +139,22 @@ async def get_token(current_user: dict = Depends(get_current_user)):
 @router.get("/me")
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """获取当前用户信息"""
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+# ============ Agent 调度 ============
+@router.post("/dispatch/heartbeat", dependencies=[Depends(verify_worker)])
+async def worker_heartbeat(heartbeat: WorkerHeartbeat):
+    """worker 上报容量和房间，返回新分配的房间"""
+    return dispatcher.heartbeat(
+        heartbeat.worker_id,
+        heartbeat.capacity,
+        heartbeat.rooms,
+        leaving=heartbeat.leaving
+    )
+
+
+@router.get("/dispatch/status", dependencies=[Depends(verify_worker)])
+async def dispatch_status():
+    """调度器状态"""
+    return dispatcher.stats()
@@ -12,9 +12,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import settings
-from core.logger import logger
+from core.logger import setup_logger
+from api import routes
 from api.routes import router
 
+# 日志处理器挂在根日志器上，路由、调度器等模块的日志都经过后台队列
+logger = setup_logger("voice_assistant")
+
 # 创建 FastAPI 应用
 app = FastAPI(
     title="Voice Assistant API",
@@ -38,6 +42,18 @@ app.add_middleware(
 app.include_router(router, prefix="/api")
 
 
+@app.on_event("startup")
+async def start_dispatcher():
+    if routes.dispatcher is not None:
+        routes.dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_dispatcher():
+    if routes.dispatcher is not None:
+        await routes.dispatcher.aclose()
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,7 @@
+from .resampler import PolyphaseResampler, resample_batch
+from .preprocess import AudioPreprocessor
+from .frame_queue import BoundedFrameQueue, OverflowPolicy
+from .encoder import AudioEncoding, EncoderStage, OggOpusEncoder, PCMEncoder, encoder_factory
+
+__all__ = ['PolyphaseResampler', 'resample_batch', 'AudioPreprocessor', 'BoundedFrameQueue', 'OverflowPolicy',
+           'AudioEncoding', 'EncoderStage', 'OggOpusEncoder', 'PCMEncoder', 'encoder_factory']
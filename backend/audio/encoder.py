@@ -0,0 +1,198 @@
+# backend/audio/encoder.py
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    import av
+except ImportError:  # pragma: no cover - PyAV 为可选依赖
+    av = None
+
+logger = logging.getLogger(__name__)
+
+
+class AudioEncoding(str, Enum):
+    """STT 上行音频格式 (对应 dashscope run-task 的 format 参数)"""
+    PCM = "pcm"
+    OPUS = "opus"
+
+
+class PCMEncoder:
+    """原始 16 位 PCM，直接发送"""
+
+    encoding = AudioEncoding.PCM
+
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm
+
+    def flush(self) -> bytes:
+        return b""
+
+    def close(self):
+        pass
+
+
+class _Sink:
+    """PyAV 输出目标: 收集封装器写出的字节"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class OggOpusEncoder:
+    """
+    Ogg Opus 流式编码器
+
+    一个实例对应一个 Ogg 流 (一次 run-task)：编码器和封装器状态跨帧复用，
+    每 page_ms 输出一个 Ogg 页，避免封装器攒满默认的 1 秒再发送。
+    取消的编码调用可能仍在线程池中执行，编码与关闭之间用锁互斥。
+    """
+
+    encoding = AudioEncoding.OPUS
+
+    def __init__(self, sample_rate: int = 16000, bitrate: int = 24000, page_ms: int = 20):
+        if av is None:
+            raise RuntimeError("Opus encoding requires PyAV (pip install av)")
+        self.sample_rate = sample_rate
+        self._sink = _Sink()
+        self._container = av.open(self._sink, mode="w", format="ogg",
+                                  options={"page_duration": str(page_ms * 1000)})
+        self._stream = self._container.add_stream("libopus", rate=sample_rate, layout="mono")
+        self._stream.bit_rate = bitrate
+        self._pts = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def encode(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = self.sample_rate
+        with self._lock:
+            if self._closed:
+                return b""
+            frame.pts = self._pts
+            self._pts += len(samples)
+            for packet in self._stream.encode(frame):
+                self._container.mux(packet)
+            return self._sink.take()
+
+    def flush(self) -> bytes:
+        """输出编码器中剩余的音频并写入流结束页"""
+        with self._lock:
+            if self._closed:
+                return b""
+            self._closed = True
+            for packet in self._stream.encode(None):
+                self._container.mux(packet)
+            self._container.close()
+            return self._sink.take()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                self._container.close()
+            except Exception:
+                pass
+
+
+def encoder_factory(encoding: str, sample_rate: int = 16000, bitrate: int = 24000) -> partial:
+    """按配置返回编码器构造函数，Opus 不可用时回退到 PCM (编码格式可从 factory.func.encoding 读取)"""
+    encoding = AudioEncoding(encoding)
+    if encoding == AudioEncoding.OPUS:
+        if av is not None:
+            return partial(OggOpusEncoder, sample_rate=sample_rate, bitrate=bitrate)
+        logger.warning("⚠️ 未安装 PyAV，STT 音频改用 PCM 发送")
+    return partial(PCMEncoder)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _shared_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audio-enc")
+    return _executor
+
+
+class EncoderStage:
+    """
+    一路流的编码阶段
+
+    编码在共享线程池中执行；同一路流的调用依次 await，保证顺序并复用编码器状态。
+    reset() 开始一个新的编码流 (重连后的新 run-task 需要新的 Ogg 头)。
+    """
+
+    def __init__(self, factory: Callable[[], object], max_workers: int = 2):
+        self._factory = factory
+        self._encoder = factory()
+        self._used = False
+        self._executor = _shared_executor(max_workers)
+        self.encoding = self._encoder.encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def _timed(self, fn, *args) -> bytes:
+        started = time.thread_time()
+        data = fn(*args)
+        self.cpu_seconds += time.thread_time() - started
+        return data
+
+    async def encode(self, pcm: bytes) -> bytes:
+        self._used = True
+        self.bytes_in += len(pcm)
+        if self.encoding == AudioEncoding.PCM:
+            data = pcm
+        else:
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed, self._encoder.encode, pcm)
+        self.bytes_out += len(data)
+        return data
+
+    async def flush(self) -> bytes:
+        self._used = True
+        if self.encoding == AudioEncoding.PCM:
+            return b""
+        data = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._timed, self._encoder.flush)
+        self.bytes_out += len(data)
+        return data
+
+    def reset(self):
+        if not self._used:
+            return
+        self._encoder.close()
+        self._encoder = self._factory()
+        self._used = False
+
+    def close(self):
+        self._encoder.close()
+
+    def stats(self) -> dict:
+        return {
+            "encoding": self.encoding.value,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0,
+            "cpu_seconds": round(self.cpu_seconds, 4),
+        }
@@ -0,0 +1,164 @@
+# backend/audio/frame_queue.py
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Deque, Optional, Tuple
+
+import numpy as np
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(str, Enum):
+    """队列满时的处理策略"""
+    DROP_OLDEST = "drop_oldest"  # 丢弃最旧的帧
+    DROP_SILENCE = "drop_silence"  # 优先丢弃静音帧，没有静音帧再丢最旧的
+    BLOCK = "block"  # 阻塞生产者 (需使用 await put())
+
+
+class BoundedFrameQueue:
+    """
+    有界音频帧队列
+
+    按音频时长 (毫秒) 限制容量，超限时按策略丢帧或阻塞生产者，
+    并记录队列深度、丢帧数和过载次数。
+    """
+
+    def __init__(
+            self,
+            max_ms: int = 3000,
+            policy: OverflowPolicy = OverflowPolicy.DROP_SILENCE,
+            silence_rms: float = 300.0,
+            name: str = "audio",
+    ):
+        self.max_ms = max_ms
+        self.policy = OverflowPolicy(policy)
+        self.silence_rms = silence_rms
+        self.name = name
+        # (帧, 是否静音, 时长 ms)
+        self._frames: Deque[Tuple[rtc.AudioFrame, bool, float]] = deque()
+        self._depth_ms = 0.0
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+        self.dropped = 0
+        self.dropped_ms = 0.0
+        self.overloads = 0
+        self._overloaded = False
+        self._overload_started = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._frames)
+
+    @property
+    def depth_ms(self) -> float:
+        return self._depth_ms
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "policy": self.policy.value,
+            "depth": self.depth,
+            "depth_ms": round(self._depth_ms, 1),
+            "max_ms": self.max_ms,
+            "dropped": self.dropped,
+            "dropped_ms": round(self.dropped_ms, 1),
+            "overloads": self.overloads,
+        }
+
+    def _is_silent(self, frame: rtc.AudioFrame) -> bool:
+        if self.policy != OverflowPolicy.DROP_SILENCE:
+            return False
+        samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+        return bool(np.sqrt(np.mean(samples * samples)) < self.silence_rms) if len(samples) else True
+
+    def _drop_one(self):
+        index = 0
+        if self.policy == OverflowPolicy.DROP_SILENCE:
+            index = next((i for i, item in enumerate(self._frames) if item[1]), 0)
+        _, _, ms = self._frames[index]
+        del self._frames[index]
+        self._depth_ms -= ms
+        self.dropped += 1
+        self.dropped_ms += ms
+
+    def _enter_overload(self):
+        if not self._overloaded:
+            self._overloaded = True
+            self._overload_started = time.monotonic()
+            self.overloads += 1
+            logger.warning(
+                f"⚠️ 音频队列过载: {self.name} "
+                f"(深度 {self._depth_ms:.0f}ms / {self.max_ms}ms, 策略 {self.policy.value})"
+            )
+
+    def _leave_overload(self):
+        if self._overloaded and self._depth_ms <= self.max_ms / 2:
+            self._overloaded = False
+            logger.info(
+                f"✅ 音频队列恢复: {self.name} "
+                f"(持续 {time.monotonic() - self._overload_started:.1f}s, 累计丢弃 {self.dropped} 帧)"
+            )
+
+    def put_nowait(self, frame: rtc.AudioFrame):
+        """
+        放入一帧
+
+        Raises:
+            asyncio.QueueFull: BLOCK 策略下队列已满
+        """
+        if self._closed:
+            return
+
+        ms = frame.samples_per_channel * 1000 / frame.sample_rate
+        if self._frames and self._depth_ms + ms > self.max_ms:
+            self._enter_overload()
+            if self.policy == OverflowPolicy.BLOCK:
+                self._writable.clear()
+                raise asyncio.QueueFull()
+            while self._frames and self._depth_ms + ms > self.max_ms:
+                self._drop_one()
+
+        self._frames.append((frame, self._is_silent(frame), ms))
+        self._depth_ms += ms
+        self._readable.set()
+
+    async def put(self, frame: rtc.AudioFrame):
+        """放入一帧，BLOCK 策略下队列满时等待消费者"""
+        while True:
+            try:
+                return self.put_nowait(frame)
+            except asyncio.QueueFull:
+                await self._writable.wait()
+                if self._closed:
+                    return
+
+    async def get(self) -> Optional[rtc.AudioFrame]:
+        """取出一帧，队列关闭且已取空时返回 None"""
+        while not self._frames:
+            if self._closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+
+        frame, _, ms = self._frames.popleft()
+        self._depth_ms -= ms
+        self._leave_overload()
+        self._writable.set()
+        return frame
+
+    def close(self):
+        """关闭队列，剩余帧仍可取出"""
+        self._closed = True
+        self._readable.set()
+        self._writable.set()
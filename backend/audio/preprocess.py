@@ -0,0 +1,268 @@
+# backend/audio/preprocess.py
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from livekit import rtc
+
+from .frame_queue import BoundedFrameQueue, OverflowPolicy
+from .resampler import PolyphaseResampler, resample_batch
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _StreamState:
+    """单路流的预处理状态 (只在工作线程中读写)"""
+    queue: BoundedFrameQueue
+    resampler: PolyphaseResampler
+    pending: List[rtc.AudioFrame] = field(default_factory=list)
+    dc: float = 0.0
+    gain: float = 1.0
+    # 最近一帧的 (采样率, 声道数)
+    format: Optional[Tuple[int, int]] = None
+    format_changes: int = 0
+
+
+class AudioPreprocessor:
+    """
+    多路音频批量预处理
+
+    每个 tick 收集所有参与者的待处理帧，按工作线程数分成几个 NumPy 批次，
+    在线程池中并行完成重采样、去直流和增益归一化，再把结果放回各自的输出队列。
+    NumPy 的大块运算会释放 GIL，事件循环只负责收发帧。
+    """
+
+    def __init__(
+            self,
+            output_rate: int = 16000,
+            tick_ms: int = 20,
+            max_workers: int = 2,
+            target_rms: float = 3000.0,
+            max_gain: float = 4.0,
+            noise_floor: float = 200.0,
+            queue_max_ms: int = 3000,
+    ):
+        self.output_rate = output_rate
+        self.tick = tick_ms / 1000
+        self.target_rms = target_rms
+        self.max_gain = max_gain
+        self.noise_floor = noise_floor
+        self.queue_max_ms = queue_max_ms
+        self.max_workers = max_workers
+        self._streams: Dict[str, _StreamState] = {}
+        # 已注销、等待最后一批处理的流
+        self._closing: List[_StreamState] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audio-pre")
+        self._task: Optional[asyncio.Task] = None
+        self.last_batch_ms = 0.0
+        # 已注销流的格式变化次数
+        self._closed_format_changes = 0
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self._streams),
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "format_changes": self._closed_format_changes + sum(
+                state.format_changes for state in [*self._streams.values(), *self._closing]
+            ),
+        }
+
+    def register(self, stream_id: str) -> BoundedFrameQueue:
+        """注册一路流，返回其输出队列 (流结束时关闭，get() 返回 None)"""
+        state = _StreamState(
+            queue=BoundedFrameQueue(
+                max_ms=self.queue_max_ms,
+                policy=OverflowPolicy.DROP_OLDEST,
+                name=f"preprocess-{stream_id}"
+            ),
+            resampler=PolyphaseResampler(output_rate=self.output_rate)
+        )
+        self._streams[stream_id] = state
+        return state.queue
+
+    def unregister(self, stream_id: str):
+        """注销一路流: 剩余帧和重采样器尾部在下一批处理后输出，随后关闭输出队列"""
+        state = self._streams.pop(stream_id, None)
+        if state is None:
+            return
+        if self._task is None or self._task.done():
+            state.queue.close()
+            return
+        self._closing.append(state)
+
+    def submit(self, stream_id: str, frame: rtc.AudioFrame):
+        """提交一帧原始音频 (事件循环中调用，只做追加)"""
+        state = self._streams.get(stream_id)
+        if state:
+            state.pending.append(frame)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for state in [*self._streams.values(), *self._closing]:
+            state.queue.close()
+        self._streams.clear()
+        self._closing.clear()
+        self._executor.shutdown(wait=False)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.tick)
+
+            closing, self._closing = self._closing, []
+            # (状态, 待处理帧, 是否最后一批)；在这里确定是否最后一批，处理期间注销的流在下一批冲刷
+            items = [(state, state.pending, False) for state in self._streams.values() if state.pending]
+            items += [(state, state.pending, True) for state in closing]
+            if not items:
+                continue
+            for state, _, _ in items:
+                state.pending = []
+
+            # 每个工作线程处理一部分流，同一条流只在一个线程中处理
+            size = -(-len(items) // self.max_workers)
+            chunks = [items[i:i + size] for i in range(0, len(items), size)]
+            started = time.perf_counter()
+            try:
+                outputs = await asyncio.gather(*(
+                    loop.run_in_executor(self._executor, self._process_batch, chunk) for chunk in chunks
+                ))
+            except Exception as e:
+                logger.error(f"❌ 音频预处理失败: {e}", exc_info=True)
+                outputs = [[None] * len(chunk) for chunk in chunks]
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+            for (state, _, _), frame in zip(items, (frame for output in outputs for frame in output)):
+                if frame is not None:
+                    state.queue.put_nowait(frame)
+            for state in closing:
+                self._closed_format_changes += state.format_changes
+                state.queue.close()
+
+    def _process_batch(self, batch) -> List[Optional[rtc.AudioFrame]]:
+        """工作线程: 重采样 -> 去直流 -> 增益归一化"""
+        states = [state for state, _, _ in batch]
+        runs = [self._split_runs(state, frames) for state, frames, _ in batch]
+        resampled: List[List[rtc.AudioFrame]] = [[] for _ in batch]
+        # 格式未变化的流走批量重采样
+        active = [
+            i for i, r in enumerate(runs)
+            if len(r) == 1 and states[i].resampler.input_rate in (None, r[0].sample_rate)
+        ]
+        outputs = resample_batch([states[i].resampler for i in active], [runs[i][0] for i in active])
+        for i, out in zip(active, outputs):
+            resampled[i] = out
+        for i, r in enumerate(runs):
+            if r and i not in active:
+                out = self._resample_runs(states[i].resampler, r)
+                resampled[i] = [_merge(out)] if out else []
+        for i, (state, _, final) in enumerate(batch):
+            if final:
+                # 流结束: 冲刷重采样器滤波器中剩余的尾部样本
+                out = resampled[i] + state.resampler.flush()
+                resampled[i] = [_merge(out)] if out else []
+
+        samples = [
+            np.frombuffer(out[0].data, dtype=np.int16).astype(np.float32) if out else None
+            for out in resampled
+        ]
+
+        # 输出长度相同的流合并成矩阵统一处理
+        groups: Dict[int, List[int]] = {}
+        for i, x in enumerate(samples):
+            if x is not None and len(x):
+                groups.setdefault(len(x), []).append(i)
+
+        results: List[Optional[rtc.AudioFrame]] = [None] * len(batch)
+        for length, members in groups.items():
+            x = np.stack([samples[i] for i in members])
+            dc = np.array([states[i].dc for i in members], dtype=np.float32)
+            gain = np.array([states[i].gain for i in members], dtype=np.float32)
+
+            # 去直流: 帧均值的指数滑动平均作为直流估计
+            dc += 0.1 * (x.mean(axis=1) - dc)
+            x -= dc[:, None]
+
+            # 增益归一化: 语音帧向目标 RMS 靠拢，静音帧增益回落到 1
+            rms = np.sqrt(np.mean(x * x, axis=1))
+            target = np.where(
+                rms > self.noise_floor,
+                np.clip(self.target_rms / np.maximum(rms, 1.0), 1.0 / self.max_gain, self.max_gain),
+                1.0
+            ).astype(np.float32)
+            new_gain = gain + 0.2 * (target - gain)
+            ramp = np.linspace(0.0, 1.0, length, dtype=np.float32)
+            x *= gain[:, None] + (new_gain - gain)[:, None] * ramp[None, :]
+
+            out = np.clip(np.rint(x), -32768, 32767).astype(np.int16)
+            for row, i in enumerate(members):
+                states[i].dc = float(dc[row])
+                states[i].gain = float(new_gain[row])
+                results[i] = rtc.AudioFrame(
+                    data=out[row].tobytes(),
+                    sample_rate=self.output_rate,
+                    num_channels=1,
+                    samples_per_channel=length
+                )
+
+        return results
+
+    @staticmethod
+    def _split_runs(state: _StreamState, frames: List[rtc.AudioFrame]) -> List[rtc.AudioFrame]:
+        """按 (采样率, 声道数) 把连续的同格式帧拼成一段，格式变化时开始新的一段"""
+        runs: List[rtc.AudioFrame] = []
+        group: List[rtc.AudioFrame] = []
+        for frame in frames:
+            fmt = (frame.sample_rate, frame.num_channels)
+            if fmt != state.format:
+                if state.format is not None:
+                    state.format_changes += 1
+                    logger.info(
+                        f"🔄 音频格式变化: {state.queue.name} "
+                        f"{state.format[0]}Hz/{state.format[1]}ch -> {fmt[0]}Hz/{fmt[1]}ch"
+                    )
+                if group:
+                    runs.append(_merge(group))
+                    group = []
+                state.format = fmt
+            group.append(frame)
+        if group:
+            runs.append(_merge(group))
+        return runs
+
+    @staticmethod
+    def _resample_runs(resampler: PolyphaseResampler, runs: List[rtc.AudioFrame]) -> List[rtc.AudioFrame]:
+        """逐段重采样；采样率变化前先冲刷旧滤波器中的尾部样本"""
+        out: List[rtc.AudioFrame] = []
+        for run in runs:
+            if resampler.input_rate not in (None, run.sample_rate):
+                out += resampler.flush()
+            out += resampler.push(run)
+        return out
+
+
+def _merge(frames: List[rtc.AudioFrame]) -> rtc.AudioFrame:
+    """把同一路流同一格式的多帧拼成一帧"""
+    if len(frames) == 1:
+        return frames[0]
+    first = frames[0]
+    return rtc.AudioFrame(
+        data=b"".join(f.data.tobytes() for f in frames),
+        sample_rate=first.sample_rate,
+        num_channels=first.num_channels,
+        samples_per_channel=sum(f.samples_per_channel for f in frames)
+    )
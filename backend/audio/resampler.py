@@ -0,0 +1,240 @@
+# backend/audio/resampler.py
+import logging
+from math import gcd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+
+def design_polyphase_filter(up: int, down: int, taps_per_phase: int = 32, beta: float = 8.0) -> np.ndarray:
+    """
+    设计多相低通滤波器
+
+    Args:
+        up: 上采样倍数 L
+        down: 下采样倍数 M
+        taps_per_phase: 每个相位的抽头数
+        beta: Kaiser 窗参数
+
+    Returns:
+        形状为 (L, taps_per_phase) 的滤波器组，第 k 列对应 x[n - k]
+    """
+    num_taps = up * taps_per_phase
+    # 截止频率取输入/输出较低 Nyquist 的 0.9 倍，留出过渡带
+    cutoff = 0.9 * 0.5 / max(up, down)
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(num_taps, beta)
+    prototype *= up / prototype.sum()
+
+    # h[p, k] = prototype[k * L + p]
+    return prototype.reshape(taps_per_phase, up).T.astype(np.float32).copy()
+
+
+class PolyphaseResampler:
+    """
+    基于 NumPy 的流式多相重采样器
+
+    - 输入采样率从每个 AudioFrame 读取，变化时自动重建滤波器
+    - 多声道输入先下混为单声道
+    - 历史样本与输入缓冲区预分配，推帧时不产生额外的大块内存分配
+    """
+
+    def __init__(
+            self,
+            output_rate: int = 16000,
+            input_rate: Optional[int] = None,
+            taps_per_phase: int = 32,
+            max_frame_samples: int = 4800
+    ):
+        self.output_rate = output_rate
+        self.taps_per_phase = taps_per_phase
+        self.input_rate: Optional[int] = None
+        self._max_frame_samples = max_frame_samples
+        self._up = 1
+        self._down = 1
+        self._filters: Optional[np.ndarray] = None
+        self._history = taps_per_phase - 1
+        # 缓冲区布局: [历史样本 | 当前帧]
+        self._buffer = np.zeros(self._history + max_frame_samples, dtype=np.float32)
+        # 下一个输出样本在"上采样坐标"中相对当前帧起点的位置
+        self._offset = 0
+        self._plans: Dict[Tuple[int, int], tuple] = {}
+        if input_rate:
+            self._configure(input_rate)
+
+    def _configure(self, input_rate: int):
+        g = gcd(input_rate, self.output_rate)
+        self._up = self.output_rate // g
+        self._down = input_rate // g
+        self._filters = _filter_cache(self._up, self._down, self.taps_per_phase)
+        self._plans = {}
+        self.input_rate = input_rate
+        self._buffer[:self._history] = 0.0
+        self._offset = 0
+        logger.debug(f"重采样器配置: {input_rate}Hz -> {self.output_rate}Hz (L={self._up}, M={self._down})")
+
+    def _ensure_capacity(self, num_samples: int):
+        if num_samples > self._max_frame_samples:
+            self._max_frame_samples = num_samples
+            buffer = np.zeros(self._history + num_samples, dtype=np.float32)
+            buffer[:self._history] = self._buffer[:self._history]
+            self._buffer = buffer
+
+    @staticmethod
+    def to_mono(frame: rtc.AudioFrame) -> np.ndarray:
+        """AudioFrame -> float32 单声道样本"""
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        if frame.num_channels > 1:
+            return samples.reshape(-1, frame.num_channels).mean(axis=1, dtype=np.float32)
+        return samples.astype(np.float32)
+
+    def _plan(self, num_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算本帧的 gather 下标矩阵与逐样本滤波系数
+
+        帧长固定时 (帧长, 相位偏移) 只有少数几种组合，结果按组合缓存复用。
+        """
+        key = (num_samples, self._offset)
+        plan = self._plans.get(key)
+        if plan is None:
+            total = num_samples * self._up
+            count = max(0, -(-(total - self._offset) // self._down))
+            positions = self._offset + np.arange(count, dtype=np.int64) * self._down
+            index = self._history + positions // self._up
+            # (T, K) 下标矩阵: x[i], x[i-1], ..., x[i-K+1]
+            gather = index[:, None] - np.arange(self.taps_per_phase)[None, :]
+            coef = self._filters[positions % self._up]
+            plan = self._plans[key] = (gather, coef, self._offset + count * self._down - total)
+        gather, coef, self._offset = plan
+        return gather, coef
+
+    def _load(self, samples: np.ndarray) -> int:
+        """把当前帧写入预分配缓冲区"""
+        if self._filters is None:
+            raise RuntimeError("resampler not configured")
+        n = len(samples)
+        self._ensure_capacity(n)
+        self._buffer[self._history:self._history + n] = samples
+        return n
+
+    def _advance(self, n: int):
+        """保留最后的历史样本"""
+        self._buffer[:self._history] = self._buffer[n:n + self._history]
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """重采样一段 float32 单声道样本，返回 int16"""
+        n = self._load(samples)
+        gather, coef = self._plan(n)
+        out = _apply(self._buffer[None, :self._history + n], gather, coef)[0]
+        self._advance(n)
+        return out
+
+    def push(self, frame: rtc.AudioFrame) -> List[rtc.AudioFrame]:
+        """推入一帧音频，返回重采样后的帧 (与 rtc.AudioResampler.push 接口一致)"""
+        if frame.sample_rate != self.input_rate:
+            self._configure(frame.sample_rate)
+
+        out = self.process(self.to_mono(frame))
+        if len(out) == 0:
+            return []
+        return [self._make_frame(out)]
+
+    def flush(self) -> List[rtc.AudioFrame]:
+        """冲刷滤波器中剩余的样本"""
+        if self.input_rate is None:
+            return []
+        out = self.process(np.zeros(self._history, dtype=np.float32))
+        self._buffer[:self._history] = 0.0
+        self._offset = 0
+        if len(out) == 0:
+            return []
+        return [self._make_frame(out)]
+
+    def _make_frame(self, samples: np.ndarray) -> rtc.AudioFrame:
+        return rtc.AudioFrame(
+            data=samples.tobytes(),
+            sample_rate=self.output_rate,
+            num_channels=1,
+            samples_per_channel=len(samples)
+        )
+
+
+def _apply(buffers: np.ndarray, gather: np.ndarray, coef: np.ndarray) -> np.ndarray:
+    """
+    对一批缓冲区执行多相滤波
+
+    Args:
+        buffers: (B, N) 输入缓冲区
+        gather: (T, K) 每个输出样本用到的输入下标
+        coef: (T, K) 每个输出样本对应相位的滤波系数
+    """
+    out = np.einsum('btk,tk->bt', buffers[:, gather], coef)
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+_FILTERS: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+
+def _filter_cache(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    key = (up, down, taps_per_phase)
+    filters = _FILTERS.get(key)
+    if filters is None:
+        filters = _FILTERS[key] = design_polyphase_filter(up, down, taps_per_phase)
+    return filters
+
+
+def resample_batch(
+        resamplers: Sequence[PolyphaseResampler],
+        frames: Sequence[rtc.AudioFrame]
+) -> List[List[rtc.AudioFrame]]:
+    """
+    一次调用批量重采样多个参与者的音频帧
+
+    采样率、帧长与相位状态相同的流合并成一个 (B, N) 矩阵，
+    只做一次 gather + einsum；其余流逐个处理。
+
+    Returns:
+        与输入顺序一致的输出帧列表
+    """
+    results: List[List[rtc.AudioFrame]] = [[] for _ in frames]
+    groups: Dict[tuple, List[int]] = {}
+
+    for i, (resampler, frame) in enumerate(zip(resamplers, frames)):
+        if frame.sample_rate != resampler.input_rate:
+            resampler._configure(frame.sample_rate)
+        key = (
+            resampler.input_rate,
+            resampler.output_rate,
+            resampler.taps_per_phase,
+            frame.samples_per_channel,
+            resampler._offset,
+        )
+        groups.setdefault(key, []).append(i)
+
+    for members in groups.values():
+        first = resamplers[members[0]]
+        if len(members) == 1:
+            results[members[0]] = first.push(frames[members[0]])
+            continue
+
+        n = 0
+        for i in members:
+            n = resamplers[i]._load(PolyphaseResampler.to_mono(frames[i]))
+
+        gather, coef = first._plan(n)
+        for i in members[1:]:
+            resamplers[i]._offset = first._offset
+
+        width = first._history + n
+        batch = np.stack([resamplers[i]._buffer[:width] for i in members])
+        out = _apply(batch, gather, coef)
+
+        for row, i in enumerate(members):
+            resamplers[i]._advance(n)
+            if out.shape[1]:
+                results[i] = [resamplers[i]._make_frame(out[row])]
+
+    return results
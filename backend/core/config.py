@@ -14,6 +14,9 @@ class Settings(BaseSettings):
     API_PORT: int = 8000
     LOG_LEVEL: str = "INFO"
     LOG_DIR: str = "logs"
+    LOG_JSON: bool = False  # 文件日志使用 JSON Lines 格式
+    LOG_QUEUE_SIZE: int = 10000  # 日志队列上限，满时丢弃并计数
+    LOG_DEBUG_RATE: float = 50.0  # DEBUG 日志每秒最多条数（0 不限制）
 
     # ============ LiveKit 配置 ============
     LIVEKIT_URL: str = "wss://keiu-zw85ymix.livekit.cloud"
@@ -24,10 +27,113 @@ class Settings(BaseSettings):
     # ============ AI Agent 配置 ============
     AGENT_IDENTITY: str = "voice-assistant-ai"
 
+    # Agent 配置（默认配置由以下字段构造；多产品时用 JSON 文件按房间名选择配置）
+    AGENT_PROFILES_PATH: Optional[str] = None  # 可选: {"profiles": {...}, "rooms": {"<房间名模式>": "<配置名>"}}
+    AGENT_DEFAULT_PROFILE: str = "default"
+    AGENT_SYSTEM_PROMPT: str = (
+        "你是一个智能语音助手。"
+        "当用户询问天气时，使用 get_weather 工具获取实时信息。"
+        "用简洁友好的语气回答，直接说出温度和天气状况，不要说'根据查询结果'之类的话。"
+    )
+    STT_MODEL: str = "paraformer-realtime-v2"
+    STT_LANGUAGE: str = "zh-CN"
+    STT_LANGUAGE_HINTS: str = "zh"  # 逗号分隔
+    STT_DETECT_LANGUAGES: str = ""  # 逗号分隔的候选语言（如 zh,en,ja），非空时按前几秒识别结果自动判定语言
+    TTS_VOICES: str = ""  # 按语言选择音色，如 en=loongstella,ja=loongtomoka（未列出的语言使用 TTS_VOICE）
+    TTS_MODEL: str = "cosyvoice-v1"
+    TTS_VOICE: str = "longxiaochun"
+
+    # 工具调用填充音频（掩盖工具等待时间）
+    FILLER_ENABLED: bool = True
+    FILLER_TEXT: str = "我查一下"
+    FILLER_LATENCY_THRESHOLD: float = 0.8  # 预计耗时超过该值（秒）才播放
+    FILLER_DEFAULT_LATENCY: float = 1.0  # 没有历史记录时的预计耗时（秒）
+
+    # 工具模块（逗号分隔，首次调用工具时导入；也可通过 entry point voice_assistant.tools 注册）
+    TOOL_MODULES: str = "integrations.tools.weather"
+    TOOL_CACHE_MAX_BYTES: int = 4 * 1024 * 1024  # 工具结果缓存内存上限
+    TOOL_CACHE_PATH: Optional[str] = None  # 可选: SQLite 文件路径，缓存跨重启保留
+    TOOL_DEFAULT_TIMEOUT: float = 10.0  # 工具未声明 timeout 时的执行截止时间（秒）
+    TOOL_PROCESS_WORKERS: int = 2  # CPU 密集型工具的进程池大小
+
+    # 音频批量预处理（重采样 + 去直流 + 增益归一化）
+    AUDIO_PREPROCESS_TICK_MS: int = 20
+    AUDIO_PREPROCESS_WORKERS: int = 2
+
+    # STT 输入队列（有界，防止后端变慢时内存无限增长）
+    STT_QUEUE_MAX_MS: int = 3000
+    STT_QUEUE_POLICY: str = "drop_silence"  # 可选: drop_oldest, drop_silence, block
+
+    # STT 上行音频编码（opus 约为 PCM 的 1/10 带宽，编码在线程池中执行）
+    STT_AUDIO_FORMAT: str = "pcm"  # 可选: pcm, opus
+    STT_OPUS_BITRATE: int = 24000
+    STT_ENCODE_WORKERS: int = 2
+
+    # STT 低置信度重问（模型返回置信度时生效，不调用 LLM，直接请用户再说一遍）
+    STT_REASK_CONFIDENCE: float = 0.4  # 最终结果置信度低于该值时重问（0 关闭）
+    STT_REASK_TEXT: str = "抱歉，我没听清，能再说一遍吗？"
+
+    # STT 断线重连
+    STT_MAX_RECONNECTS: int = 5
+    STT_REPLAY_MS: int = 10000  # 重连时可重放的最近音频时长
+
+    # 外部调用容错（截止时间 / 重试 / 对冲 / 熔断）
+    STT_CONNECT_TIMEOUT: float = 5.0  # WebSocket 建连截止时间（秒）
+    STT_START_TIMEOUT: float = 10.0  # 等待 task-started 的截止时间（秒）
+    LLM_FIRST_TOKEN_TIMEOUT: float = 8.0  # 所有请求都没有首 token 时判定失败（秒）
+    TTS_FIRST_FRAME_TIMEOUT: float = 5.0  # TTS 首帧截止时间（秒）
+    TTS_HEDGE_AFTER_MS: int = 1500  # TTS 首帧超过该值再发一个合成请求（0 关闭）
+    BREAKER_FAILURE_THRESHOLD: int = 3  # 连续失败次数达到该值时熔断
+    BREAKER_RESET_SECONDS: float = 30.0  # 熔断后多久放行探测请求
+    RETRY_ATTEMPTS: int = 2  # LLM/TTS 请求在首个结果之前失败时的总尝试次数
+    RETRY_BASE_DELAY_MS: int = 200  # 重试退避基数（毫秒，指数退避带全抖动）
+    METRICS_PORT: int = 0  # Prometheus 指标端口（0 不导出）
+
+    # 共享 HTTP 连接池（TTS / STT / 工具共用，WebSocket 流也计入连接数）
+    HTTP_POOL_LIMIT: int = 200  # 总连接数上限
+    HTTP_POOL_LIMIT_PER_HOST: int = 64  # 每个主机的连接数上限
+    HTTP_DNS_CACHE_TTL: int = 300  # DNS 缓存时间（秒）
+    HTTP_KEEPALIVE_SECONDS: float = 30.0  # 空闲连接保留时间（秒）
+
+    # 事件循环监控（调度延迟 / 阻塞回调调用栈 / 运行时采样分析）
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_SLOW_MS: int = 100  # 事件循环阻塞超过该值时记录调用栈
+    LOOP_MONITOR_PORT: int = 0  # 调试 HTTP 接口端口（0 不启动），提供 /debug/loop 等
+    LOOP_MONITOR_HOST: str = "127.0.0.1"  # 调试接口会暴露调用栈，默认只监听本机
+
+    # 对话存储（写后缓冲，批量写入本地 SQLite）
+    CONVERSATION_STORE_ENABLED: bool = True
+    CONVERSATION_DB_PATH: str = "data/conversations.sqlite3"
+    CONVERSATION_FLUSH_INTERVAL: float = 1.0  # 批量写入间隔（秒）
+    CONVERSATION_HISTORY_TURNS: int = 20  # 参与者重连时恢复的最近记录条数
+
+    # 问题录制（输入/输出音频、STT 事件、LLM 输出、工具调用按单调时间写入二进制文件，可用 agent.replay 重放）
+    RECORDING_ENABLED: bool = False  # 会记录用户语音，只在排查问题时开启
+    RECORDING_DIR: str = "recordings"  # 每个房间一个文件: <房间名>-<时间>.rec
+
+    # ============ Agent 调度配置 ============
+    DISPATCHER_ENABLED: bool = False  # API 进程负责为房间分配 Agent worker（只能单进程运行）
+    DISPATCHER_URL: str = "http://127.0.0.1:8000/api/dispatch"  # worker 心跳地址
+    DISPATCHER_TOKEN: Optional[str] = None  # 可选: worker 心跳校验用的共享密钥
+    WORKER_CAPACITY: int = 4  # 每个 worker 最多同时服务的房间数
+    WORKER_HEARTBEAT_SECONDS: float = 5.0  # 心跳间隔，超过 3 倍未上报视为下线
+    WORKER_AUTOSCALE: bool = False  # 按利用率在本机启动/停止 worker 进程
+    WORKER_TARGET_UTILIZATION: float = 0.7  # 目标利用率（已分配房间 / 总容量）
+    WORKER_MIN: int = 0
+    WORKER_MAX: int = 4
+
     # ============ 阿里云通义千问配置 ============
     DASHSCOPE_API_KEY: str  # 通义千问 API Key
     QWEN_MODEL: str = "qwen-turbo"  # 可选: qwen-turbo, qwen-plus, qwen-max
 
+    # ============ LLM 路由配置 ============
+    LLM_MODELS: str = "qwen-turbo,qwen-plus"  # 逗号分隔，按首 token 延迟自动选择
+    LLM_HEDGE_AFTER_MS: int = 1500  # 首 token 超过该值向次优后端发对冲请求（0 关闭）
+    LLM_STUB_FALLBACK: bool = True  # 所有后端失败时返回本地固定回复
+    OPENAI_COMPAT_BASE_URL: Optional[str] = None  # 可选: 任意 OpenAI 兼容接口
+    OPENAI_COMPAT_API_KEY: Optional[str] = None
+    OPENAI_COMPAT_MODEL: str = "gpt-4o-mini"
+
     # ============ 阿里云语音识别配置 ============
     ALIYUN_APP_KEY: str
     ALIYUN_NLS_TOKEN: Optional[str] = None  # 直接使用 Token（24小时有效）
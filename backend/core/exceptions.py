@@ -28,3 +28,23 @@ class TTSError(VoiceAssistantError):
 class ConfigurationError(VoiceAssistantError):
     """配置错误"""
     pass
+
+
+class CircuitOpenError(VoiceAssistantError):
+    """熔断器打开，请求被快速拒绝"""
+    pass
+
+
+class ToolError(VoiceAssistantError):
+    """工具执行错误"""
+    pass
+
+
+class ToolArgumentError(ToolError):
+    """工具参数不符合声明的 Schema"""
+    pass
+
+
+class ToolTimeoutError(ToolError):
+    """工具执行超时"""
+    pass
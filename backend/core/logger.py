@@ -1,21 +1,108 @@
 # backend/core/logger.py
+import atexit
+import json
 import logging
+import queue
 import sys
+import threading
+import time
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
 from .config import settings
 
 
-def setup_logger(name: str = "voice_assistant") -> logging.Logger:
-    """配置日志系统"""
+class JsonFormatter(logging.Formatter):
+    """JSON Lines 格式 (每条日志一行)"""
 
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, settings.LOG_LEVEL))
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """DEBUG 日志限速 (令牌桶)，超出速率的记录被丢弃并计数"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    只把日志记录放进有界队列，格式化和 I/O 都在 QueueListener 线程中完成
+
+    队列满时丢弃记录并计数，不阻塞调用方 (事件循环)。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内的线程队列不需要序列化，格式化留给后台线程
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    """停止时阻塞等待队列空位放入结束标记，保证剩余日志写完"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class _Pipeline:
+    """一个日志器的队列、后台线程和统计"""
+
+    def __init__(self, logger: logging.Logger, handler: NonBlockingQueueHandler, listener: _Listener,
+                 sampler: DebugSampler):
+        self.logger = logger
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
 
-    # 避免重复添加处理器
-    if logger.handlers:
-        return logger
+    def stats(self) -> dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "debug_sampled_out": self.sampler.sampled_out,
+        }
 
+
+_pipelines: Dict[str, _Pipeline] = {}
+_lock = threading.Lock()
+
+
+def _build_handlers(name: str, log_dir: Path, json_lines: bool) -> list:
     # 控制台处理器（UTF-8 编码）
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
@@ -35,23 +122,87 @@ def setup_logger(name: str = "voice_assistant") -> logging.Logger:
     console_handler.setFormatter(formatter)
 
     # 文件处理器
-    log_dir = Path(settings.LOG_DIR)
     log_dir.mkdir(exist_ok=True)
 
     file_handler = RotatingFileHandler(
-        log_dir / f"{name}.log",
+        log_dir / f"{name}.{'jsonl' if json_lines else 'log'}",
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=5,
         encoding='utf-8'
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter() if json_lines else formatter)
+
+    return [console_handler, file_handler]
+
+
+def setup_logger(
+        name: str = "voice_assistant",
+        *,
+        log_dir: Optional[str] = None,
+        json_lines: Optional[bool] = None,
+        root: bool = True,
+) -> logging.Logger:
+    """
+    配置日志系统
+
+    日志器上只挂一个非阻塞的队列处理器；控制台和滚动文件的格式化与写入
+    在后台 QueueListener 线程中完成。
+
+    Args:
+        name: 返回的日志器名，同时是日志文件名
+        root: 处理器挂在根日志器上 (默认)，各模块 logging.getLogger(__name__) 的日志都经过队列；
+              每个进程只配置一次，之后的调用只返回对应的日志器。
+              为 False 时只配置这个日志器本身，且不再向上传递
+    """
+
+    logger = logging.getLogger(name)
+    target = logging.getLogger() if root else logger
+    level = getattr(logging, settings.LOG_LEVEL)
+
+    with _lock:
+        # 避免重复添加处理器
+        if any(isinstance(h, NonBlockingQueueHandler) for h in target.handlers):
+            return logger
+        target.setLevel(level)
+        if not root:
+            logger.propagate = False
+
+        handlers = _build_handlers(
+            name,
+            Path(log_dir or settings.LOG_DIR),
+            settings.LOG_JSON if json_lines is None else json_lines
+        )
+
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        sampler = DebugSampler(settings.LOG_DEBUG_RATE)
+        queue_handler.addFilter(sampler)
+
+        listener = _Listener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
 
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+        target.addHandler(queue_handler)
+        _pipelines[name] = _Pipeline(target, queue_handler, listener, sampler)
 
     return logger
 
 
-# 默认日志器
-logger = setup_logger()
\ No newline at end of file
+def logging_stats() -> Dict[str, dict]:
+    """各日志器的队列深度、丢弃数和 DEBUG 采样丢弃数"""
+    return {name: pipeline.stats() for name, pipeline in _pipelines.items()}
+
+
+@atexit.register
+def shutdown_logging():
+    """停止后台线程 (先写完队列中剩余的日志)"""
+    with _lock:
+        for name, pipeline in list(_pipelines.items()):
+            pipeline.listener.stop()
+            for handler in pipeline.listener.handlers:
+                handler.close()
+            pipeline.logger.removeHandler(pipeline.handler)
+        _pipelines.clear()
+
+
+# 默认日志器 (由进程入口调用 setup_logger 配置)
+logger = logging.getLogger("voice_assistant")
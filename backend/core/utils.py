@@ -0,0 +1,76 @@
+# backend/core/utils.py
+
+import asyncio
+import contextlib
+import json
+import time
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def now_ms() -> int:
+    """当前时间 (毫秒时间戳)"""
+    return int(time.time() * 1000)
+
+
+def compact_json(obj: Any) -> str:
+    """紧凑 JSON (保留中文)"""
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def parse_json(text: Optional[str], default: Any = None) -> Any:
+    """解析 JSON，为空或格式错误时返回 default"""
+    if not text:
+        return default
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return default
+
+
+async def run_blocking(executor: Optional[Executor], fn: Callable[..., T], *args: Any) -> T:
+    """在线程池中执行阻塞调用，不占用事件循环"""
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+class PhaseTimer:
+    """
+    分阶段计时 (用于启动耗时报告)
+
+    并行执行的阶段各自计时，总耗时按 origin 起算的墙钟时间。
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = round(seconds * 1000, 1)
+
+    def mark(self, name: str):
+        """记录从 origin 到现在的耗时"""
+        self.record(name, time.perf_counter() - self.origin)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    async def timed(self, name: str, aw: Awaitable[T]) -> T:
+        with self.phase(name):
+            return await aw
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.origin) * 1000, 1)
+
+    def report(self) -> dict:
+        return {"total_ms": self.elapsed_ms(), "phases": dict(self.phases)}
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases.items())
+        return f"{self.elapsed_ms():.0f}ms ({phases})"
@@ -1,15 +1,33 @@
 # backend/integrations/aliyun/llm.py
 import logging
-from livekit.plugins import aliyun
+from typing import TYPE_CHECKING, Optional
+
 from core.config import settings
 
+if TYPE_CHECKING:
+    from livekit.plugins import aliyun
+
 logger = logging.getLogger(__name__)
 
 
-def create_llm() -> aliyun.LLM:
+def create_llm(model: Optional[str] = None) -> "aliyun.LLM":
     """创建阿里云 LLM"""
+    from livekit.plugins import aliyun
 
     return aliyun.LLM(
-        model="qwen-turbo",
+        model=model or settings.QWEN_MODEL,
         api_key=settings.DASHSCOPE_API_KEY
     )
+
+
+def create_openai_compatible_llm(base_url: str, api_key: str, model: str) -> "aliyun.LLM":
+    """创建任意 OpenAI 兼容接口的 LLM (复用阿里云插件的流式实现)"""
+    import openai
+    from livekit.plugins import aliyun
+
+    # 显式传入 api_key，避免插件在未设置 DASHSCOPE_API_KEY 环境变量时报错
+    return aliyun.LLM(
+        model=model,
+        api_key=api_key,
+        client=openai.AsyncClient(base_url=base_url, api_key=api_key)
+    )
@@ -0,0 +1,113 @@
+# backend/integrations/aliyun/protocol.py
+import json
+import logging
+from typing import Any, NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_TASK_ID_PLACEHOLDER = "__TASK_ID__"
+
+# 心跳消息在完整解码前按子串直接丢弃
+_HEARTBEAT_MARKERS = ('"heartbeat":true', '"heartbeat": true')
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON 编码 (UTF-8 bytes)，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data) -> Any:
+    """JSON 解码，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class MessageTemplate:
+    """预编译的常量消息，只在发送时拼接 task_id"""
+
+    def __init__(self, message: dict):
+        encoded = dumps(message)
+        prefix, sep, suffix = encoded.partition(_TASK_ID_PLACEHOLDER.encode())
+        if not sep:
+            raise ValueError("message template must contain the task_id placeholder")
+        self._prefix = prefix
+        self._suffix = suffix
+
+    def render(self, task_id: str) -> bytes:
+        return self._prefix + task_id.encode("ascii") + self._suffix
+
+
+class ServerEvent(NamedTuple):
+    """解码后的服务端事件"""
+    event: str
+    header: dict
+    sentence: Optional[dict] = None
+
+
+class DashscopeASRProtocol:
+    """
+    dashscope 实时语音识别协议编解码
+
+    run-task / finish-task 按模型参数预编译一次，多个流共享；
+    收到的消息先快速过滤心跳，再做一次完整解码。
+    """
+
+    def __init__(self, model: str, parameters: dict):
+        self._run_task = MessageTemplate({
+            "header": {
+                "action": "run-task",
+                "task_id": _TASK_ID_PLACEHOLDER,
+                "streaming": "duplex"
+            },
+            "payload": {
+                "task_group": "audio",
+                "task": "asr",
+                "function": "recognition",
+                "model": model,
+                "parameters": parameters,
+                "input": {}
+            }
+        })
+        self._finish_task = MessageTemplate({
+            "header": {
+                "action": "finish-task",
+                "task_id": _TASK_ID_PLACEHOLDER,
+                "streaming": "duplex"
+            },
+            "payload": {"input": {}}
+        })
+
+    def run_task(self, task_id: str) -> bytes:
+        return self._run_task.render(task_id)
+
+    def finish_task(self, task_id: str) -> bytes:
+        return self._finish_task.render(task_id)
+
+    @staticmethod
+    def is_heartbeat(data: str) -> bool:
+        return any(marker in data for marker in _HEARTBEAT_MARKERS)
+
+    @staticmethod
+    def decode(data) -> Optional[ServerEvent]:
+        """解码一条文本消息，心跳返回 None"""
+        if DashscopeASRProtocol.is_heartbeat(data):
+            return None
+
+        message = loads(data)
+        header = message.get("header") or {}
+        event = header.get("event", "")
+        sentence = None
+        if event == "result-generated":
+            try:
+                sentence = message["payload"]["output"]["sentence"]
+            except (KeyError, TypeError):
+                sentence = None
+        return ServerEvent(event=event, header=header, sentence=sentence)
@@ -0,0 +1,332 @@
+# backend/integrations/aliyun/resilience.py
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+import aiohttp
+from yarl import URL
+
+from core.config import settings
+from core.exceptions import CircuitOpenError
+
+try:
+    from prometheus_client import Counter, Gauge, start_http_server
+except ImportError:  # pragma: no cover - prometheus_client 为可选依赖
+    Counter = Gauge = start_http_server = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+if Gauge is not None:
+    _STATE_GAUGE = Gauge("voice_assistant_circuit_state", "熔断器状态 (0=closed 1=half_open 2=open)", ["endpoint"])
+    _FAILURES = Counter("voice_assistant_circuit_failures_total", "外部调用失败次数", ["endpoint"])
+    _REJECTED = Counter("voice_assistant_circuit_rejected_total", "熔断期间被快速拒绝的调用", ["endpoint"])
+    _HEDGES = Counter("voice_assistant_hedges_total", "对冲请求次数", ["endpoint"])
+    _RETRIES = Counter("voice_assistant_retries_total", "重试次数", ["endpoint"])
+else:
+    _STATE_GAUGE = _FAILURES = _REJECTED = _HEDGES = _RETRIES = None
+
+
+def _inc(counter, endpoint: str):
+    if counter is not None:
+        counter.labels(endpoint=endpoint).inc()
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝请求；
+    之后进入半开状态放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probe_in_flight = False
+        self._export()
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow(self) -> bool:
+        """是否放行一次请求 (半开状态只放行一个探测请求)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        _inc(_REJECTED, self.name)
+        return False
+
+    def check(self):
+        """不放行时抛出 CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} 熔断中")
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self._state != self.CLOSED:
+            logger.info(f"✅ 熔断器恢复: {self.name}")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        _inc(_FAILURES, self.name)
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.trips += 1
+                logger.warning(f"⚠️ 熔断器打开: {self.name} (连续失败 {self.failures} 次)")
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self._state = state
+        self._export()
+
+    def _export(self):
+        if _STATE_GAUGE is not None:
+            _STATE_GAUGE.labels(endpoint=self.name).set(self._STATE_VALUES[self._state])
+
+    def stats(self) -> dict:
+        return {
+            "endpoint": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """有限次重试，退避时间带全抖动"""
+
+    def __init__(self, attempts: int = 2, base_delay: float = 0.2, max_delay: float = 2.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间 (attempt 从 1 开始)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def default_retry() -> RetryPolicy:
+    """按配置创建重试策略"""
+    return RetryPolicy(attempts=settings.RETRY_ATTEMPTS, base_delay=settings.RETRY_BASE_DELAY_MS / 1000)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, failure_threshold: Optional[int] = None,
+                reset_timeout: Optional[float] = None) -> CircuitBreaker:
+    """按端点名获取共享熔断器 (同一端点的所有调用共享状态)"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=failure_threshold or settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=reset_timeout or settings.BREAKER_RESET_SECONDS
+        )
+    return breaker
+
+
+def breaker_stats() -> list:
+    """所有熔断器状态 (用于调试/监控)"""
+    return [breaker.stats() for breaker in _breakers.values()]
+
+
+_metrics_port: Optional[int] = None
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    启动 Prometheus 指标端口 (每个进程一次，重复调用无效果)
+
+    未安装 prometheus_client 或端口绑定失败时返回 False，不影响启动。
+    """
+    global _metrics_port
+    if _metrics_port is not None:
+        return _metrics_port == port
+    if start_http_server is None:
+        logger.warning("⚠️ 未安装 prometheus_client，指标不导出")
+        return False
+    try:
+        start_http_server(port)
+    except OSError as e:
+        logger.warning(f"⚠️ 指标端口 {port} 启动失败，指标不导出: {e}")
+        return False
+    _metrics_port = port
+    logger.info(f"✅ 指标端口: http://0.0.0.0:{port}/metrics")
+    return True
+
+
+async def warm_connection(session: aiohttp.ClientSession, url: str, timeout: float = 5.0) -> bool:
+    """
+    预热到端点的连接 (DNS + TCP + TLS)
+
+    对同一主机发一个 HTTPS 请求，连接留在 session 的 keep-alive 池中，
+    随后的 ws_connect 可直接复用。失败只返回 False，不影响启动。
+    """
+    origin = URL(url)
+    origin = origin.with_scheme("https" if origin.scheme in ("wss", "https") else "http").origin()
+    try:
+        async with session.head(origin, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            await resp.read()
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ 连接预热失败 {origin}: {e}")
+        return False
+
+
+async def retry_first_item(
+        make_stream: Callable[[], AsyncIterator[T]],
+        *,
+        name: str,
+        retry: Optional[RetryPolicy] = None,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+) -> AsyncIterator[T]:
+    """
+    流式请求的有限次重试
+
+    首个元素之前失败时按 retry 退避后用 make_stream 重新发起请求；
+    已经产出元素后的失败直接抛出 (避免重复输出)。熔断中 (CircuitOpenError) 不重试。
+    每次请求的流在结束或失败时由这里关闭。
+    """
+    attempts = retry.attempts if retry else 1
+    for attempt in range(1, attempts + 1):
+        stream = make_stream()
+        started = False
+        try:
+            async for item in stream:
+                started = True
+                yield item
+            return
+        except (asyncio.CancelledError, CircuitOpenError):
+            raise
+        except retry_on as e:
+            if started or attempt >= attempts:
+                raise
+            delay = retry.delay(attempt)
+            logger.warning(f"⚠️ {name} 请求失败，{delay:.2f}s 后重试 (第 {attempt} 次): {e!r}")
+            _inc(_RETRIES, name)
+            await asyncio.sleep(delay)
+        finally:
+            await _aclose(stream)
+
+
+async def _aclose(stream):
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+async def hedged_stream(
+        primary: AsyncIterator[T],
+        make_backup: Optional[Callable[[], AsyncIterator[T]]],
+        *,
+        breaker: CircuitBreaker,
+        hedge_after: Optional[float],
+        first_item_timeout: Optional[float],
+) -> AsyncIterator[T]:
+    """
+    首个元素对冲: primary 在 hedge_after 秒内没有产出时，用 make_backup 再发一个请求，
+    先产出的一方胜出，另一方被关闭；超过 first_item_timeout 都没有产出时记为失败。
+    首个元素之后直接透传胜出的流。调用方负责关闭 primary，backup 由这里关闭。
+    """
+    breaker.check()
+    started = time.monotonic()
+    attempts = {asyncio.ensure_future(primary.__anext__()): primary}
+    backup = None
+    winner = None
+    first = None
+
+    try:
+        while winner is None:
+            elapsed = time.monotonic() - started
+            timeouts = []
+            if first_item_timeout is not None:
+                timeouts.append(first_item_timeout - elapsed)
+            if backup is None and make_backup is not None and hedge_after is not None:
+                timeouts.append(hedge_after - elapsed)
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if first_item_timeout is not None and time.monotonic() - started >= first_item_timeout:
+                    raise asyncio.TimeoutError(f"{breaker.name} 首个结果超时 ({first_item_timeout:.1f}s)")
+                logger.info(f"⏱️ {breaker.name} 超过 {hedge_after:.1f}s 无结果，发起对冲请求")
+                _inc(_HEDGES, breaker.name)
+                backup = make_backup()
+                attempts[asyncio.ensure_future(backup.__anext__())] = backup
+                continue
+
+            for future in done:
+                stream = attempts.pop(future)
+                try:
+                    first = future.result()
+                except StopAsyncIteration:
+                    first = None
+                except Exception:
+                    if attempts:
+                        # 另一路仍在进行，等它的结果
+                        if stream is backup:
+                            await _aclose(backup)
+                        continue
+                    raise
+                winner = stream
+                break
+            else:
+                if not attempts:
+                    raise ConnectionError(f"{breaker.name} 所有请求均失败")
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    finally:
+        for future, stream in attempts.items():
+            future.cancel()
+            if stream is backup:
+                await _aclose(backup)
+
+    breaker.record_success()
+    if first is None:
+        return
+    yield first
+    try:
+        async for item in winner:
+            yield item
+    finally:
+        if winner is backup:
+            await _aclose(backup)
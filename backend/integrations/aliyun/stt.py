@@ -1,10 +1,57 @@
 # backend/integrations/aliyun/stt.py
 import os
-import json
+import random
 import asyncio
+import logging
+import weakref
 import aiohttp
-from typing import Optional
-from livekit.agents import stt, utils, APIConnectOptions, DEFAULT_API_CONNECT_OPTIONS
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Deque, Dict, List, Optional, Tuple
+from livekit import rtc
+from livekit.agents import stt, utils, APIConnectOptions, APIConnectionError, DEFAULT_API_CONNECT_OPTIONS
+
+from audio.encoder import EncoderStage, encoder_factory
+from audio.frame_queue import BoundedFrameQueue, OverflowPolicy
+from core.exceptions import CircuitOpenError
+from integrations.http_client import http_clients
+from integrations.language import LanguageDetector, base_language
+from .protocol import DashscopeASRProtocol
+from .resilience import CircuitBreaker, get_breaker, warm_connection
+
+logger = logging.getLogger(__name__)
+
+# 模型没有返回置信度时使用的值 (confidence_reported 为 False)
+DEFAULT_CONFIDENCE = 0.9
+
+
+@dataclass
+class WordTiming:
+    """一个词在流音频时间线上的位置 (秒，从流开始计)"""
+    text: str
+    start_time: float
+    end_time: float
+    punctuation: str = ""
+    confidence: Optional[float] = None
+
+
+@dataclass
+class AliyunSpeechData(stt.SpeechData):
+    """带词级时间戳的识别结果 (start_time / end_time 为流音频时间线上的秒数)"""
+    words: List[WordTiming] = field(default_factory=list)
+    # 服务是否返回了置信度，未返回时 confidence 为 DEFAULT_CONFIDENCE
+    confidence_reported: bool = False
+    # 最终结果到达时，句尾之后已发送的音频时长 (端点检测 + 识别耗时)
+    endpoint_delay_ms: Optional[float] = None
+
+
+def _confidence(sentence: dict) -> Optional[float]:
+    """句子置信度: 优先用句子级字段，否则取词级置信度的平均值"""
+    value = sentence.get("confidence")
+    if value is not None:
+        return float(value)
+    scores = [w["confidence"] for w in sentence.get("words") or () if w.get("confidence") is not None]
+    return sum(scores) / len(scores) if scores else None
 
 
 class AliyunSTT(stt.STT):
@@ -16,6 +63,21 @@ class AliyunSTT(stt.STT):
             api_key: str,
             model: str = "paraformer-realtime-v2",
             language: str = "zh-CN",
+            language_hints: Optional[List[str]] = None,
+            detect_languages: Optional[List[str]] = None,
+            language_models: Optional[Dict[str, str]] = None,
+            queue_max_ms: int = 3000,
+            overflow_policy: OverflowPolicy = OverflowPolicy.DROP_SILENCE,
+            url: str = "wss://dashscope.aliyuncs.com/api-ws/v1/inference",
+            max_reconnects: int = 5,
+            replay_ms: int = 10000,
+            connect_timeout: float = 5.0,
+            start_timeout: float = 10.0,
+            breaker: Optional[CircuitBreaker] = None,
+            audio_format: str = "pcm",
+            opus_bitrate: int = 24000,
+            encode_workers: int = 2,
+            http_session: Optional[aiohttp.ClientSession] = None,
     ):
         super().__init__(
             capabilities=stt.STTCapabilities(
@@ -26,12 +88,59 @@ class AliyunSTT(stt.STT):
         self._api_key = api_key
         self._model = model
         self._language = language
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._queue_max_ms = queue_max_ms
+        self._overflow_policy = OverflowPolicy(overflow_policy)
+        self._url = url
+        self._max_reconnects = max_reconnects
+        self._replay_ms = replay_ms
+        self._connect_timeout = connect_timeout
+        self._start_timeout = start_timeout
+        # 同一端点的所有流共享熔断器
+        self._breaker = breaker or get_breaker("aliyun-stt")
+        # 上行音频编码 (Opus 不可用时回退到 PCM)
+        self._encoder_factory = encoder_factory(audio_format, sample_rate=16000, bitrate=opus_bitrate)
+        self._encode_workers = encode_workers
+        self._audio_format = self._encoder_factory.func.encoding
+        # 自动识别语言: 先用全部候选语言作为提示，判定后按语言切换模型和提示
+        self._detect_languages = [base_language(lang) for lang in detect_languages or []]
+        self._language_models = dict(language_models or {})
+        # run-task / finish-task 消息按 (模型, 语言提示) 预编译，所有流共享
+        self._protocols: Dict[Tuple[str, Tuple[str, ...]], DashscopeASRProtocol] = {}
+        self._protocol = self._protocol_for(model, self._detect_languages or language_hints or ["zh"])
+        self._session = http_session
+        self._streams: "weakref.WeakSet[AliyunSTTStream]" = weakref.WeakSet()
+
+    def _protocol_for(self, model: str, hints: List[str]) -> DashscopeASRProtocol:
+        key = (model, tuple(hints))
+        protocol = self._protocols.get(key)
+        if protocol is None:
+            protocol = self._protocols[key] = DashscopeASRProtocol(model, {
+                "format": self._audio_format.value,
+                "sample_rate": 16000,
+                "language_hints": list(hints),
+                "max_sentence_silence": 800,
+            })
+        return protocol
+
+    def route(self, language: str) -> DashscopeASRProtocol:
+        """已判定语言的流使用的模型和语言提示"""
+        language = base_language(language)
+        return self._protocol_for(self._language_models.get(language, self._model), [language])
+
+    def queue_stats(self) -> List[dict]:
+        """所有活跃流的输入队列状态"""
+        return [s.queue_stats for s in list(self._streams) if not s.closed]
 
     def _ensure_session(self) -> aiohttp.ClientSession:
-        if self._session is None:
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """未指定 session 时使用全局连接池 (由进程退出时统一关闭)"""
+        return self._session or http_clients.session
+
+    async def warm(self, timeout: float = 5.0) -> bool:
+        """预热到识别服务的连接，第一个流建连时复用"""
+        return await warm_connection(self._ensure_session(), self._url, timeout)
+
+    def prewarm(self) -> None:
+        asyncio.get_running_loop().create_task(self.warm())
 
     async def _recognize_impl(
             self,
@@ -47,21 +156,51 @@ class AliyunSTT(stt.STT):
             language: str | None = None,
             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
     ) -> "AliyunSTTStream":
-        return AliyunSTTStream(
+        stream = AliyunSTTStream(
             stt=self,
             conn_options=conn_options,
             api_key=self._api_key,
             model=self._model,
             language=language or self._language,
+            audio_queue=BoundedFrameQueue(
+                max_ms=self._queue_max_ms,
+                policy=self._overflow_policy,
+                name=f"stt-{len(self._streams)}"
+            ),
+            url=self._url,
+            max_reconnects=self._max_reconnects,
+            replay_ms=self._replay_ms,
+            protocol=self._protocol,
+            connect_timeout=self._connect_timeout,
+            start_timeout=self._start_timeout,
+            breaker=self._breaker,
+            encoder=EncoderStage(self._encoder_factory, self._encode_workers),
+            detector=LanguageDetector(self._detect_languages) if self._detect_languages else None,
         )
+        self._streams.add(stream)
+        return stream
 
     async def aclose(self) -> None:
-        if self._session:
-            await self._session.close()
+        """关闭所有活跃流 (共享 session 不在这里关闭)"""
+        for stream in list(self._streams):
+            if not stream.closed:
+                await stream.aclose()
 
 
 class AliyunSTTStream(stt.SpeechStream):
-    """阿里云 STT 流"""
+    """
+    阿里云 STT 流
+
+    WebSocket 断开时按指数退避自动重连：最近的音频保存在环形缓冲区中，
+    重连后把尚未得到最终结果的音频重放进新的 run-task，
+    已经发出的最终结果按音频时间线去重。
+    熔断或重连次数用尽时关闭输入队列，事件流以 APIConnectionError 结束。
+    """
+
+    # 关闭时等待 finish-task 返回最后结果的时间
+    CLOSE_GRACE_PERIOD = 2.0
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 8.0
 
     def __init__(
             self,
@@ -71,154 +210,346 @@ class AliyunSTTStream(stt.SpeechStream):
             api_key: str,
             model: str,
             language: str,
+            audio_queue: BoundedFrameQueue,
+            url: str,
+            max_reconnects: int,
+            replay_ms: int,
+            protocol: DashscopeASRProtocol,
+            connect_timeout: float,
+            start_timeout: float,
+            breaker: CircuitBreaker,
+            encoder: EncoderStage,
+            detector: Optional[LanguageDetector] = None,
     ):
-        super().__init__(stt=stt, conn_options=conn_options)
+        # 重连由 _run 自己处理，基类不再整体重试
+        super().__init__(stt=stt, conn_options=replace(conn_options, max_retry=0))
+        # 有界输入队列取代无界的 _input_ch，后端变慢时按策略丢帧或阻塞生产者
+        self._audio_queue = audio_queue
         self._api_key = api_key
         self._model = model
         self._language = language
+        self._url = url
+        self._max_reconnects = max_reconnects
+        self._replay_ms = replay_ms
+        self._protocol = protocol
+        self._connect_timeout = connect_timeout
+        self._start_timeout = start_timeout
+        self._breaker = breaker
+        self._encoder = encoder
+        self._stt = stt
+        # 语言判定后在句子边界结束当前 run-task，在同一连接上用新的模型/提示开始下一个
+        self._detector = detector
+        self._next_protocol: Optional[DashscopeASRProtocol] = None
+        self._switch_now = False
+        self.language_switches = 0
+        self.detected_at_ms: Optional[float] = None
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
         self._session = stt._ensure_session()
         self._task_started_event = asyncio.Event()
         self._closed = False
-        self._running = False
-        self._main_task = asyncio.create_task(self._run())
-
-    async def _run(self) -> None:
-        if self._running:
-            return
+        self._input_done = False
+
+        # 音频时间线 (毫秒，从流开始计)
+        self._ring: Deque[Tuple[float, float, bytes]] = deque()  # (开始, 时长, PCM)
+        self._sent_ms = 0.0  # 已从输入队列取出的音频总时长
+        self._task_offset_ms = 0.0  # 当前 run-task 的 0 点在时间线上的位置
+        self._acked_ms = 0.0  # 已得到最终结果的音频位置
+        self._last_final_text = ""
+        self.reconnects = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def language(self) -> str:
+        """已判定的语言 (未判定或未开启识别时为配置的语言)"""
+        return self._language
+
+    @property
+    def queue_stats(self) -> dict:
+        """输入队列状态 (深度、丢帧数、过载次数)"""
+        return self._audio_queue.stats()
+
+    @property
+    def encoder_stats(self) -> dict:
+        """上行编码统计 (格式、编码前后字节数、编码 CPU 时间)"""
+        return self._encoder.stats()
+
+    def push_frame(self, frame: rtc.AudioFrame) -> None:
+        """推入音频帧 (BLOCK 策略下队列满时丢弃新帧，应改用 push_frame_wait)"""
+        try:
+            self._audio_queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._audio_queue.dropped += 1
+            self._audio_queue.dropped_ms += frame.samples_per_channel * 1000 / frame.sample_rate
 
-        self._running = True
+    async def push_frame_wait(self, frame: rtc.AudioFrame) -> None:
+        """推入音频帧，BLOCK 策略下队列满时等待"""
+        await self._audio_queue.put(frame)
 
-        url = "wss://dashscope.aliyuncs.com/api-ws/v1/inference"
+    async def _run(self) -> None:
         import urllib.parse
         params = {
             "model": self._model,
             "api_key": self._api_key,
         }
-        full_url = f"{url}?{urllib.parse.urlencode(params)}"
+        full_url = f"{self._url}?{urllib.parse.urlencode(params)}"
 
         headers = {
             "Authorization": f"Bearer {self._api_key}",
             "Content-Type": "application/json"
         }
 
-        try:
-            self._ws = await self._session.ws_connect(full_url, headers=headers)
+        attempt = 0
+        while not self._closed:
+            acked_before = self._acked_ms
+            self._apply_route()
+            try:
+                # 熔断期间直接放弃，不再逐次等待超时
+                self._breaker.check()
+                self._ws = await asyncio.wait_for(
+                    self._session.ws_connect(full_url, headers=headers),
+                    timeout=self._connect_timeout
+                )
+                await self._run_task()
+                # 切换语言: 在同一连接上开始新的 run-task，不重新建连
+                while not (self._closed or self._input_done) and self._apply_route():
+                    await self._run_task()
+                break
 
-            await asyncio.gather(
-                self._send_audio_task(),
-                self._receive_task(),
-                return_exceptions=True
-            )
-        except Exception as e:
-            print(f"❌ STT 错误: {e}")
+            except CircuitOpenError as e:
+                logger.error(f"❌ STT 服务熔断中，停止重连: {e}")
+                self._give_up(f"STT 服务熔断中: {e}", e)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._closed or self._input_done:
+                    break
+                self._breaker.record_failure()
+                # 本次连接有新的最终结果才算恢复，重置退避
+                if self._acked_ms > acked_before:
+                    attempt = 0
+                attempt += 1
+                if attempt > self._max_reconnects:
+                    logger.error(f"❌ STT 错误，重连 {self._max_reconnects} 次后放弃: {e}")
+                    self._give_up(f"STT 重连 {self._max_reconnects} 次后放弃: {e}", e)
+
+                delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"⚠️ STT 连接断开，{delay:.1f}s 后重连 (第 {attempt} 次): {e}")
+                self.reconnects += 1
+                await asyncio.sleep(delay)
+            finally:
+                if self._ws and not self._ws.closed:
+                    await self._ws.close()
+
+    def _give_up(self, message: str, cause: Exception):
+        """放弃识别: 关闭输入队列 (生产者不再阻塞)，以错误结束事件流通知使用方"""
+        self._audio_queue.close()
+        raise APIConnectionError(message, retryable=False) from cause
+
+    async def _run_task(self) -> None:
+        """在当前连接上执行一次 run-task，任一方向出错即中止另一方向"""
+        tasks = [
+            asyncio.create_task(self._send_audio_task()),
+            asyncio.create_task(self._receive_task()),
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
         finally:
-            self._running = False
-            if self._ws and not self._ws.closed:
-                await self._ws.close()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for task in done:
+            if task.exception():
+                raise task.exception()
+
+    def _apply_route(self) -> bool:
+        """使用语言判定后的模型和提示 (下一个 run-task 生效)"""
+        self._switch_now = False
+        if self._next_protocol is None:
+            return False
+        self._protocol, self._next_protocol = self._next_protocol, None
+        self.language_switches += 1
+        return True
+
+    def _on_language(self, language: str):
+        self._language = language
+        self.detected_at_ms = self._sent_ms
+        protocol = self._stt.route(language)
+        if protocol is not self._protocol:
+            self._next_protocol = protocol
+        logger.info(f"🌐 识别到语言: {language} (置信度 {self._detector.confidence}，"
+                    f"音频 {self._sent_ms:.0f}ms){'，句子结束后切换识别参数' if self._next_protocol else ''}")
+
+    def _replay_frames(self) -> List[bytes]:
+        """取出尚未得到最终结果的音频，并把新任务的 0 点对齐到第一帧"""
+        frames = [(start, data) for start, ms, data in self._ring if start + ms > self._acked_ms]
+        self._task_offset_ms = frames[0][0] if frames else self._sent_ms
+        if frames:
+            logger.info(f"🔁 重放 {self._sent_ms - self._task_offset_ms:.0f}ms 未确认音频")
+        return [data for _, data in frames]
+
+    def _remember(self, audio_bytes: bytes, ms: float):
+        """把已发送音频写入环形缓冲区"""
+        self._ring.append((self._sent_ms, ms, audio_bytes))
+        self._sent_ms += ms
+        while self._ring and self._ring[0][0] + self._ring[0][1] <= self._sent_ms - self._replay_ms:
+            start, ms, _ = self._ring.popleft()
+            if start + ms > self._acked_ms:
+                logger.warning("⚠️ 环形缓冲区已满，丢弃未确认音频")
 
     async def _send_audio_task(self) -> None:
         import uuid
         task_id = str(uuid.uuid4())
 
-        run_task_msg = {
-            "header": {
-                "action": "run-task",
-                "task_id": task_id,
-                "streaming": "duplex"
-            },
-            "payload": {
-                "task_group": "audio",
-                "task": "asr",
-                "function": "recognition",
-                "model": self._model,
-                "parameters": {
-                    "format": "pcm",
-                    "sample_rate": 16000,
-                    "language_hints": ["zh"],
-                    "max_sentence_silence": 800,
-                },
-                "input": {}
-            }
-        }
-
-        await self._ws.send_str(json.dumps(run_task_msg))
+        self._task_started_event.clear()
+        await self._ws.send_frame(self._protocol.run_task(task_id), aiohttp.WSMsgType.TEXT)
 
         try:
-            await asyncio.wait_for(self._task_started_event.wait(), timeout=10.0)
+            await asyncio.wait_for(self._task_started_event.wait(), timeout=self._start_timeout)
         except asyncio.TimeoutError:
-            return
-
-        async for frame in self._input_ch:
-            if self._closed or frame is None:
+            raise ConnectionError("等待 task-started 超时")
+
+        # 每个 run-task 是一个独立的编码流 (Opus 需要重新写 Ogg 头)
+        self._encoder.reset()
+        for audio_bytes in self._replay_frames():
+            data = await self._encoder.encode(audio_bytes)
+            if data:
+                await self._ws.send_bytes(data)
+
+        while True:
+            frame = await self._audio_queue.get()
+            if frame is None:
+                self._input_done = True
                 break
 
-            if not self._ws.closed:
-                audio_bytes = frame.data.tobytes()
-                await self._ws.send_bytes(audio_bytes)
-
+            audio_bytes = frame.data.tobytes()
+            self._remember(audio_bytes, frame.samples_per_channel * 1000 / frame.sample_rate)
+            if self._switch_now:
+                # 句子边界: 结束当前任务，句子之后的音频 (含这一帧) 重放进新任务
+                break
+            data = await self._encoder.encode(audio_bytes)
+            if self._ws.closed:
+                raise ConnectionError("WebSocket 已关闭")
+            if data:
+                await self._ws.send_bytes(data)
+
+        tail = await self._encoder.flush()
+        if tail and not self._ws.closed:
+            await self._ws.send_bytes(tail)
         if not self._ws.closed:
-            finish_msg = {
-                "header": {
-                    "action": "finish-task",
-                    "task_id": task_id,
-                    "streaming": "duplex"
-                },
-                "payload": {"input": {}}
-            }
-            await self._ws.send_str(json.dumps(finish_msg))
+            await self._ws.send_frame(self._protocol.finish_task(task_id), aiohttp.WSMsgType.TEXT)
+
+    def _speech_data(self, sentence: dict, text: str, begin_ms: float, end_ms: float,
+                     final: bool) -> AliyunSpeechData:
+        """把 dashscope 的 sentence 转成 SpeechData (时间换算到流的音频时间线)"""
+        offset = self._task_offset_ms
+        words = [
+            WordTiming(
+                text=w.get("text", ""),
+                start_time=(offset + (w.get("begin_time") or 0)) / 1000,
+                end_time=(offset + (w.get("end_time") or 0)) / 1000,
+                punctuation=w.get("punctuation") or "",
+                confidence=w.get("confidence"),
+            )
+            for w in sentence.get("words") or ()
+        ]
+        confidence = _confidence(sentence)
+        return AliyunSpeechData(
+            language=self._language,
+            text=text,
+            start_time=begin_ms / 1000,
+            end_time=end_ms / 1000,
+            confidence=DEFAULT_CONFIDENCE if confidence is None else confidence,
+            words=words,
+            confidence_reported=confidence is not None,
+            endpoint_delay_ms=round(self._sent_ms - end_ms, 1) if final else None,
+        )
+
+    def _is_duplicate(self, text: str, begin_ms: float, end_ms: float) -> bool:
+        """重放音频产生的重复最终结果"""
+        if end_ms <= self._acked_ms:
+            return True
+        return text == self._last_final_text and begin_ms < self._acked_ms
 
     async def _receive_task(self) -> None:
         async for msg in self._ws:
             if msg.type == aiohttp.WSMsgType.TEXT:
-                data = json.loads(msg.data)
-                header = data.get("header", {})
-                event = header.get("event")
+                # 心跳在完整解码前被丢弃 (返回 None)
+                message = self._protocol.decode(msg.data)
+                if message is None:
+                    continue
+                event = message.event
 
                 if event == "task-started":
+                    self._breaker.record_success()
                     self._task_started_event.set()
 
                 elif event == "result-generated":
-                    payload = data.get("payload", {})
-                    output = payload.get("output", {})
+                    sentence = message.sentence
 
-                    if "sentence" in output:
-                        sentence = output["sentence"]
+                    if sentence:
                         text = sentence.get("text", "").strip()
                         sentence_end = sentence.get("sentence_end", False)
 
                         if text and not sentence.get("heartbeat", False):
+                            if self._detector is not None and not self._detector.decided:
+                                language = self._detector.observe(text, sentence_end)
+                                if language:
+                                    self._on_language(language)
+                            begin_ms = self._task_offset_ms + (sentence.get("begin_time") or 0)
+                            end_time = sentence.get("end_time")
+                            end_ms = self._task_offset_ms + end_time if end_time is not None else self._sent_ms
+                            if sentence_end:
+                                if self._is_duplicate(text, begin_ms, end_ms):
+                                    continue
+                                self._acked_ms = max(self._acked_ms, end_ms)
+                                self._last_final_text = text
+                                if self._next_protocol is not None:
+                                    self._switch_now = True
+
                             speech_event = stt.SpeechEvent(
                                 type=stt.SpeechEventType.FINAL_TRANSCRIPT if sentence_end else stt.SpeechEventType.INTERIM_TRANSCRIPT,
-                                alternatives=[
-                                    stt.SpeechData(
-                                        language=self._language,
-                                        text=text,
-                                        confidence=0.9,
-                                    )
-                                ],
+                                alternatives=[self._speech_data(sentence, text, begin_ms, end_ms, sentence_end)],
                             )
                             self._event_ch.send_nowait(speech_event)
 
-                elif event in ["task-finished", "task-failed"]:
-                    break
+                elif event == "task-finished":
+                    return
+
+                elif event == "task-failed":
+                    raise ConnectionError(f"任务失败: {message.header.get('error_message', '')}")
+
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                raise ConnectionError(f"WebSocket 错误: {self._ws.exception()}")
+
+        # 没有收到 task-finished 连接就结束了
+        raise ConnectionError("WebSocket 连接意外关闭")
 
     async def aclose(self) -> None:
         self._closed = True
+        self._audio_queue.close()
 
-        try:
-            await self._input_ch.send(None)
-        except:
-            pass
+        # 给 finish-task 一点时间返回最后的识别结果
+        if self._task and not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout=self.CLOSE_GRACE_PERIOD)
+            except (asyncio.TimeoutError, Exception):
+                pass
 
-        if self._main_task and not self._main_task.done():
-            self._main_task.cancel()
+        if self._task and not self._task.done():
+            self._task.cancel()
             try:
-                await self._main_task
-            except asyncio.CancelledError:
+                await self._task
+            except (asyncio.CancelledError, Exception):
                 pass
 
         if self._ws and not self._ws.closed:
             await self._ws.close()
+        self._encoder.close()
 
         self._event_ch.close()
@@ -1,17 +1,29 @@
 # backend/integrations/aliyun/tts.py
 import logging
+from typing import TYPE_CHECKING, Optional
+
 import aiohttp
-from livekit.plugins import aliyun
 from core.config import settings
+from .resilience import warm_connection
+
+if TYPE_CHECKING:
+    from livekit.plugins import aliyun
 
 logger = logging.getLogger(__name__)
 
 
-def create_tts(http_session: aiohttp.ClientSession) -> aliyun.TTS:
+def create_tts(http_session: aiohttp.ClientSession, model: Optional[str] = None,
+               voice: Optional[str] = None) -> "aliyun.TTS":
     """创建阿里云 TTS"""
+    from livekit.plugins import aliyun
 
     return aliyun.TTS(
-        model='cosyvoice-v1',
-        voice='longxiaochun',
+        model=model or settings.TTS_MODEL,
+        voice=voice or settings.TTS_VOICE,
         http_session=http_session
     )
+
+
+async def prewarm_tts(tts: "aliyun.TTS", timeout: float = 5.0) -> bool:
+    """预热到合成服务的连接，第一句合成时复用"""
+    return await warm_connection(tts._ensure_session(), tts._opts.get_ws_url(), timeout)
@@ -0,0 +1,219 @@
+# backend/integrations/database.py
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, List, Optional
+
+from core.utils import compact_json, now_ms, parse_json, run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConversationTurn:
+    """一条对话记录 (用户发言、助手回复、工具调用或工具结果)"""
+    participant: str
+    role: str  # user / assistant / tool_call / tool_result
+    content: str
+    name: str = ""  # 工具名
+    call_id: str = ""
+    latency_ms: Optional[float] = None  # 耗时: 回复生成 / 工具执行
+    created_at: int = field(default_factory=now_ms)
+    metadata: dict = field(default_factory=dict)
+
+
+class ConversationBackend(ABC):
+    """对话存储后端接口 (同步实现，由 ConversationStore 在专用线程中调用)"""
+
+    @abstractmethod
+    def write_batch(self, turns: List[ConversationTurn]) -> None:
+        ...
+
+    @abstractmethod
+    def recent(self, participant: str, limit: int) -> List[ConversationTurn]:
+        """最近 limit 条记录 (按时间正序)"""
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteConversationBackend(ConversationBackend):
+    """本地 SQLite 存储"""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_turns ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "participant TEXT NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "name TEXT NOT NULL DEFAULT '', call_id TEXT NOT NULL DEFAULT '', "
+            "latency_ms REAL, created_at INTEGER NOT NULL, metadata TEXT)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_turns_participant ON conversation_turns (participant, id)"
+        )
+        self._conn.commit()
+
+    def write_batch(self, turns: List[ConversationTurn]) -> None:
+        rows = [
+            (t.participant, t.role, t.content, t.name, t.call_id, t.latency_ms, t.created_at,
+             compact_json(t.metadata) if t.metadata else None)
+            for t in turns
+        ]
+        with self._lock:
+            # 一个批次一个事务
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO conversation_turns "
+                    "(participant, role, content, name, call_id, latency_ms, created_at, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    def recent(self, participant: str, limit: int) -> List[ConversationTurn]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT participant, role, content, name, call_id, latency_ms, created_at, metadata "
+                "FROM conversation_turns WHERE participant = ? ORDER BY id DESC LIMIT ?",
+                (participant, limit)
+            ).fetchall()
+        return [
+            ConversationTurn(p, role, content, name, call_id, latency, created, parse_json(meta, {}))
+            for p, role, content, name, call_id, latency, created, meta in reversed(rows)
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ConversationStore:
+    """
+    对话存储 (写后缓冲)
+
+    record() 只把记录放进内存缓冲区，立即返回，不阻塞音频/回复路径；
+    后台任务每 flush_interval 秒或缓冲达到 batch_size 条时，
+    在单独的线程里把整批记录写入后端；写入失败的批次放回缓冲区头部，下个周期重试。
+    缓冲区超过 max_buffer 条时丢弃最旧的记录。
+    """
+
+    def __init__(
+            self,
+            backend: ConversationBackend,
+            flush_interval: float = 1.0,
+            batch_size: int = 100,
+            max_buffer: int = 10000,
+    ):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: Deque[ConversationTurn] = deque(maxlen=max_buffer)
+        # 单线程保证批次按顺序写入
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-store")
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="conversation-store")
+
+    def record(self, turn: ConversationTurn):
+        """追加一条记录 (非阻塞)"""
+        if self._closed:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(turn)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """把缓冲区中的记录写入后端"""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    await run_blocking(self._executor, self.backend.write_batch, batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.failed_batches += 1
+                    logger.error(f"❌ 对话记录写入失败 ({len(batch)} 条)，下个周期重试: {e}")
+                    self._requeue(batch)
+                    break
+
+    def _requeue(self, batch: List[ConversationTurn]):
+        """把写入失败的批次按原顺序放回缓冲区头部 (超出容量时丢弃最旧的记录)"""
+        overflow = len(self._buffer) + len(batch) - self._buffer.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+            batch = batch[overflow:]
+        self._buffer.extendleft(reversed(batch))
+
+    async def recent(self, participant: str, limit: int = 20) -> List[ConversationTurn]:
+        """读取参与者最近 limit 条记录 (包含尚未写入的缓冲记录)"""
+        await self.flush()
+        return await run_blocking(self._executor, self.backend.recent, participant, limit)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+    async def aclose(self):
+        """停止后台任务，写完剩余记录后关闭后端"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        if self._buffer:
+            # 关闭时仍写入失败的记录无法再重试
+            self.dropped += len(self._buffer)
+            logger.error(f"❌ 关闭时 {len(self._buffer)} 条对话记录未能写入")
+            self._buffer.clear()
+        await run_blocking(self._executor, self.backend.close)
+        self._executor.shutdown(wait=True)
+        logger.info(f"✅ 对话存储已关闭 (写入 {self.written} 条, 丢弃 {self.dropped} 条)")
+
+
+def create_conversation_store() -> ConversationStore:
+    """根据配置创建对话存储"""
+    from core.config import settings
+    return ConversationStore(
+        SQLiteConversationBackend(settings.CONVERSATION_DB_PATH),
+        flush_interval=settings.CONVERSATION_FLUSH_INTERVAL
+    )
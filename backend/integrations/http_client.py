@@ -0,0 +1,155 @@
+# backend/integrations/http_client.py
+
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+from core.config import settings
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:  # pragma: no cover - prometheus_client 为可选依赖
+    Counter = Gauge = None
+
+logger = logging.getLogger(__name__)
+
+if Counter is not None:
+    _CONNECTIONS = Counter("voice_assistant_http_connections_total", "HTTP 连接获取方式 (新建/复用)", ["kind"])
+    _DNS = Counter("voice_assistant_http_dns_total", "DNS 缓存命中情况", ["result"])
+    _QUEUED = Counter("voice_assistant_http_pool_waits_total", "连接池已满时的排队次数")
+else:
+    _CONNECTIONS = _DNS = _QUEUED = None
+
+
+class HTTPClientManager:
+    """
+    全局 HTTP 客户端
+
+    所有集成 (TTS / STT / 工具) 共用一个 TCPConnector，按主机复用 keep-alive 连接并缓存 DNS，
+    避免每条路径各自握手 TLS。session 在第一次使用时于当前事件循环中创建，
+    只在进程退出时由 aclose() 关闭，组件自身不要关闭它。
+    WebSocket (STT/TTS 流) 在整个生命周期内占用一个连接并计入上限，
+    limit_per_host 需大于同一主机上的并发流数；连接池满时的排队次数见 stats()["queued"]。
+    """
+
+    def __init__(
+            self,
+            *,
+            limit: int = 200,
+            limit_per_host: int = 64,
+            ttl_dns_cache: int = 300,
+            keepalive_timeout: float = 30.0,
+            connect_timeout: float = 10.0,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.created = 0
+        self.reused = 0
+        self.queued = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_create(session, ctx, params):
+            self.created += 1
+            if _CONNECTIONS is not None:
+                _CONNECTIONS.labels(kind="created").inc()
+
+        async def on_reuse(session, ctx, params):
+            self.reused += 1
+            if _CONNECTIONS is not None:
+                _CONNECTIONS.labels(kind="reused").inc()
+
+        async def on_queued(session, ctx, params):
+            self.queued += 1
+            if _QUEUED is not None:
+                _QUEUED.inc()
+
+        async def on_dns_hit(session, ctx, params):
+            self.dns_hits += 1
+            if _DNS is not None:
+                _DNS.labels(result="hit").inc()
+
+        async def on_dns_miss(session, ctx, params):
+            self.dns_misses += 1
+            if _DNS is not None:
+                _DNS.labels(result="miss").inc()
+
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        trace.on_connection_queued_start.append(on_queued)
+        trace.on_dns_cache_hit.append(on_dns_hit)
+        trace.on_dns_cache_miss.append(on_dns_miss)
+        return trace
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """共享 session (必须在事件循环中调用)"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=self._connector,
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout),
+                trace_configs=[self._trace_config()],
+            )
+            self._loop = loop
+            logger.info(
+                f"✅ HTTP 连接池已创建 (上限 {self.limit}，每主机 {self.limit_per_host}，"
+                f"keep-alive {self.keepalive_timeout:.0f}s)"
+            )
+        return self._session
+
+    def stats(self) -> dict:
+        """连接池状态: 空闲/使用中的连接数和累计的新建/复用次数"""
+        idle = 0
+        acquired = 0
+        if self._connector is not None and not self._connector.closed:
+            idle = sum(len(conns) for conns in self._connector._conns.values())
+            acquired = len(self._connector._acquired)
+        return {
+            "idle": idle,
+            "acquired": acquired,
+            "created": self.created,
+            "reused": self.reused,
+            "queued": self.queued,
+            "dns_hits": self.dns_hits,
+            "dns_misses": self.dns_misses,
+        }
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("🔌 HTTP 连接池已关闭")
+        self._session = None
+        self._connector = None
+        self._loop = None
+
+
+# 全局实例
+http_clients = HTTPClientManager(
+    limit=settings.HTTP_POOL_LIMIT,
+    limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+    ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+    keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+)
+
+if Gauge is not None:
+    Gauge("voice_assistant_http_pool_idle", "连接池空闲连接数").set_function(lambda: http_clients.stats()["idle"])
+    Gauge("voice_assistant_http_pool_acquired", "连接池使用中连接数").set_function(
+        lambda: http_clients.stats()["acquired"])
@@ -0,0 +1,142 @@
+# backend/integrations/language.py
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 语言代码 -> 回复语言提示中使用的名称
+LANGUAGE_NAMES = {
+    "zh": "中文",
+    "yue": "粤语",
+    "en": "English",
+    "ja": "日本語",
+    "ko": "한국어",
+    "de": "Deutsch",
+    "fr": "Français",
+    "ru": "Русский",
+}
+
+# 使用拉丁字母的语言 (无法只按文字区分，取候选中的第一个)
+_LATIN = ("en", "de", "fr")
+
+# 每个字符计入的权重: 一个汉字/假名/谚文约等于一个音节，拉丁字母约 1/3 个音节
+_WEIGHTS = {"han": 1.0, "kana": 1.0, "hangul": 1.0, "cyrillic": 0.34, "latin": 0.34}
+
+
+def _script(ch: str) -> Optional[str]:
+    code = ord(ch)
+    if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+        return "han"
+    if 0x3040 <= code <= 0x30FF:
+        return "kana"
+    if 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+        return "hangul"
+    if 0x0400 <= code <= 0x04FF:
+        return "cyrillic"
+    if (ch.isascii() and ch.isalpha()) or 0x00C0 <= code <= 0x024F:
+        return "latin"
+    return None
+
+
+def script_counts(text: str) -> Dict[str, float]:
+    """按文字类型统计加权字符数 (标点/数字/空白不计)"""
+    counts: Dict[str, float] = {}
+    for ch in text:
+        script = _script(ch)
+        if script is not None:
+            counts[script] = counts.get(script, 0.0) + _WEIGHTS[script]
+    return counts
+
+
+def base_language(language: str) -> str:
+    """zh-CN -> zh"""
+    return language.split("-")[0].split("_")[0].lower()
+
+
+class LanguageDetector:
+    """
+    按识别文本的文字类型判断语言
+
+    识别服务在句子结束前就会返回中间结果，中间结果累计到 min_units 个音节且
+    占比超过 threshold 时即判定；第一句的最终结果到达时无论多少都强制判定，
+    因此判定总是早于第一句话的端点。只判定一次。
+    """
+
+    def __init__(self, candidates: Iterable[str], min_units: float = 4.0, threshold: float = 0.7):
+        self.candidates: List[str] = [base_language(c) for c in candidates]
+        if not self.candidates:
+            raise ValueError("LanguageDetector requires at least one candidate language")
+        self.min_units = min_units
+        self.threshold = threshold
+        self.language: Optional[str] = None
+        self.confidence = 0.0
+        self._final: Dict[str, float] = {}
+        self._partial: Dict[str, float] = {}
+
+    @property
+    def decided(self) -> bool:
+        return self.language is not None
+
+    def _to_language(self, script: str, counts: Dict[str, float]) -> Optional[str]:
+        if script == "han":
+            # 汉字夹杂假名按日语处理
+            language = "ja" if counts.get("kana", 0) > 0 and "ja" in self.candidates else "zh"
+        elif script == "kana":
+            language = "ja"
+        elif script == "hangul":
+            language = "ko"
+        elif script == "cyrillic":
+            language = "ru"
+        else:
+            return next((c for c in self.candidates if c in _LATIN), None)
+        if language not in self.candidates and language == "zh" and "yue" in self.candidates:
+            language = "yue"
+        return language if language in self.candidates else None
+
+    def best(self) -> Tuple[Optional[str], float]:
+        """当前累计文本下最可能的语言和占比"""
+        counts = dict(self._final)
+        for script, units in self._partial.items():
+            counts[script] = counts.get(script, 0.0) + units
+        total = sum(counts.values())
+        languages: Dict[str, float] = {}
+        for script, units in counts.items():
+            language = self._to_language(script, counts)
+            if language is not None:
+                languages[language] = languages.get(language, 0.0) + units
+        if not languages:
+            return None, 0.0
+        language = max(languages, key=languages.get)
+        return language, languages[language] / total
+
+    def _units(self) -> float:
+        return sum(self._final.values()) + sum(self._partial.values())
+
+    def observe(self, text: str, final: bool) -> Optional[str]:
+        """
+        输入一条识别结果 (中间结果是当前句的累计文本)
+
+        Returns:
+            本次判定出的语言，未判定或之前已判定时返回 None
+        """
+        if self.decided:
+            return None
+        counts = script_counts(text)
+        if final:
+            for script, units in counts.items():
+                self._final[script] = self._final.get(script, 0.0) + units
+            self._partial = {}
+        else:
+            self._partial = counts
+
+        language, share = self.best()
+        if language is None:
+            if final and self._units():
+                # 文字不属于任何候选语言，沿用第一个候选
+                language, share = self.candidates[0], 0.0
+            else:
+                return None
+        elif not final and (self._units() < self.min_units or share < self.threshold):
+            return None
+
+        self.language = language
+        self.confidence = round(share, 3)
+        return language
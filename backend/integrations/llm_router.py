@@ -0,0 +1,307 @@
+# backend/integrations/llm_router.py
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from livekit.agents import llm
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+from core.config import settings
+from integrations.aliyun.resilience import CircuitBreaker, get_breaker
+
+logger = logging.getLogger(__name__)
+
+
+class StubLLM(llm.LLM):
+    """本地兜底 LLM: 所有后端都不可用时返回固定回复"""
+
+    def __init__(self, reply: str = "抱歉，我现在有点忙，请稍后再试。"):
+        super().__init__()
+        self.reply = reply
+
+    @property
+    def model(self) -> str:
+        return "local-stub"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs) -> "StubLLMStream":
+        return StubLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        request_id = str(uuid.uuid4())
+        for i in range(0, len(self._llm.reply), 8):
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=self._llm.reply[i:i + 8])
+            ))
+
+
+class LLMBackend:
+    """一个已配置的 LLM 后端及其滚动统计"""
+
+    def __init__(self, name: str, instance: llm.LLM, fallback_only: bool = False, prior_ttft: float = 1.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.llm = instance
+        # 只在其它后端都不可用时使用 (例如本地兜底)
+        self.fallback_only = fallback_only
+        self.ttft: Optional[float] = None
+        self.prior_ttft = prior_ttft
+        self.breaker = breaker or get_breaker(f"llm:{name}")
+        self.requests = 0
+        self.hedged_wins = 0
+
+    @property
+    def healthy(self) -> bool:
+        return not self.breaker.is_open
+
+    @property
+    def expected_ttft(self) -> float:
+        return self.ttft if self.ttft is not None else self.prior_ttft
+
+    def record_ttft(self, seconds: float, alpha: float = 0.3):
+        self.ttft = seconds if self.ttft is None else self.ttft + alpha * (seconds - self.ttft)
+        self.breaker.record_success()
+
+    def record_failure(self):
+        self.breaker.record_failure()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "ttft": round(self.ttft, 3) if self.ttft is not None else None,
+            "breaker": self.breaker.state,
+            "failures": self.breaker.failures,
+            "requests": self.requests,
+            "hedged_wins": self.hedged_wins,
+        }
+
+
+class LLMRouter:
+    """
+    多后端 LLM 路由
+
+    按滚动首 token 延迟选择最快的健康后端；首 token 超过 hedge_after
+    仍未到达时向次优后端再发一个请求，谁先出 token 用谁；
+    超过 first_token_timeout 都没有首 token 时判定失败并换下一个后端。
+    熔断中的后端排在兜底后端之后。
+    chat() 返回的流与单个 LLM 的 chat() 用法相同。
+    """
+
+    def __init__(self, backends: List[LLMBackend], hedge_after: Optional[float] = 1.5,
+                 first_token_timeout: Optional[float] = None):
+        if not backends:
+            raise ValueError("LLMRouter requires at least one backend")
+        self.backends = backends
+        self.hedge_after = hedge_after
+        self.first_token_timeout = first_token_timeout
+
+    def rank(self) -> List[LLMBackend]:
+        """按 (是否熔断, 是否兜底, 预计首 token 延迟) 排序"""
+        order = {id(b): i for i, b in enumerate(self.backends)}
+        return sorted(
+            self.backends,
+            key=lambda b: (not b.healthy, b.fallback_only, b.expected_ttft, order[id(b)])
+        )
+
+    def chat(self, **kwargs) -> "RouterStream":
+        ranked = self.rank()
+        # 立即在首选后端上创建流，参数错误 (TypeError) 直接抛给调用方
+        primary = ranked[0]
+        stream = primary.llm.chat(**kwargs)
+        return RouterStream(self, ranked, kwargs, primary, stream)
+
+    def stats(self) -> List[dict]:
+        return [b.stats() for b in self.backends]
+
+
+class _Attempt:
+    """一次后端请求"""
+
+    def __init__(self, backend: LLMBackend, stream):
+        self.backend = backend
+        self.stream = stream
+        self.started = time.perf_counter()
+        backend.requests += 1
+        self.first = asyncio.ensure_future(stream.__anext__())
+
+    async def aclose(self):
+        if not self.first.done():
+            self.first.cancel()
+        try:
+            await self.stream.aclose()
+        except Exception:
+            pass
+
+
+class RouterStream:
+    """路由后的 LLM 流 (异步迭代 ChatChunk)"""
+
+    def __init__(self, router: LLMRouter, ranked: List[LLMBackend], kwargs: Dict[str, Any],
+                 primary: LLMBackend, stream):
+        self._router = router
+        self._candidates = [b for b in ranked if b is not primary]
+        self._kwargs = kwargs
+        self._attempts = [_Attempt(primary, stream)]
+        self._winner: Optional[_Attempt] = None
+        self._pending_chunk = None
+
+    def __aiter__(self):
+        return self
+
+    def _next_candidate(self) -> Optional[LLMBackend]:
+        while self._candidates:
+            backend = self._candidates.pop(0)
+            if backend.healthy or not self._candidates:
+                return backend
+        return None
+
+    def _launch(self, backend: LLMBackend) -> bool:
+        try:
+            self._attempts.append(_Attempt(backend, backend.llm.chat(**self._kwargs)))
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ LLM 后端 {backend.name} 创建请求失败: {e}")
+            backend.record_failure()
+            return False
+
+    async def _select(self):
+        """等待第一个产出 token 的请求，必要时对冲或故障转移"""
+        hedge_after = self._router.hedge_after
+        first_token_timeout = self._router.first_token_timeout
+        deadline = time.perf_counter() + hedge_after if hedge_after else None
+        give_up_at = time.perf_counter() + first_token_timeout if first_token_timeout else None
+
+        while self._attempts:
+            timeouts = []
+            if deadline is not None and self._candidates:
+                timeouts.append(deadline - time.perf_counter())
+            if give_up_at is not None:
+                timeouts.append(give_up_at - time.perf_counter())
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+
+            done, _ = await asyncio.wait(
+                [a.first for a in self._attempts],
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done and give_up_at is not None and time.perf_counter() >= give_up_at:
+                # 首 token 截止: 进行中的请求全部判定失败，换下一个后端
+                logger.warning(f"⚠️ LLM 首 token 超过 {first_token_timeout:.1f}s: "
+                               f"{[a.backend.name for a in self._attempts]}")
+                for attempt in self._attempts:
+                    attempt.backend.record_failure()
+                    await attempt.aclose()
+                self._attempts = []
+                backend = self._next_candidate()
+                while backend is not None and not self._launch(backend):
+                    backend = self._next_candidate()
+                if not self._attempts:
+                    raise asyncio.TimeoutError("LLM 首 token 超时")
+                deadline = None
+                give_up_at = time.perf_counter() + first_token_timeout
+                continue
+
+            if not done:
+                # 首 token 超时: 对冲到下一个后端
+                deadline = None
+                backend = self._next_candidate()
+                if backend is not None:
+                    logger.info(f"⏱️ LLM 首 token 超过 {hedge_after:.1f}s，对冲请求: {backend.name}")
+                    self._launch(backend)
+                continue
+
+            for attempt in [a for a in self._attempts if a.first in done]:
+                try:
+                    chunk = attempt.first.result()
+                except StopAsyncIteration:
+                    chunk = None
+                    error = None
+                except Exception as e:
+                    chunk = None
+                    error = e
+                else:
+                    error = None
+
+                if error is None:
+                    attempt.backend.record_ttft(time.perf_counter() - attempt.started)
+                    self._winner = attempt
+                    self._pending_chunk = chunk
+                    if attempt is not self._attempts[0]:
+                        attempt.backend.hedged_wins += 1
+                    for other in self._attempts:
+                        if other is not attempt:
+                            await other.aclose()
+                    self._attempts = [attempt]
+                    logger.debug(f"LLM 路由: {attempt.backend.name}")
+                    return
+
+                logger.warning(f"⚠️ LLM 后端 {attempt.backend.name} 失败: {error}")
+                attempt.backend.record_failure()
+                self._attempts.remove(attempt)
+                await attempt.aclose()
+
+                # 故障转移: 没有其它请求在跑时立即换下一个后端
+                if not self._attempts:
+                    backend = self._next_candidate()
+                    while backend is not None and not self._launch(backend):
+                        backend = self._next_candidate()
+                    if not self._attempts:
+                        raise error
+
+    async def __anext__(self):
+        if self._winner is None:
+            await self._select()
+            chunk, self._pending_chunk = self._pending_chunk, None
+            if chunk is None:
+                await self.aclose()
+                raise StopAsyncIteration
+            return chunk
+
+        try:
+            return await self._winner.stream.__anext__()
+        except StopAsyncIteration:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        for attempt in self._attempts:
+            await attempt.aclose()
+
+
+def create_llm_router(models: Optional[List[str]] = None) -> LLMRouter:
+    """根据配置创建 LLM 路由 (models 为空时使用 LLM_MODELS)"""
+    from integrations.aliyun.llm import create_llm, create_openai_compatible_llm
+
+    if not models:
+        models = [m.strip() for m in settings.LLM_MODELS.split(",") if m.strip()]
+    backends = []
+    for i, model in enumerate(models):
+        backends.append(LLMBackend(model, create_llm(model), prior_ttft=1.0 + i * 0.1))
+
+    if settings.OPENAI_COMPAT_BASE_URL:
+        backends.append(LLMBackend(
+            settings.OPENAI_COMPAT_MODEL,
+            create_openai_compatible_llm(
+                base_url=settings.OPENAI_COMPAT_BASE_URL,
+                api_key=settings.OPENAI_COMPAT_API_KEY or "",
+                model=settings.OPENAI_COMPAT_MODEL
+            ),
+            prior_ttft=1.0 + len(backends) * 0.1
+        ))
+
+    if settings.LLM_STUB_FALLBACK:
+        backends.append(LLMBackend("local-stub", StubLLM(), fallback_only=True))
+
+    hedge_after = settings.LLM_HEDGE_AFTER_MS / 1000 if settings.LLM_HEDGE_AFTER_MS > 0 else None
+    logger.info(f"✅ LLM 路由: {[b.name for b in backends]} (对冲阈值 {hedge_after}s)")
+    return LLMRouter(
+        backends,
+        hedge_after=hedge_after,
+        first_token_timeout=settings.LLM_FIRST_TOKEN_TIMEOUT or None
+    )
@@ -1,4 +1,12 @@
-from .weather import weather_tool
+from .registry import tool, tool_registry, ToolRegistry, ToolSpec
 from .manager import tool_manager
 
-__all__ = ['weather_tool', 'tool_manager']
\ No newline at end of file
+__all__ = ['tool', 'tool_registry', 'ToolRegistry', 'ToolSpec', 'tool_manager', 'weather_tool']
+
+
+def __getattr__(name):
+    # 工具模块按需导入
+    if name == 'weather_tool':
+        from .weather import weather_tool
+        return weather_tool
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,236 @@
+# backend/integrations/tools/cache.py
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个条目除键值外的估算开销 (字节)
+_ENTRY_OVERHEAD = 96
+
+
+def _canonical(value: Any) -> Any:
+    """参数规范化: 字符串去首尾空白并做 NFKC 归一化，容器递归处理"""
+    if isinstance(value, str):
+        return unicodedata.normalize("NFKC", value).strip()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def cache_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+    """规范化的缓存键: 参数顺序、空白和全/半角差异不影响命中"""
+    encoded = json.dumps(_canonical(arguments), sort_keys=True, ensure_ascii=False,
+                         separators=(",", ":"), default=str)
+    return f"{tool_name}:{encoded}"
+
+
+class _LeaderCancelled(Exception):
+    """执行者被取消 (等待者应重新发起，而不是一起被取消)"""
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: str, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class _SQLiteStore:
+    """缓存持久化 (单线程写入，保证顺序且不阻塞事件循环)"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool-cache")
+
+    def load(self, now: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT key, value, expires_at FROM tool_cache ORDER BY expires_at"
+            ).fetchall()
+
+    def _write(self, sql: str, params: tuple):
+        try:
+            with self._lock:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ 工具缓存持久化失败: {e}")
+
+    def put(self, key: str, value: str, expires_at: float):
+        self._executor.submit(self._write,
+                              "INSERT OR REPLACE INTO tool_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                              (key, value, expires_at))
+
+    def delete(self, key: str):
+        self._executor.submit(self._write, "DELETE FROM tool_cache WHERE key = ?", (key,))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+class ToolResultCache:
+    """
+    工具结果缓存
+
+    - 按内存字节数限制的 LRU，过期时间来自工具声明的 cache_ttl
+    - 单飞: 相同键的并发调用只执行一次，其余等待同一结果；
+      执行者被取消 (打断/会话关闭) 时由一个等待者重新执行，其余等待者继续等待
+    - 可选 SQLite 持久化，重启后恢复未过期的结果
+    只缓存成功的结果，异常会传给所有等待者且不写入缓存。
+    """
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024, path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        self._store: Optional[_SQLiteStore] = None
+        if path:
+            try:
+                self._store = _SQLiteStore(path)
+                for key, value, expires_at in self._store.load(time.time()):
+                    self._insert(key, value, expires_at)
+                logger.info(f"✅ 工具缓存已恢复 {len(self._entries)} 条: {path}")
+            except Exception as e:
+                logger.warning(f"⚠️ 工具缓存持久化不可用，仅使用内存: {e}")
+                self._store = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            if self._store:
+                self._store.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: str, ttl: float):
+        if ttl <= 0 or not isinstance(value, str):
+            return
+        expires_at = time.time() + ttl
+        if self._insert(key, value, expires_at) and self._store:
+            self._store.put(key, value, expires_at)
+
+    def _insert(self, key: str, value: str, expires_at: float) -> bool:
+        size = len(key.encode()) + len(value.encode()) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, expires_at, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    async def get_or_call(self, key: str, ttl: float, fn: Callable[[], Awaitable[str]]) -> str:
+        """命中直接返回；否则执行 fn (相同键的并发调用共享一次执行)"""
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # 执行者被取消，第一个醒来的等待者成为新的执行者
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            # 只取消执行者自己，唤醒等待者重新发起
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+    def close(self):
+        """关闭持久化 (缓存是进程级单例，只在进程退出时由 AgentRuntime 调用)"""
+        if self._store:
+            self._store.close()
+            self._store = None
+
+
+def create_tool_cache() -> ToolResultCache:
+    """根据配置创建工具结果缓存"""
+    from core.config import settings
+    return ToolResultCache(max_bytes=settings.TOOL_CACHE_MAX_BYTES, path=settings.TOOL_CACHE_PATH)
@@ -0,0 +1,214 @@
+# backend/integrations/tools/executor.py
+
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from core.exceptions import ToolArgumentError, ToolTimeoutError
+from .registry import ToolSpec
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:  # pragma: no cover - prometheus_client 为可选依赖
+    Counter = Histogram = None
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图桶上限 (秒)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+if Histogram is not None:
+    _LATENCY = Histogram("voice_assistant_tool_latency_seconds", "工具执行耗时", ["tool"], buckets=LATENCY_BUCKETS)
+    _OUTCOMES = Counter("voice_assistant_tool_calls_total", "工具调用结果", ["tool", "outcome"])
+else:
+    _LATENCY = _OUTCOMES = None
+
+_JSON_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+
+def _check(schema: dict, value: Any, path: str) -> List[str]:
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_JSON_CHECKS.get(t, lambda v: True)(value) for t in types):
+            return [f"{path} 应为 {'/'.join(types)}，实际为 {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path} 必须是 {schema['enum']} 之一")
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(_check(schema["items"], item, f"{path}[{i}]"))
+    if isinstance(value, dict) and "properties" in schema:
+        errors.extend(validate_arguments(schema, value, path))
+    return errors
+
+
+def validate_arguments(schema: dict, arguments: Dict[str, Any], path: str = "") -> List[str]:
+    """
+    按 JSON Schema 的常用子集校验参数 (type / required / enum / properties / items)
+
+    Returns:
+        错误列表，为空表示通过
+    """
+    if not isinstance(arguments, dict):
+        return [f"{path or '参数'} 应为 object"]
+    properties = schema.get("properties", {})
+    errors = [
+        f"缺少参数 {path}{name}"
+        for name in schema.get("required", [])
+        if name not in arguments
+    ]
+    for name, value in arguments.items():
+        if name not in properties:
+            if schema.get("additionalProperties", False) is False:
+                errors.append(f"未知参数 {path}{name}")
+            continue
+        errors.extend(_check(properties[name], value, f"{path}{name}"))
+    return errors
+
+
+class LatencyHistogram:
+    """固定桶延迟直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """按桶上限估算分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class ToolExecutor:
+    """
+    工具执行器
+
+    - 执行前按声明的 Schema 校验参数
+    - 每个工具的截止时间 (spec.timeout，默认 default_timeout) 和并发上限
+    - 异步工具在事件循环中执行，同步工具在线程池中执行，
+      cpu_bound 工具在进程池中执行，不阻塞其它房间
+    - 按工具记录延迟直方图和结果计数
+    进程池中的调用超时后结果被丢弃，但子进程内的计算会继续到结束。
+    """
+
+    def __init__(self, default_timeout: float = 10.0, process_workers: int = 2):
+        self.default_timeout = default_timeout
+        self.process_workers = process_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+
+    def _semaphore(self, spec: ToolSpec) -> Optional[asyncio.Semaphore]:
+        if not spec.max_concurrency:
+            return None
+        semaphore = self._semaphores.get(spec.name)
+        if semaphore is None:
+            semaphore = self._semaphores[spec.name] = asyncio.Semaphore(spec.max_concurrency)
+        return semaphore
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    async def _call(self, spec: ToolSpec, arguments: Dict[str, Any]):
+        if spec.cpu_bound:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), functools.partial(spec.function, **arguments))
+        if inspect.iscoroutinefunction(spec.function):
+            return await spec.function(**arguments)
+        return await asyncio.to_thread(spec.function, **arguments)
+
+    async def _limited(self, spec: ToolSpec, arguments: Dict[str, Any]):
+        semaphore = self._semaphore(spec)
+        if semaphore is None:
+            return await self._call(spec, arguments)
+        async with semaphore:
+            return await self._call(spec, arguments)
+
+    async def run(self, spec: ToolSpec, arguments: Dict[str, Any]):
+        """校验参数并在截止时间内执行工具"""
+        errors = validate_arguments(spec.parameters, arguments)
+        if errors:
+            self._record(spec.name, "invalid", None)
+            raise ToolArgumentError(f"参数错误: {'; '.join(errors)}")
+
+        timeout = spec.timeout if spec.timeout is not None else self.default_timeout
+        started = time.perf_counter()
+        try:
+            # 截止时间包含排队等待并发名额的时间
+            result = await asyncio.wait_for(self._limited(spec, arguments), timeout)
+        except asyncio.TimeoutError:
+            self._record(spec.name, "timeout", time.perf_counter() - started)
+            raise ToolTimeoutError(f"{spec.name} 执行超时 ({timeout:.1f}s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(spec.name, "error", time.perf_counter() - started)
+            raise
+
+        self._record(spec.name, "ok", time.perf_counter() - started)
+        return result
+
+    def _record(self, tool_name: str, outcome: str, seconds: Optional[float]):
+        outcomes = self._outcomes.setdefault(tool_name, {})
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if _OUTCOMES is not None:
+            _OUTCOMES.labels(tool=tool_name, outcome=outcome).inc()
+        if seconds is None:
+            return
+        histogram = self._histograms.get(tool_name)
+        if histogram is None:
+            histogram = self._histograms[tool_name] = LatencyHistogram()
+        histogram.observe(seconds)
+        if _LATENCY is not None:
+            _LATENCY.labels(tool=tool_name).observe(seconds)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {**histogram.stats(), "outcomes": self._outcomes.get(name, {})}
+            for name, histogram in self._histograms.items()
+        }
+
+    def close(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
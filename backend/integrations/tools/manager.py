@@ -1,9 +1,12 @@
 # backend/integrations/tools/manager.py
 
-import json
 import logging
-from typing import Dict, Any, Callable
-from .weather import weather_tool
+from typing import Dict, Any, Optional
+
+from core.exceptions import ToolError
+from .cache import ToolResultCache, cache_key, create_tool_cache
+from .executor import ToolExecutor
+from .registry import ToolRegistry, ToolSpec, tool_registry
 
 logger = logging.getLogger(__name__)
 
@@ -11,40 +14,39 @@ logger = logging.getLogger(__name__)
 class ToolManager:
     """工具调用管理器"""
 
-    def __init__(self):
-        # 注册所有可用工具
-        self.tools = {
-            "get_weather": {
-                "function": weather_tool.get_weather,
-                "description": "获取指定城市的实时天气信息",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "city": {
-                            "type": "string",
-                            "description": "城市名称,例如:北京、上海、深圳"
-                        }
-                    },
-                    "required": ["city"]
-                }
-            }
-        }
+    def __init__(
+            self,
+            registry: ToolRegistry = tool_registry,
+            cache: Optional[ToolResultCache] = None,
+            executor: Optional[ToolExecutor] = None,
+    ):
+        # 工具通过 @tool 装饰器注册，首次使用时才导入工具模块
+        self.registry = registry
+        # 可缓存工具 (cacheable 且 cache_ttl > 0) 的结果缓存，所有房间共享
+        self.cache = cache
+        # 参数校验、截止时间、并发上限和进程池隔离
+        self.executor = executor or ToolExecutor()
+
+    @property
+    def tools(self) -> Dict[str, ToolSpec]:
+        return self.registry.specs
+
+    def get_spec(self, tool_name: str) -> Optional[ToolSpec]:
+        return self.registry.get(tool_name)
 
     def get_tool_definitions(self) -> list:
         """
         获取工具定义(符合 OpenAI Function Calling 格式)
         """
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": name,
-                    "description": info["description"],
-                    "parameters": info["parameters"]
-                }
-            }
-            for name, info in self.tools.items()
-        ]
+        return self.registry.definitions()
+
+    async def _invoke(self, spec: ToolSpec, arguments: Dict[str, Any]) -> str:
+        return await self.executor.run(spec, arguments)
+
+    def close(self):
+        self.executor.close()
+        if self.cache is not None:
+            self.cache.close()
 
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """
@@ -57,22 +59,42 @@ class ToolManager:
         Returns:
             执行结果
         """
-        if tool_name not in self.tools:
+        spec = self.get_spec(tool_name)
+        if spec is None:
             return f"错误: 未知的工具 '{tool_name}'"
 
         try:
             logger.info(f"🔧 执行工具: {tool_name}, 参数: {arguments}")
 
-            func = self.tools[tool_name]["function"]
-            result = await func(**arguments)
+            if self.cache is not None and spec.cacheable and spec.cache_ttl > 0:
+                result = await self.cache.get_or_call(
+                    cache_key(tool_name, arguments),
+                    spec.cache_ttl,
+                    lambda: self._invoke(spec, arguments)
+                )
+            else:
+                result = await self._invoke(spec, arguments)
 
             logger.info(f"✅ 工具执行成功: {tool_name}")
             return result
 
+        except ToolError as e:
+            # 超时/参数错误等预期内的失败不打印堆栈
+            logger.warning(f"⚠️ 工具执行失败: {e}")
+            return f"工具执行出错: {str(e)}"
+
         except Exception as e:
             logger.error(f"❌ 工具执行失败: {e}", exc_info=True)
             return f"工具执行出错: {str(e)}"
 
 
+def _create_executor() -> ToolExecutor:
+    from core.config import settings
+    return ToolExecutor(
+        default_timeout=settings.TOOL_DEFAULT_TIMEOUT,
+        process_workers=settings.TOOL_PROCESS_WORKERS
+    )
+
+
 # 全局实例
-tool_manager = ToolManager()
\ No newline at end of file
+tool_manager = ToolManager(cache=create_tool_cache(), executor=_create_executor())
@@ -0,0 +1,276 @@
+# backend/integrations/tools/registry.py
+
+import importlib
+import inspect
+import logging
+import re
+import typing
+from importlib.metadata import entry_points
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 第三方包通过该 entry point 组声明工具模块
+ENTRY_POINT_GROUP = "voice_assistant.tools"
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
+
+class ToolSpec:
+    """一个已注册的工具: 函数、JSON Schema 以及调度元数据"""
+
+    def __init__(
+            self,
+            name: str,
+            function: Callable,
+            description: str,
+            parameters: dict,
+            *,
+            expected_latency: float = 1.0,
+            cacheable: bool = False,
+            cache_ttl: float = 0.0,
+            idempotent: bool = False,
+            max_concurrency: Optional[int] = None,
+            cpu_bound: bool = False,
+            timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.function = function
+        self.description = description
+        self.parameters = parameters
+        # 预计耗时 (秒)，没有实测数据时用于决定是否播放填充音频
+        self.expected_latency = expected_latency
+        # 相同参数的结果可以复用
+        self.cacheable = cacheable
+        self.cache_ttl = cache_ttl
+        # 可安全重试/与其它调用并行执行 (默认否: 有副作用的工具不应因为漏写而被并行执行)
+        self.idempotent = idempotent
+        # 同时执行的调用数上限 (None 不限制)
+        self.max_concurrency = max_concurrency
+        # CPU 密集型，在进程池中执行 (须为模块级同步函数)
+        self.cpu_bound = cpu_bound
+        if cpu_bound and inspect.iscoroutinefunction(function):
+            raise ValueError(f"cpu_bound tool {name!r} must be a plain function")
+        # 执行截止时间 (秒)，None 使用执行器默认值
+        self.timeout = timeout
+
+    def definition(self) -> dict:
+        """OpenAI Function Calling 格式的定义"""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            }
+        }
+
+    def __repr__(self) -> str:
+        return f"ToolSpec({self.name!r})"
+
+
+def _json_type(annotation) -> dict:
+    """Python 类型注解 -> JSON Schema 类型"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return _json_type(args[0]) if len(args) == 1 else {}
+    if origin is typing.Literal:
+        values = list(typing.get_args(annotation))
+        schema = _json_type(type(values[0])) if values else {}
+        schema["enum"] = values
+        return schema
+    if origin in (list, tuple, set):
+        args = typing.get_args(annotation)
+        schema = {"type": "array"}
+        if args:
+            schema["items"] = _json_type(args[0])
+        return schema
+    if origin is dict:
+        return {"type": "object"}
+    json_type = _JSON_TYPES.get(annotation)
+    return {"type": json_type} if json_type else {"type": "string"}
+
+
+def _parse_docstring(doc: str) -> tuple:
+    """拆分 docstring: (摘要, {参数名: 说明})"""
+    if not doc:
+        return "", {}
+    lines = inspect.cleandoc(doc).splitlines()
+
+    summary = []
+    for line in lines:
+        if not line.strip() or line.strip().endswith(":") and line.strip()[:-1] in ("Args", "Returns"):
+            break
+        summary.append(line.strip())
+
+    params = {}
+    in_args = False
+    current = None
+    for line in lines:
+        stripped = line.strip()
+        if stripped in ("Args:", "Arguments:", "Parameters:"):
+            in_args = True
+            continue
+        if not in_args:
+            continue
+        if stripped.endswith(":") and not line.startswith((" ", "\t")):
+            break
+        match = re.match(r"^\s+(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)$", line)
+        if match:
+            current = match.group(1)
+            params[current] = match.group(2).strip()
+        elif current and stripped:
+            params[current] += " " + stripped
+    return " ".join(summary), params
+
+
+def build_schema(func: Callable) -> tuple:
+    """
+    根据类型注解和 docstring 生成工具描述与参数 Schema
+
+    Returns:
+        (description, parameters)
+    """
+    description, param_docs = _parse_docstring(func.__doc__ or "")
+    hints = typing.get_type_hints(func)
+    properties = {}
+    required = []
+
+    for name, param in inspect.signature(func).parameters.items():
+        if name in ("self", "cls") or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        schema = _json_type(hints.get(name, str))
+        if name in param_docs:
+            schema["description"] = param_docs[name]
+        if param.default is inspect.Parameter.empty:
+            required.append(name)
+        else:
+            schema["default"] = param.default
+        properties[name] = schema
+
+    parameters = {"type": "object", "properties": properties}
+    if required:
+        parameters["required"] = required
+    return description, parameters
+
+
+class ToolRegistry:
+    """
+    工具注册表
+
+    工具模块用 @tool 装饰器声明自己；模块本身在第一次使用注册表时才导入，
+    来源为配置的模块列表和 entry point 组 voice_assistant.tools。
+    """
+
+    def __init__(self, modules: Optional[Iterable[str]] = None, use_entry_points: bool = True):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._modules: List[str] = list(modules or [])
+        self._use_entry_points = use_entry_points
+        self._loaded = False
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        if spec.name in self._specs and self._specs[spec.name].function is not spec.function:
+            logger.warning(f"⚠️ 工具重复注册，覆盖: {spec.name}")
+        self._specs[spec.name] = spec
+        return spec
+
+    def tool(
+            self,
+            func: Optional[Callable] = None,
+            *,
+            name: Optional[str] = None,
+            description: Optional[str] = None,
+            **metadata: Any,
+    ):
+        """
+        注册工具的装饰器
+
+        用法:
+            @tool(expected_latency=1.5, cacheable=True, cache_ttl=600, idempotent=True, max_concurrency=4)
+            async def get_weather(city: str) -> str:
+                \"\"\"获取指定城市的实时天气信息
+
+                Args:
+                    city: 城市名称
+                \"\"\"
+        """
+
+        def decorator(fn: Callable) -> Callable:
+            summary, parameters = build_schema(fn)
+            spec = ToolSpec(
+                name or fn.__name__,
+                fn,
+                description or summary or f"工具: {name or fn.__name__}",
+                parameters,
+                **metadata
+            )
+            self.register(spec)
+            fn.tool_spec = spec
+            return fn
+
+        if func is not None:
+            return decorator(func)
+        return decorator
+
+    def add_module(self, module: str):
+        """追加一个待加载的工具模块"""
+        if module not in self._modules:
+            self._modules.append(module)
+            if self._loaded:
+                self._import(module)
+
+    def _import(self, module: str):
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.error(f"❌ 加载工具模块失败: {module}: {e}")
+
+    def load(self):
+        """导入所有工具模块 (只执行一次)"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        for module in self._modules:
+            self._import(module)
+
+        if self._use_entry_points:
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+                try:
+                    entry_point.load()
+                except Exception as e:
+                    logger.error(f"❌ 加载工具插件失败: {entry_point.name}: {e}")
+
+        logger.info(f"✅ 已加载 {len(self._specs)} 个工具: {list(self._specs)}")
+
+    @property
+    def specs(self) -> Dict[str, ToolSpec]:
+        self.load()
+        return self._specs
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self.specs.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.specs
+
+    def definitions(self) -> list:
+        return [spec.definition() for spec in self.specs.values()]
+
+
+def _default_modules() -> List[str]:
+    from core.config import settings
+    return [m.strip() for m in settings.TOOL_MODULES.split(",") if m.strip()]
+
+
+# 全局实例
+tool_registry = ToolRegistry(_default_modules())
+tool = tool_registry.tool
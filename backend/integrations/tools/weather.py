@@ -1,9 +1,12 @@
 # backend/integrations/tools/weather.py
 
-import aiohttp
 import logging
 from typing import Optional
 
+from core.exceptions import ToolError
+from integrations.http_client import http_clients
+from .registry import tool
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,38 +28,50 @@ class WeatherTool:
             天气描述文本
         """
         try:
-            url = f"{self.base_url}/{city}?format=j1&lang=zh"
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return f"抱歉,无法获取{city}的天气信息"
-
-                    data = await response.json()
-
-                    # 解析天气数据
-                    current = data['current_condition'][0]
-                    temp = current['temp_C']
-                    feels_like = current['FeelsLikeC']
-                    weather_desc = current['lang_zh'][0]['value']
-                    humidity = current['humidity']
-                    wind_speed = current['windspeedKmph']
-
-                    result = (
-                        f"{city}的天气情况:\n"
-                        f"天气: {weather_desc}\n"
-                        f"温度: {temp}°C (体感温度 {feels_like}°C)\n"
-                        f"湿度: {humidity}%\n"
-                        f"风速: {wind_speed} 公里/小时"
-                    )
-
-                    logger.info(f"✅ 获取天气成功: {city}")
-                    return result
-
+            return await self.fetch(city)
         except Exception as e:
             logger.error(f"❌ 获取天气失败: {e}")
             return f"抱歉,查询天气时出现错误: {str(e)}"
 
+    async def fetch(self, city: str) -> str:
+        """查询天气，失败时抛出 ToolError (失败结果不会被缓存)"""
+        url = f"{self.base_url}/{city}?format=j1&lang=zh"
+
+        async with http_clients.session.get(url) as response:
+            if response.status != 200:
+                raise ToolError(f"无法获取{city}的天气信息 (HTTP {response.status})")
+
+            data = await response.json()
+
+            # 解析天气数据
+            current = data['current_condition'][0]
+            temp = current['temp_C']
+            feels_like = current['FeelsLikeC']
+            weather_desc = current['lang_zh'][0]['value']
+            humidity = current['humidity']
+            wind_speed = current['windspeedKmph']
+
+            result = (
+                f"{city}的天气情况:\n"
+                f"天气: {weather_desc}\n"
+                f"温度: {temp}°C (体感温度 {feels_like}°C)\n"
+                f"湿度: {humidity}%\n"
+                f"风速: {wind_speed} 公里/小时"
+            )
+
+            logger.info(f"✅ 获取天气成功: {city}")
+            return result
+
 
 # 全局实例
-weather_tool = WeatherTool()
\ No newline at end of file
+weather_tool = WeatherTool()
+
+
+@tool(expected_latency=1.5, cacheable=True, cache_ttl=600, idempotent=True, max_concurrency=4, timeout=5.0)
+async def get_weather(city: str) -> str:
+    """获取指定城市的实时天气信息
+
+    Args:
+        city: 城市名称,例如:北京、上海、深圳
+    """
+    return await weather_tool.fetch(city)
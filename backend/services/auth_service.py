@@ -1,22 +1,36 @@
 # backend/services/auth_service.py
 
 import logging
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, Optional
 from core.config import settings
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = logging.getLogger(__name__)
 
 
 class AuthService:
-    """认证服务"""
+    """认证服务 (Supabase 客户端在第一次使用时才导入和创建)"""
 
     def __init__(self):
-        """初始化 Supabase 客户端"""
-        self.supabase: Client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_KEY
-        )
-        logger.info("✅ Supabase 客户端已初始化")
+        self._supabase: Optional["Client"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def supabase(self) -> "Client":
+        """Supabase 客户端"""
+        if self._supabase is None:
+            with self._lock:
+                if self._supabase is None:
+                    from supabase import create_client
+                    self._supabase = create_client(
+                        settings.SUPABASE_URL,
+                        settings.SUPABASE_KEY
+                    )
+                    logger.info("✅ Supabase 客户端已初始化")
+        return self._supabase
 
     async def login(self, email: str, password: str) -> dict:
         """
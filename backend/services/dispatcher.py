@@ -0,0 +1,395 @@
+# backend/services/dispatcher.py
+
+import asyncio
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerState:
+    """一个 Agent worker 上报的状态"""
+    worker_id: str
+    capacity: int
+    rooms: Set[str] = field(default_factory=set)
+    last_seen: float = 0.0
+    draining: bool = False
+
+    @property
+    def free(self) -> int:
+        return max(0, self.capacity - len(self.rooms))
+
+    @property
+    def load(self) -> float:
+        return len(self.rooms) / self.capacity if self.capacity else 1.0
+
+
+class WorkerScaler(ABC):
+    """启动/停止 worker 的方式 (本机子进程、容器编排等)"""
+
+    @abstractmethod
+    def start_worker(self, worker_id: str):
+        """启动 worker，worker 启动后以 worker_id 上报心跳"""
+
+    @abstractmethod
+    def stop_worker(self, worker_id: str, exiting: bool = False):
+        """
+        停止 worker (在事件循环中调用，不能阻塞)
+
+        Args:
+            worker_id: worker 标识
+            exiting: worker 已报告排空完成、正在自行退出，只需回收资源
+        """
+
+    def reap(self):
+        """回收已停止的 worker (每个调度周期调用)"""
+
+    async def aclose(self):
+        """调度器关闭时停止所有 worker"""
+
+
+class LocalWorkerScaler(WorkerScaler):
+    """在本机以子进程运行 agent/worker.py"""
+
+    def __init__(self, command: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None,
+                 stop_timeout: float = 5.0):
+        backend_dir = Path(__file__).parent.parent
+        self.command = command or [sys.executable, str(backend_dir / "agent" / "worker.py")]
+        self.env = env or {}
+        # 超过这个时间仍未退出: 自行退出的进程发 SIGTERM，已发 SIGTERM 的进程 SIGKILL
+        self.stop_timeout = stop_timeout
+        self.processes: Dict[str, subprocess.Popen] = {}
+        # 正在停止的进程: worker_id -> (进程, 下一步的截止时间, 是否已发送 SIGTERM)
+        self.stopping: Dict[str, Tuple[subprocess.Popen, float, bool]] = {}
+
+    def start_worker(self, worker_id: str):
+        env = {**os.environ, **self.env, "WORKER_ID": worker_id}
+        self.processes[worker_id] = subprocess.Popen(self.command, env=env)
+        logger.info(f"🚀 启动 worker 进程: {worker_id} (pid={self.processes[worker_id].pid})")
+
+    def stop_worker(self, worker_id: str, exiting: bool = False):
+        # 不等待进程退出，由之后调度周期的 reap() 回收
+        process = self.processes.pop(worker_id, None)
+        if process is None:
+            return
+        # 正在退出的 worker 还在等待 leaving 心跳的响应，不发信号
+        terminate = not exiting and process.poll() is None
+        if terminate:
+            process.terminate()
+        self.stopping[worker_id] = (process, time.monotonic() + self.stop_timeout, terminate)
+        self.reap()
+
+    def reap(self):
+        now = time.monotonic()
+        for worker_id, (process, deadline, terminated) in list(self.stopping.items()):
+            code = process.poll()
+            if code is not None:
+                del self.stopping[worker_id]
+                logger.info(f"🛑 worker 进程已停止: {worker_id} (退出码 {code})")
+            elif now >= deadline:
+                if terminated:
+                    logger.warning(f"⚠️ worker 进程未响应 SIGTERM，强制结束: {worker_id}")
+                    process.kill()
+                else:
+                    process.terminate()
+                self.stopping[worker_id] = (process, now + self.stop_timeout, True)
+
+    async def aclose(self):
+        for worker_id in list(self.processes):
+            self.stop_worker(worker_id)
+        while self.stopping:
+            await asyncio.sleep(0.1)
+            self.reap()
+
+
+class Dispatcher:
+    """
+    Agent 调度器
+
+    - 需要 Agent 的房间进入等待队列 (同一房间只排队一次)
+    - worker 定期上报容量和正在服务的房间，心跳超时的 worker 上的房间重新排队
+    - 房间分配给负载最低 (已用/容量) 的 worker，分配结果在下次心跳时下发
+    - 按目标利用率计算需要的 worker 数，通过 WorkerScaler 启动新 worker 或让空闲 worker 排空退出
+    调度状态在内存中，只应在单个 API 进程中运行。
+    """
+
+    def __init__(
+            self,
+            *,
+            scaler: Optional[WorkerScaler] = None,
+            worker_capacity: int = 4,
+            target_utilization: float = 0.7,
+            min_workers: int = 0,
+            max_workers: int = 4,
+            heartbeat_timeout: float = 15.0,
+            startup_timeout: float = 60.0,
+            scale_down_delay: float = 30.0,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.scaler = scaler
+        self.worker_capacity = worker_capacity
+        self.target_utilization = target_utilization
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout
+        # 需求持续低于现有 worker 数这么久才排空，避免抖动
+        self.scale_down_delay = scale_down_delay
+        self._clock = clock
+
+        self.workers: Dict[str, WorkerState] = {}
+        self._queue: Deque[str] = deque()
+        self._queued: Set[str] = set()
+        # 房间 -> worker (含已分配但 worker 尚未确认的房间)
+        self._placements: Dict[str, str] = {}
+        # worker -> 待下发的房间
+        self._outbox: Dict[str, List[str]] = {}
+        # 已请求启动但还没有心跳的 worker
+        self._starting: Dict[str, float] = {}
+        self._surplus_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- 房间 ----
+
+    def request_agent(self, room: str) -> str:
+        """
+        为房间请求一个 Agent
+
+        Returns:
+            "assigned" (已有 worker 负责) 或 "queued"
+        """
+        if room in self._placements:
+            return "assigned"
+        if room not in self._queued:
+            self._queue.append(room)
+            self._queued.add(room)
+            logger.info(f"📥 房间等待 Agent: {room} (队列 {len(self._queue)})")
+        self._assign()
+        return "assigned" if room in self._placements else "queued"
+
+    def release(self, room: str):
+        """房间结束，不再需要 Agent"""
+        if room in self._queued:
+            self._queued.discard(room)
+            self._queue.remove(room)
+        worker_id = self._placements.pop(room, None)
+        if worker_id and worker_id in self.workers:
+            self.workers[worker_id].rooms.discard(room)
+            outbox = self._outbox.get(worker_id)
+            if outbox and room in outbox:
+                outbox.remove(room)
+
+    def _requeue(self, rooms, front: bool = True):
+        for room in rooms:
+            self._placements.pop(room, None)
+            if room in self._queued:
+                continue
+            self._queued.add(room)
+            if front:
+                self._queue.appendleft(room)
+            else:
+                self._queue.append(room)
+
+    # ---- worker ----
+
+    def heartbeat(self, worker_id: str, capacity: int, rooms: List[str], leaving: bool = False) -> dict:
+        """
+        处理 worker 心跳
+
+        Args:
+            worker_id: worker 标识
+            capacity: 最多同时服务的房间数
+            rooms: worker 当前正在服务的房间
+            leaving: worker 即将退出 (排空完成)
+
+        Returns:
+            {"assign": 新分配的房间, "drain": 是否应在房间结束后退出}
+        """
+        now = self._clock()
+        self._starting.pop(worker_id, None)
+
+        if leaving:
+            self._forget(worker_id, requeue=rooms)
+            if self.scaler:
+                self.scaler.stop_worker(worker_id, exiting=True)
+            self._assign()
+            return {"assign": [], "drain": True}
+
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            worker = self.workers[worker_id] = WorkerState(worker_id, capacity)
+            logger.info(f"✅ worker 上线: {worker_id} (容量 {capacity})")
+        worker.capacity = capacity
+        worker.last_seen = now
+
+        # 已分配但尚未下发的房间 worker 还不知道，仍算作它的负载
+        pending = set(self._outbox.get(worker_id, ()))
+        delivered = {r for r, w in self._placements.items() if w == worker_id} - pending
+        reported = set(rooms)
+        for room in delivered - reported:
+            # worker 已不再服务该房间 (房间结束或加入失败)
+            self._placements.pop(room, None)
+        for room in reported:
+            owner = self._placements.get(room)
+            if owner is None or owner not in self.workers:
+                self._placements[room] = worker_id
+                if room in self._queued:
+                    self._queued.discard(room)
+                    self._queue.remove(room)
+        worker.rooms = reported | pending
+
+        self._assign()
+        assign = self._outbox.pop(worker_id, [])
+        return {"assign": assign, "drain": worker.draining}
+
+    def _forget(self, worker_id: str, requeue=()):
+        worker = self.workers.pop(worker_id, None)
+        self._outbox.pop(worker_id, None)
+        orphaned = {r for r, w in self._placements.items() if w == worker_id}
+        if worker:
+            orphaned |= worker.rooms
+        orphaned |= set(requeue)
+        for room in orphaned:
+            self._placements.pop(room, None)
+        self._requeue(sorted(orphaned))
+
+    def expire(self):
+        """移除心跳超时的 worker，它们的房间重新排队"""
+        now = self._clock()
+        for worker_id, worker in list(self.workers.items()):
+            if now - worker.last_seen > self.heartbeat_timeout:
+                logger.warning(f"⚠️ worker 心跳超时，房间重新分配: {worker_id} {sorted(worker.rooms)}")
+                self._forget(worker_id)
+                if self.scaler:
+                    self.scaler.stop_worker(worker_id)
+        for worker_id, started_at in list(self._starting.items()):
+            if now - started_at > self.startup_timeout:
+                logger.warning(f"⚠️ worker 启动超时: {worker_id}")
+                del self._starting[worker_id]
+                if self.scaler:
+                    self.scaler.stop_worker(worker_id)
+
+    def _assign(self):
+        """按最低负载把排队的房间分配给 worker"""
+        while self._queue:
+            candidates = [w for w in self.workers.values() if not w.draining and w.free > 0]
+            if not candidates:
+                return
+            worker = min(candidates, key=lambda w: (w.load, len(w.rooms), w.worker_id))
+            room = self._queue.popleft()
+            self._queued.discard(room)
+            worker.rooms.add(room)
+            self._placements[room] = worker.worker_id
+            self._outbox.setdefault(worker.worker_id, []).append(room)
+            logger.info(f"📤 房间 {room} -> worker {worker.worker_id} ({len(worker.rooms)}/{worker.capacity})")
+
+    # ---- 扩缩容 ----
+
+    def desired_workers(self) -> int:
+        demand = len(self._placements) + len(self._queue)
+        per_worker = max(self.worker_capacity * self.target_utilization, 1e-9)
+        return max(self.min_workers, min(self.max_workers, math.ceil(demand / per_worker)))
+
+    def autoscale(self):
+        """按目标利用率启动或排空 worker"""
+        if self.scaler is None:
+            return
+        desired = self.desired_workers()
+        active = [w for w in self.workers.values() if not w.draining]
+        current = len(active) + len(self._starting)
+
+        if desired >= current:
+            self._surplus_since = None
+        if desired > current:
+            # 先撤销排空，再启动新进程
+            for worker in self.workers.values():
+                if worker.draining and current < desired:
+                    worker.draining = False
+                    current += 1
+            for _ in range(desired - current):
+                worker_id = f"worker-{uuid.uuid4().hex[:8]}"
+                self._starting[worker_id] = self._clock()
+                self.scaler.start_worker(worker_id)
+        elif desired < current and not self._starting:
+            now = self._clock()
+            if self._surplus_since is None:
+                self._surplus_since = now
+            if now - self._surplus_since < self.scale_down_delay:
+                return
+            self._surplus_since = None
+            for worker in sorted(active, key=lambda w: (len(w.rooms), w.worker_id))[:current - desired]:
+                worker.draining = True
+                logger.info(f"📉 worker 开始排空: {worker.worker_id} ({len(worker.rooms)} 个房间)")
+        self._assign()
+
+    def tick(self):
+        if self.scaler:
+            self.scaler.reap()
+        self.expire()
+        self._assign()
+        self.autoscale()
+
+    async def run(self, interval: float = 2.0):
+        """后台定期检查心跳、分配房间和扩缩容"""
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"❌ 调度失败: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = 2.0):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run(interval))
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.scaler:
+            await self.scaler.aclose()
+
+    def utilization(self) -> float:
+        capacity = sum(w.capacity for w in self.workers.values() if not w.draining)
+        return round(len(self._placements) / capacity, 3) if capacity else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "queued": list(self._queue),
+            "placements": dict(self._placements),
+            "starting": list(self._starting),
+            "utilization": self.utilization(),
+            "desired_workers": self.desired_workers(),
+            "workers": {
+                w.worker_id: {"capacity": w.capacity, "rooms": sorted(w.rooms), "draining": w.draining}
+                for w in self.workers.values()
+            },
+        }
+
+
+def create_dispatcher() -> Dispatcher:
+    """根据配置创建调度器"""
+    from core.config import settings
+    return Dispatcher(
+        scaler=LocalWorkerScaler() if settings.WORKER_AUTOSCALE else None,
+        worker_capacity=settings.WORKER_CAPACITY,
+        target_utilization=settings.WORKER_TARGET_UTILIZATION,
+        min_workers=settings.WORKER_MIN,
+        max_workers=settings.WORKER_MAX,
+        heartbeat_timeout=settings.WORKER_HEARTBEAT_SECONDS * 3,
+    )
@@ -0,0 +1,91 @@
+"""
+日志管道基准测试: 每次 logger.info 在事件循环上的阻塞时间
+
+用法: python test/bench_logger.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import logger as log_module
+
+CALLS = 20000
+
+
+def legacy_logger(log_dir: Path) -> logging.Logger:
+    """原实现: 控制台和滚动文件处理器直接挂在日志器上"""
+    logger = logging.getLogger("bench_legacy")
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                  datefmt='%Y-%m-%d %H:%M:%S')
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(log_dir / "bench_legacy.log", maxBytes=10 * 1024 * 1024,
+                                       backupCount=5, encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    logger.addHandler(console_handler)
+    logger.addHandler(file_handler)
+    return logger
+
+
+async def measure(logger: logging.Logger) -> list:
+    """在事件循环中逐条记录，返回每次调用耗时 (微秒)"""
+    samples = []
+    for i in range(CALLS):
+        started = time.perf_counter()
+        logger.info(f"🤖 AI: 北京今天晴，气温二十三度 (第 {i} 轮)")
+        samples.append((time.perf_counter() - started) * 1e6)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    return sorted(samples)
+
+
+def report(name: str, samples: list):
+    mean = sum(samples) / len(samples)
+    p99 = samples[int(len(samples) * 0.99)]
+    print(f"📊 {name:12s} 平均 {mean:6.1f}us  p99 {p99:7.1f}us  最长 {samples[-1]:8.1f}us  "
+          f"合计阻塞 {sum(samples) / 1000:7.1f}ms")
+
+
+async def main():
+    print(f"🧪 日志管道基准测试 ({CALLS} 次 logger.info，控制台输出到 /dev/null)")
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w", encoding="utf-8") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            legacy = await measure(legacy_logger(Path(tmp)))
+
+            logger = log_module.setup_logger("bench_queue", log_dir=tmp, root=False)
+            queued = await measure(logger)
+            stats = log_module.logging_stats()["bench_queue"]
+
+            # 小队列: 突发日志超过队列容量时丢弃并计数，调用方不阻塞
+            log_module.settings.LOG_QUEUE_SIZE = 100
+            small = log_module.setup_logger("bench_small_queue", log_dir=tmp, root=False)
+            burst_started = time.perf_counter()
+            for i in range(5000):
+                small.info(f"突发日志 {i}")
+            burst = (time.perf_counter() - burst_started) / 5000 * 1e6
+            small_stats = log_module.logging_stats()["bench_small_queue"]
+
+            log_module.shutdown_logging()
+            written = sum(1 for _ in open(Path(tmp) / "bench_queue.log", encoding="utf-8"))
+        finally:
+            sys.stdout = stdout
+
+    report("直接处理器", legacy)
+    report("队列处理器", queued)
+    print(f"📊 队列处理器写入 {written}/{CALLS} 条，丢弃 {stats['dropped']} 条")
+    print(f"📊 小队列突发: 平均 {burst:.1f}us/次，丢弃 {small_stats['dropped']}/5000 条")
+    assert written + stats["dropped"] == CALLS
+    assert small_stats["dropped"] > 0
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+dashscope 协议编解码基准测试: 单核每秒可处理的消息数
+
+用法: python test/bench_protocol.py
+"""
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from integrations.aliyun import protocol
+from integrations.aliyun.protocol import DashscopeASRProtocol
+
+PARAMETERS = {
+    "format": "pcm",
+    "sample_rate": 16000,
+    "language_hints": ["zh"],
+    "max_sentence_silence": 800,
+}
+SECONDS = 2.0
+
+
+def make_messages(count: int, heartbeat_ratio: float) -> list:
+    """构造服务端消息流 (中间结果 + 心跳按比例混合)"""
+    task_id = str(uuid.uuid4())
+    messages = []
+    every = int(1 / heartbeat_ratio) if heartbeat_ratio else 0
+    for i in range(count):
+        if every and i % every == 0:
+            sentence = {"begin_time": i * 20, "end_time": None, "text": "", "heartbeat": True, "sentence_end": False}
+        else:
+            sentence = {
+                "begin_time": i * 20,
+                "end_time": i * 20 + 800,
+                "text": "今天北京的天气怎么样"[:1 + i % 10],
+                "words": [
+                    {"begin_time": i * 20 + k * 80, "end_time": i * 20 + k * 80 + 80, "text": "天", "punctuation": ""}
+                    for k in range(1 + i % 10)
+                ],
+                "heartbeat": False,
+                "sentence_end": i % 10 == 9,
+            }
+        messages.append(json.dumps({
+            "header": {"task_id": task_id, "event": "result-generated", "attributes": {}},
+            "payload": {"output": {"sentence": sentence}, "usage": None},
+        }, ensure_ascii=False))
+    return messages
+
+
+def legacy_decode(data: str):
+    """原实现: 完整 json.loads + 逐层 .get"""
+    message = json.loads(data)
+    header = message.get("header", {})
+    event = header.get("event")
+    if event == "result-generated":
+        payload = message.get("payload", {})
+        output = payload.get("output", {})
+        if "sentence" in output:
+            sentence = output["sentence"]
+            text = sentence.get("text", "").strip()
+            if text and not sentence.get("heartbeat", False):
+                return text
+    return None
+
+
+def throughput(func, messages) -> float:
+    n = 0
+    started = time.perf_counter()
+    deadline = started + SECONDS
+    while time.perf_counter() < deadline:
+        for data in messages:
+            func(data)
+        n += len(messages)
+    return n / (time.perf_counter() - started)
+
+
+def legacy_run_task(task_id: str) -> str:
+    return json.dumps({
+        "header": {"action": "run-task", "task_id": task_id, "streaming": "duplex"},
+        "payload": {
+            "task_group": "audio", "task": "asr", "function": "recognition",
+            "model": "paraformer-realtime-v2", "parameters": PARAMETERS, "input": {}
+        }
+    })
+
+
+def main():
+    print("=" * 60)
+    print(f"📨 dashscope 协议基准测试 (orjson: {'是' if protocol.orjson else '否'})")
+    print("=" * 60)
+
+    codec = DashscopeASRProtocol("paraformer-realtime-v2", PARAMETERS)
+
+    for ratio in (0.0, 0.25, 0.5):
+        messages = make_messages(1000, ratio)
+        legacy = throughput(legacy_decode, messages)
+        fast = throughput(codec.decode, messages)
+        print(f"  心跳占比 {ratio:>4.0%}:  json {legacy:>10,.0f} msg/s   codec {fast:>10,.0f} msg/s   ({fast / legacy:.1f}x)")
+
+    task_ids = [str(uuid.uuid4()) for _ in range(1000)]
+    legacy = throughput(legacy_run_task, task_ids)
+    fast = throughput(codec.run_task, task_ids)
+    print(f"  run-task 编码:  json {legacy:>10,.0f} msg/s   template {fast:>10,.0f} msg/s   ({fast / legacy:.1f}x)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
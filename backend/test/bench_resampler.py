@@ -0,0 +1,130 @@
+"""
+重采样器基准测试: PolyphaseResampler vs rtc.AudioResampler(QUICK)
+
+用法: python test/bench_resampler.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from livekit import rtc
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from audio.resampler import PolyphaseResampler, resample_batch
+
+OUTPUT_RATE = 16000
+FRAME_MS = 10
+SECONDS = 10
+
+
+def make_frames(signal: np.ndarray, rate: int, num_channels: int = 1):
+    samples = rate * FRAME_MS // 1000
+    pcm = np.clip(np.round(signal), -32768, 32767).astype(np.int16)
+    if num_channels > 1:
+        pcm = np.repeat(pcm[:, None], num_channels, axis=1).reshape(-1)
+    step = samples * num_channels
+    return [
+        rtc.AudioFrame(pcm[i:i + step].tobytes(), rate, num_channels, samples)
+        for i in range(0, len(pcm) - step + 1, step)
+    ]
+
+
+def run(resampler, frames) -> np.ndarray:
+    out = []
+    for frame in frames:
+        for f in resampler.push(frame):
+            out.append(np.frombuffer(f.data, dtype=np.int16))
+    for f in resampler.flush():
+        out.append(np.frombuffer(f.data, dtype=np.int16))
+    return np.concatenate(out) if out else np.zeros(0, dtype=np.int16)
+
+
+def tone_snr(out: np.ndarray, freq: float) -> float:
+    """对已知频率做最小二乘正弦拟合，残差即噪声+失真"""
+    seg = out[OUTPUT_RATE // 4:-OUTPUT_RATE // 4].astype(np.float64)
+    t = np.arange(len(seg)) / OUTPUT_RATE
+    basis = np.stack([np.sin(2 * np.pi * freq * t), np.cos(2 * np.pi * freq * t)], axis=1)
+    coef, *_ = np.linalg.lstsq(basis, seg, rcond=None)
+    fitted = basis @ coef
+    return 10 * np.log10(np.sum(fitted ** 2) / np.sum((seg - fitted) ** 2))
+
+
+def alias_db(out: np.ndarray, amplitude: float) -> float:
+    """高于输出 Nyquist 的输入音调残留 (dB，越低越好)"""
+    rms = np.sqrt(np.mean(out[OUTPUT_RATE // 4:].astype(np.float64) ** 2)) + 1e-9
+    return 20 * np.log10(rms / (amplitude / np.sqrt(2)))
+
+
+def cpu_per_stream(make_resampler, frames) -> float:
+    """单路流每秒音频消耗的 CPU 毫秒"""
+    resampler = make_resampler()
+    started = time.process_time()
+    for frame in frames:
+        resampler.push(frame)
+    return (time.process_time() - started) * 1000 / SECONDS
+
+
+def main():
+    print("=" * 60)
+    print("🎛️ 重采样器基准测试")
+    print("=" * 60)
+
+    for rate, channels in [(48000, 1), (48000, 2), (44100, 1), (24000, 1)]:
+        t = np.arange(rate * SECONDS) / rate
+        tone = 10000 * np.sin(2 * np.pi * 1000 * t)
+        alias_tone = 10000 * np.sin(2 * np.pi * 10000 * t) if rate > 20000 else None
+        frames = make_frames(tone, rate, channels)
+
+        def make_livekit():
+            return rtc.AudioResampler(
+                input_rate=rate,
+                output_rate=OUTPUT_RATE,
+                num_channels=channels,
+                quality=rtc.AudioResamplerQuality.QUICK
+            )
+
+        print(f"\n📊 输入 {rate} Hz / {channels} 声道")
+        for name, factory in [("rtc QUICK", make_livekit), ("polyphase", PolyphaseResampler)]:
+            cpu = cpu_per_stream(factory, frames)
+            out = run(factory(), frames)
+            if channels > 1 and name == "rtc QUICK":
+                # rtc.AudioResampler 保留声道数，取左声道比较
+                out = out.reshape(-1, channels)[:, 0]
+            line = f"  {name:<10} CPU {cpu:6.2f} ms/s   SNR {tone_snr(out, 1000):5.1f} dB"
+            if alias_tone is not None:
+                alias_out = run(factory(), make_frames(alias_tone, rate, channels))
+                if channels > 1 and name == "rtc QUICK":
+                    alias_out = alias_out.reshape(-1, channels)[:, 0]
+                line += f"   10kHz 混叠 {alias_db(alias_out, 10000):6.1f} dB"
+            print(line)
+
+    # 批量处理: 多路参与者一次调用
+    rate = 48000
+    t = np.arange(rate * SECONDS) / rate
+    frames = make_frames(8000 * np.sin(2 * np.pi * 440 * t), rate)
+    print("\n📦 批量重采样 (48kHz, 每路 CPU ms/s)")
+    for streams in (1, 8, 32, 128):
+        resamplers = [PolyphaseResampler() for _ in range(streams)]
+        started = time.process_time()
+        for frame in frames:
+            resample_batch(resamplers, [frame] * streams)
+        batched = (time.process_time() - started) * 1000 / SECONDS / streams
+
+        livekit = [
+            rtc.AudioResampler(rate, OUTPUT_RATE, quality=rtc.AudioResamplerQuality.QUICK)
+            for _ in range(streams)
+        ]
+        started = time.process_time()
+        for frame in frames:
+            for resampler in livekit:
+                resampler.push(frame)
+        baseline = (time.process_time() - started) * 1000 / SECONDS / streams
+        print(f"  {streams:>4} 路: polyphase 批量 {batched:6.3f}   rtc QUICK {baseline:6.3f}")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
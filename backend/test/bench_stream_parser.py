@@ -0,0 +1,121 @@
+"""
+LLM 流式输出解析基准测试: 每个块的解析开销
+
+用法: python test/bench_stream_parser.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from livekit.agents import llm
+from livekit.agents.llm import FunctionCall
+from openai.types.chat import ChatCompletionChunk
+
+from agent.stream_parser import StreamParser
+
+CHUNKS = 2000
+ROUNDS = 50
+
+TEXT = "今天北京晴，气温二十三度，适合出门散步。"
+
+
+def livekit_chunks(count: int) -> list:
+    return [
+        llm.ChatChunk(id="bench", delta=llm.ChoiceDelta(role="assistant", content=TEXT[i % len(TEXT)]))
+        for i in range(count)
+    ]
+
+
+def openai_chunks(count: int) -> list:
+    return [
+        ChatCompletionChunk.model_validate({
+            "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "qwen-turbo",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": TEXT[i % len(TEXT)]}}],
+        })
+        for i in range(count)
+    ]
+
+
+def openai_tool_call_chunks() -> list:
+    """工具调用参数分成多个分片流式返回"""
+    arguments = json.dumps({"city": "北京", "unit": "celsius"}, ensure_ascii=False)
+    pieces = [arguments[i:i + 4] for i in range(0, len(arguments), 4)]
+    chunks = []
+    for i, piece in enumerate(pieces):
+        tool_call = {"index": 0, "function": {"arguments": piece}}
+        if i == 0:
+            tool_call.update(id="call_1", type="function")
+            tool_call["function"]["name"] = "get_weather"
+        chunks.append(ChatCompletionChunk.model_validate({
+            "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "qwen-turbo",
+            "choices": [{"index": 0, "delta": {"tool_calls": [tool_call]}}],
+        }))
+    return chunks
+
+
+def legacy_parse(chunks: list) -> str:
+    """原实现: 每个块都走一遍 hasattr 链，字符串反复拼接"""
+    full_response = ""
+    pending_tool_calls = []
+    for chunk in chunks:
+        if isinstance(chunk, FunctionCall):
+            pending_tool_calls.append(chunk)
+            continue
+        if hasattr(chunk, 'choices') and chunk.choices:
+            choice = chunk.choices[0]
+            if hasattr(choice, 'message') and hasattr(choice.message,
+                                                      'tool_calls') and choice.message.tool_calls:
+                for tool_call in choice.message.tool_calls:
+                    pending_tool_calls.append(tool_call)
+                continue
+            if hasattr(choice, 'delta') and choice.delta and choice.delta.content:
+                full_response += choice.delta.content
+        elif hasattr(chunk, 'delta') and chunk.delta and hasattr(chunk.delta,
+                                                                 'content') and chunk.delta.content:
+            full_response += chunk.delta.content
+        elif hasattr(chunk, 'content') and chunk.content:
+            full_response += chunk.content
+    return full_response
+
+
+def parse(chunks: list) -> str:
+    parser = StreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.text
+
+
+def per_chunk_ns(fn, chunks: list) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter_ns()
+        fn(chunks)
+        best = min(best, (time.perf_counter_ns() - started) / len(chunks))
+    return best
+
+
+def main():
+    print("🧪 LLM 流式输出解析基准测试")
+
+    # 正确性: 工具调用参数分片拼接
+    parser = StreamParser()
+    for chunk in openai_tool_call_chunks():
+        parser.feed(chunk)
+    [call] = parser.tool_calls
+    assert call.name == "get_weather" and call.call_id == "call_1"
+    assert json.loads(call.arguments) == {"city": "北京", "unit": "celsius"}, call.arguments
+    print("✅ 工具调用参数增量拼接 通过")
+
+    for name, chunks in (("LiveKit ChatChunk", livekit_chunks(CHUNKS)), ("OpenAI delta", openai_chunks(CHUNKS))):
+        assert parse(chunks) == legacy_parse(chunks)
+        legacy = per_chunk_ns(legacy_parse, chunks)
+        current = per_chunk_ns(parse, chunks)
+        print(f"📊 {name:18s} 原实现 {legacy:6.0f} ns/块  StreamParser {current:6.0f} ns/块  "
+              f"({legacy / current:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
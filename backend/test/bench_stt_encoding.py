@@ -0,0 +1,107 @@
+"""
+STT 上行编码基准测试: PCM vs Ogg Opus (本地模拟服务)
+
+比较上行带宽、编码 CPU 和识别延迟 (最后一帧发出 -> 收到该句最终结果)。
+
+用法: python test/bench_stt_encoding.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from integrations.aliyun.stt import AliyunSTT
+from mock_dashscope import MockDashscopeServer, SAMPLE_RATE
+
+FRAME_MS = 20
+SECONDS = 8
+SENTENCE_MS = 1000
+
+
+def speech_like_frames(seconds: int):
+    """带音节包络的谐波 + 噪声，比纯正弦更接近语音的编码难度"""
+    rng = np.random.default_rng(0)
+    t = np.arange(seconds * SAMPLE_RATE) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) ** 0.5
+    signal = 6000 * envelope * voiced + 300 * rng.standard_normal(len(t))
+    samples = np.clip(signal, -32768, 32767).astype(np.int16)
+    step = SAMPLE_RATE * FRAME_MS // 1000
+    return [samples[i:i + step].tobytes() for i in range(0, len(samples), step)]
+
+
+async def run(audio_format: str, frames) -> dict:
+    server = MockDashscopeServer(sentence_ms=SENTENCE_MS)
+    await server.start()
+    stt = AliyunSTT(api_key="test-key", url=server.url, audio_format=audio_format)
+    stream = stt.stream()
+    pushed_at = []
+    latencies = []
+    finals = []
+
+    async def collect():
+        async for event in stream:
+            if event.type == SpeechEventType.FINAL_TRANSCRIPT:
+                finals.append(event.alternatives[0].text)
+                # 模拟服务每满 SENTENCE_MS 出一句，对应最后一帧的序号
+                last_frame = len(finals) * SENTENCE_MS // FRAME_MS - 1
+                if last_frame < len(pushed_at):
+                    latencies.append((time.perf_counter() - pushed_at[last_frame]) * 1000)
+
+    collector = asyncio.create_task(collect())
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for i, data in enumerate(frames):
+        pushed_at.append(time.perf_counter())
+        stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, len(data) // 2))
+        # 按实时速率推送
+        await asyncio.sleep(max(0.0, started + (i + 1) * FRAME_MS / 1000 - time.perf_counter()))
+
+    await stream.aclose()
+    await collector
+    cpu = time.process_time() - cpu_started
+    encoder = stream.encoder_stats
+    await stt.aclose()
+    await server.stop()
+
+    return {
+        "format": audio_format,
+        "kbps": server.received_bytes * 8 / SECONDS / 1000,
+        "finals": finals,
+        "latency_ms": sorted(latencies),
+        "encode_cpu_ms": encoder["cpu_seconds"] * 1000,
+        "process_cpu_ms": cpu * 1000,
+        "server_format": server.formats[0],
+    }
+
+
+async def main():
+    print(f"🧪 STT 上行编码基准测试 ({SECONDS}s 音频，实时推送，本地模拟服务)")
+    frames = speech_like_frames(SECONDS)
+    results = [await run("pcm", frames), await run("opus", frames)]
+
+    for r in results:
+        latency = r["latency_ms"]
+        print(f"📊 {r['format']:5s} 上行 {r['kbps']:6.1f} kbit/s  "
+              f"识别延迟 p50 {latency[len(latency) // 2]:5.1f}ms max {latency[-1]:5.1f}ms  "
+              f"编码 CPU {r['encode_cpu_ms']:6.1f}ms ({r['encode_cpu_ms'] / SECONDS / 10:.2f}% 单核)  "
+              f"进程 CPU {r['process_cpu_ms']:6.1f}ms")
+
+    pcm, opus = results
+    assert pcm["server_format"] == "pcm" and opus["server_format"] == "opus"
+    assert opus["finals"] == pcm["finals"], (opus["finals"], pcm["finals"])
+    assert opus["kbps"] < pcm["kbps"] / 5
+    print(f"✅ Opus 带宽为 PCM 的 {opus['kbps'] / pcm['kbps']:.1%}，识别结果一致")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,246 @@
+"""
+本地 dashscope 实时语音识别模拟服务
+
+协议与 wss://dashscope.aliyuncs.com/api-ws/v1/inference 一致 (run-task /
+task-started / result-generated / finish-task / task-finished)。
+每收到 sentence_ms 毫秒音频产出一句最终结果，句子文本由音频内容决定
+(测试音频每帧的样本值即帧序号)，因此重放同一段音频会得到相同文本。
+
+可以按计划主动断开连接，用于测试重连与重放。
+一个连接上可以依次执行多个 run-task (task-finished 之后不关闭连接)。
+format=opus 时按 Ogg 页的 granule position 计算音频时长 (不解码，句子文本只由时间决定)。
+"""
+import asyncio
+import json
+from typing import List, Optional
+
+import numpy as np
+from aiohttp import web, WSMsgType
+
+SAMPLE_RATE = 16000
+
+
+class OggOpusTimeline:
+    """从 Ogg Opus 字节流中解析已收到的音频时长 (毫秒)"""
+
+    def __init__(self):
+        self._buffer = b""
+        self._pre_skip = 0
+        self.ms = 0
+
+    def feed(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= 27 and self._buffer[:4] == b"OggS":
+            segments = self._buffer[26]
+            header_size = 27 + segments
+            if len(self._buffer) < header_size:
+                break
+            size = header_size + sum(self._buffer[27:header_size])
+            if len(self._buffer) < size:
+                break
+            granule = int.from_bytes(self._buffer[6:14], "little", signed=True)
+            body = self._buffer[header_size:size]
+            if body.startswith(b"OpusHead"):
+                self._pre_skip = int.from_bytes(body[10:12], "little")
+            elif granule > 0:
+                # Opus 的 granule position 固定以 48kHz 计
+                self.ms = max(self.ms, (granule - self._pre_skip) // 48)
+            self._buffer = self._buffer[size:]
+        return self.ms
+
+
+class MockDashscopeServer:
+    """模拟 dashscope ASR WebSocket 服务"""
+
+    def __init__(
+            self,
+            sentence_ms: int = 1000,
+            drop_after_ms: Optional[List[int]] = None,
+            frame_ms: int = 20,
+            heartbeat_every: int = 0,
+            texts: Optional[List[str]] = None,
+            interim_ms: int = 0,
+            confidences: Optional[List[float]] = None,
+    ):
+        """
+        Args:
+            sentence_ms: 每句话的音频时长
+            drop_after_ms: 第 i 个连接收到多少毫秒音频后强制断开 (None 表示不断开)
+            frame_ms: 测试音频帧长，用于从样本值推算帧序号
+            heartbeat_every: 每收到多少帧发送一次心跳结果 (0 表示不发送)
+            texts: 第 n 句的文本 (循环使用，默认 "第n句")
+            interim_ms: 每收到多少毫秒音频发送一次中间结果 (0 表示不发送)
+            confidences: 第 n 句的置信度 (循环使用，默认不返回置信度)
+        """
+        self.sentence_ms = sentence_ms
+        self.drop_after_ms = list(drop_after_ms or [])
+        self.frame_ms = frame_ms
+        self.heartbeat_every = heartbeat_every
+        self.texts = list(texts or [])
+        self.interim_ms = interim_ms
+        self.confidences = list(confidences or [])
+        # 每个 run-task 的 (连接序号, 模型, 参数)
+        self.tasks: List[tuple] = []
+        self.connections = 0
+        self.received_bytes = 0
+        self.received_messages = 0
+        self.formats: List[str] = []
+        # 每个请求的客户端地址 (用于检查连接复用)
+        self.peers: List[tuple] = []
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/api-ws/v1/inference"
+
+    @web.middleware
+    async def _track_peer(self, request: web.Request, handler):
+        self.peers.append(request.transport.get_extra_info("peername"))
+        return await handler(request)
+
+    async def start(self):
+        app = web.Application(middlewares=[self._track_peer])
+        app.router.add_get("/api-ws/v1/inference", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        index = self.connections
+        self.connections += 1
+        drop_after = self.drop_after_ms[index] if index < len(self.drop_after_ms) else None
+
+        task_id = None
+        bytes_per_ms = SAMPLE_RATE * 2 // 1000
+
+        async for msg in ws:
+            self.received_messages += 1
+            if msg.type == WSMsgType.TEXT:
+                data = json.loads(msg.data)
+                action = data["header"]["action"]
+                if action == "run-task":
+                    task_id = data["header"]["task_id"]
+                    parameters = data["payload"]["parameters"]
+                    self.tasks.append((index, data["payload"]["model"], parameters))
+                    audio_format = parameters.get("format", "pcm")
+                    self.formats.append(audio_format)
+                    task_bytes = 0
+                    sentence_start = 0
+                    last_interim = 0
+                    first_frame = None
+                    frames = 0
+                    timeline = None
+                    if audio_format == "opus":
+                        timeline = OggOpusTimeline()
+                        first_frame = 0
+                    await self._send_event(ws, task_id, "task-started")
+                elif action == "finish-task":
+                    task_ms = timeline.ms if timeline else task_bytes // bytes_per_ms
+                    if task_ms > sentence_start:
+                        await self._send_sentence(ws, task_id, sentence_start, task_ms, first_frame)
+                    await self._send_event(ws, task_id, "task-finished")
+
+            elif msg.type == WSMsgType.BINARY:
+                self.received_bytes += len(msg.data)
+                if first_frame is None:
+                    first_frame = self._frame_index(msg.data)
+                task_bytes += len(msg.data)
+                frames += 1
+                task_ms = timeline.feed(msg.data) if timeline else task_bytes // bytes_per_ms
+
+                if self.heartbeat_every and frames % self.heartbeat_every == 0:
+                    await ws.send_str(json.dumps({
+                        "header": {"task_id": task_id, "event": "result-generated"},
+                        "payload": {"output": {"sentence": {"heartbeat": True, "text": "", "sentence_end": False}}}
+                    }))
+
+                if drop_after is not None and task_ms >= drop_after:
+                    # 模拟网络中断: 不发 task-finished 直接关闭
+                    await ws.close()
+                    break
+
+                if task_ms - sentence_start >= self.sentence_ms:
+                    await self._send_sentence(ws, task_id, sentence_start, task_ms, first_frame)
+                    sentence_start = last_interim = task_ms
+                elif self.interim_ms and task_ms - last_interim >= self.interim_ms:
+                    await self._send_sentence(ws, task_id, sentence_start, task_ms, first_frame, final=False)
+                    last_interim = task_ms
+
+        return ws
+
+    def _frame_index(self, data: bytes) -> int:
+        samples = np.frombuffer(data[:2], dtype=np.int16)
+        return int(samples[0]) if len(samples) else 0
+
+    async def _send_event(self, ws, task_id: str, event: str):
+        await ws.send_str(json.dumps({"header": {"task_id": task_id, "event": event}, "payload": {}}))
+
+    def text_for(self, index: int) -> str:
+        if self.texts:
+            return self.texts[index % len(self.texts)]
+        return f"第{index}句"
+
+    async def _send_sentence(self, ws, task_id: str, begin_ms: int, end_ms: int, first_frame: int,
+                             final: bool = True):
+        # 由音频内容 (帧序号) 推算句子在整段音频中的序号
+        absolute_ms = (first_frame or 0) * self.frame_ms + begin_ms
+        index = absolute_ms // self.sentence_ms
+        text = self.text_for(index)
+        if not final:
+            # 中间结果: 按已收到的音频比例给出句子前缀
+            text = text[:max(1, len(text) * (end_ms - begin_ms) // self.sentence_ms)]
+        sentence = {
+            "begin_time": begin_ms,
+            "end_time": end_ms if final else None,
+            "text": text,
+            "words": self._words(text, begin_ms, end_ms),
+            "sentence_end": final,
+        }
+        if self.confidences:
+            sentence["confidence"] = self.confidences[index % len(self.confidences)]
+        await ws.send_str(json.dumps({
+            "header": {"task_id": task_id, "event": "result-generated"},
+            "payload": {"output": {"sentence": sentence}}
+        }))
+
+    @staticmethod
+    def _words(text: str, begin_ms: int, end_ms: int) -> List[dict]:
+        """词级时间戳: 按空格 (没有空格时按字) 切分，在句子时长内均匀分布"""
+        tokens = text.split() if " " in text else list(text)
+        step = (end_ms - begin_ms) / max(1, len(tokens))
+        return [
+            {"begin_time": int(begin_ms + i * step), "end_time": int(begin_ms + (i + 1) * step),
+             "text": token, "punctuation": ""}
+            for i, token in enumerate(tokens)
+        ]
+
+
+def numbered_frames(count: int, frame_ms: int = 20) -> List[bytes]:
+    """测试音频: 第 i 帧的所有样本值都是 i"""
+    samples = SAMPLE_RATE * frame_ms // 1000
+    return [np.full(samples, i, dtype=np.int16).tobytes() for i in range(count)]
+
+
+async def serve_forever(port: int = 8765):
+    server = MockDashscopeServer()
+    app = web.Application()
+    app.router.add_get("/api-ws/v1/inference", server._handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    print(f"🧪 Mock dashscope: ws://127.0.0.1:{port}/api-ws/v1/inference")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_forever())
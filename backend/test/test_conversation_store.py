@@ -0,0 +1,156 @@
+"""
+对话存储测试 (写后缓冲 / 批量写入 / 写入失败重试 / 历史恢复 / 可替换后端)
+
+用法: python test/test_conversation_store.py
+"""
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from integrations.database import (
+    ConversationBackend,
+    ConversationStore,
+    ConversationTurn,
+    SQLiteConversationBackend,
+)
+
+
+class SlowMemoryBackend(ConversationBackend):
+    """内存后端，每批写入固定耗时 (模拟慢磁盘)"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.turns: List[ConversationTurn] = []
+        self.batches = 0
+
+    def write_batch(self, turns):
+        time.sleep(self.delay)
+        self.turns.extend(turns)
+        self.batches += 1
+
+    def recent(self, participant, limit):
+        return [t for t in self.turns if t.participant == participant][-limit:]
+
+
+async def test_write_behind_does_not_block():
+    backend = SlowMemoryBackend()
+    store = ConversationStore(backend, flush_interval=0.02, batch_size=50)
+    store.start()
+
+    worst = 0.0
+    for i in range(500):
+        started = time.perf_counter()
+        store.record(ConversationTurn("alice", "user", f"第{i}句"))
+        worst = max(worst, time.perf_counter() - started)
+        if i % 50 == 0:
+            await asyncio.sleep(0)
+
+    turns = await store.recent("alice", 3)
+    assert [t.content for t in turns] == ["第497句", "第498句", "第499句"]
+    await store.aclose()
+
+    assert len(backend.turns) == 500 and backend.batches <= 20, backend.batches
+    assert worst < 0.005, worst
+    print(f"✅ 写后缓冲 通过 (500 条 / {backend.batches} 批, record 最长 {worst * 1e6:.0f}us)")
+
+
+class LockedOnceBackend(SlowMemoryBackend):
+    """前 failures 次写入报 database is locked"""
+
+    def __init__(self, failures: int):
+        super().__init__(delay=0)
+        self.failures = failures
+
+    def write_batch(self, turns):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().write_batch(turns)
+
+
+async def test_failed_batch_retried():
+    """批次写入失败时放回缓冲区头部，下个周期按原顺序重试；超出容量时丢弃最旧的记录"""
+    backend = LockedOnceBackend(failures=2)
+    store = ConversationStore(backend, flush_interval=0.02, batch_size=10)
+    for i in range(25):
+        store.record(ConversationTurn("alice", "user", f"第{i}句"))
+    await store.flush()
+    assert not backend.turns and store.stats()["buffered"] == 25
+
+    store.start()
+    await asyncio.sleep(0.1)
+    assert [t.content for t in backend.turns] == [f"第{i}句" for i in range(25)]
+    assert store.failed_batches == 2 and store.dropped == 0
+
+    # 缓冲区已满时失败的批次只保留较新的记录
+    backend.failures = 1
+    small = ConversationStore(backend, batch_size=4, max_buffer=6)
+    for i in range(6):
+        small.record(ConversationTurn("bob", "user", f"第{i}句"))
+    flushing = asyncio.ensure_future(small.flush())
+    await asyncio.sleep(0)
+    for i in range(6, 9):
+        small.record(ConversationTurn("bob", "user", f"第{i}句"))
+    await flushing
+    assert [t.content for t in small._buffer] == [f"第{i}句" for i in range(3, 9)], list(small._buffer)
+    assert small.dropped == 3
+    await small.aclose()
+    await store.aclose()
+    print("✅ 写入失败重试 通过")
+
+
+async def test_sqlite_restore_after_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "conversations.sqlite3")
+
+        store = ConversationStore(SQLiteConversationBackend(path))
+        store.start()
+        store.record(ConversationTurn("bob", "user", "北京天气怎么样"))
+        store.record(ConversationTurn("bob", "tool_call", '{"city":"北京"}', name="get_weather", call_id="c1"))
+        store.record(ConversationTurn("bob", "tool_result", "晴", name="get_weather", call_id="c1", latency_ms=820.5))
+        store.record(ConversationTurn("bob", "assistant", "北京今天晴", latency_ms=1500.0,
+                                      metadata={"first_token_ms": 300.0}))
+        store.record(ConversationTurn("carol", "user", "你好"))
+        await store.aclose()
+
+        # 模拟重启
+        store = ConversationStore(SQLiteConversationBackend(path))
+        turns = await store.recent("bob", 10)
+        await store.aclose()
+
+    assert [t.role for t in turns] == ["user", "tool_call", "tool_result", "assistant"]
+    assert turns[2].latency_ms == 820.5 and turns[2].name == "get_weather"
+    assert turns[3].metadata == {"first_token_ms": 300.0}
+    print("✅ SQLite 持久化 + 重启后读取 通过")
+
+
+async def test_session_restore():
+    from agent.session import ParticipantSession
+
+    session = ParticipantSession("bob", object(), stt=None, preprocessor=None, respond=None)
+    session.restore([
+        ConversationTurn("bob", "user", "北京天气怎么样"),
+        ConversationTurn("bob", "tool_result", "晴"),
+        ConversationTurn("bob", "assistant", "北京今天晴"),
+    ])
+    messages = [(m.role, m.text_content) for m in session.chat_context.items]
+    assert messages == [("user", "北京天气怎么样"), ("assistant", "北京今天晴")], messages
+    print("✅ 重连恢复对话上下文 通过")
+
+
+async def main():
+    print("🧪 测试对话存储...")
+    await test_write_behind_does_not_block()
+    await test_failed_batch_retried()
+    await test_sqlite_restore_after_restart()
+    await test_session_restore()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+"""
+Agent 调度器测试 (本机模拟 worker: 最低负载分配 / 按利用率扩缩容 / 心跳超时重新分配)
+
+用法: python test/test_dispatcher.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.worker import AgentWorker
+from services.dispatcher import Dispatcher, LocalWorkerScaler, WorkerScaler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SimWorker:
+    """模拟 worker: 收到分配立即加入房间"""
+
+    def __init__(self, worker_id: str, capacity: int):
+        self.worker_id = worker_id
+        self.capacity = capacity
+        self.rooms = set()
+        self.alive = True
+        self.exited = False
+
+    def beat(self, dispatcher: Dispatcher):
+        if not self.alive or self.exited:
+            return
+        reply = dispatcher.heartbeat(self.worker_id, self.capacity, sorted(self.rooms))
+        self.rooms.update(reply["assign"])
+        if reply["drain"] and not self.rooms:
+            dispatcher.heartbeat(self.worker_id, self.capacity, [], leaving=True)
+            self.exited = True
+
+
+class SimScaler(WorkerScaler):
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.workers = {}
+        self.stopped = []
+
+    def start_worker(self, worker_id: str):
+        self.workers[worker_id] = SimWorker(worker_id, self.capacity)
+
+    def stop_worker(self, worker_id: str, exiting: bool = False):
+        self.stopped.append(worker_id)
+        if worker_id in self.workers:
+            self.workers[worker_id].alive = False
+
+    def running(self):
+        return [w for w in self.workers.values() if w.alive and not w.exited]
+
+
+def step(dispatcher: Dispatcher, scaler: SimScaler, clock: FakeClock, seconds: float = 1.0):
+    clock.now += seconds
+    for worker in list(scaler.workers.values()):
+        worker.beat(dispatcher)
+    dispatcher.tick()
+
+
+def test_least_loaded_placement():
+    dispatcher = Dispatcher()
+    busy = SimWorker("busy", 4)
+    busy.rooms = {"r-old-1", "r-old-2", "r-old-3"}
+    workers = [busy, SimWorker("a", 4), SimWorker("b", 4)]
+    for worker in workers:
+        worker.beat(dispatcher)
+
+    for i in range(5):
+        assert dispatcher.request_agent(f"room-{i}") == "assigned"
+    assert dispatcher.request_agent("room-0") == "assigned"
+    for worker in workers:
+        worker.beat(dispatcher)
+
+    loads = {w.worker_id: len(w.rooms) for w in workers}
+    # 新房间先填满空闲 worker，负载 0.75 的 busy 一直没有被选中
+    assert loads == {"busy": 3, "a": 3, "b": 2}, loads
+    print(f"✅ 最低负载分配 通过 ({loads})")
+
+
+def test_autoscale_and_failover():
+    clock = FakeClock()
+    scaler = SimScaler(capacity=2)
+    dispatcher = Dispatcher(scaler=scaler, worker_capacity=2, target_utilization=0.5,
+                            max_workers=5, heartbeat_timeout=3, scale_down_delay=5, clock=clock)
+
+    # 4 个房间，每个 worker 目标 1 个房间 -> 扩容到 4 个 worker
+    for i in range(4):
+        assert dispatcher.request_agent(f"room-{i}") == "queued"
+    dispatcher.tick()
+    assert len(scaler.workers) == 4, scaler.workers
+    for _ in range(2):
+        step(dispatcher, scaler, clock)
+    assert not dispatcher.stats()["queued"]
+    # 房间立即分配给最先上线且有空位的 worker，不等待其余 worker 启动
+    assert len(scaler.running()) == 4
+    assert sum(len(w.rooms) for w in scaler.running()) == 4
+    assert dispatcher.utilization() == 0.5
+    print(f"✅ 扩容 通过 ({len(scaler.running())} 个 worker, 利用率 {dispatcher.utilization()})")
+
+    # 一个 worker 崩溃: 心跳超时后房间重新排队并分配给其它 worker
+    crashed = next(w for w in scaler.running() if w.rooms)
+    lost_room = next(iter(crashed.rooms))
+    crashed.alive = False
+    for _ in range(5):
+        step(dispatcher, scaler, clock)
+    owner = dispatcher.stats()["placements"][lost_room]
+    assert owner != crashed.worker_id
+    assert crashed.worker_id in scaler.stopped
+    assert lost_room in scaler.workers[owner].rooms
+    print(f"✅ 心跳超时重新分配 通过 ({lost_room}: {crashed.worker_id} -> {owner})")
+
+    # 房间结束 -> 持续低负载后排空多余 worker，只保留 1 个
+    for worker in scaler.running():
+        for room in sorted(worker.rooms):
+            if room != "room-0":
+                worker.rooms.discard(room)
+    step(dispatcher, scaler, clock)
+    assert len(scaler.running()) > 1, "排空应有延迟"
+    for _ in range(8):
+        step(dispatcher, scaler, clock)
+    running = scaler.running()
+    assert len(running) == 1 and running[0].rooms == {"room-0"}, [(w.worker_id, w.rooms) for w in running]
+    print(f"✅ 缩容 通过 (排空退出 {sum(w.exited for w in scaler.workers.values())} 个 worker)")
+
+
+class FakeAssistant:
+    def __init__(self, room_name: str, leave_when_empty: bool):
+        self.room_name = room_name
+        self._done = asyncio.Event()
+        FakeAssistant.instances[room_name] = self
+
+    async def start(self):
+        await self._done.wait()
+
+    def stop(self):
+        self._done.set()
+
+
+FakeAssistant.instances = {}
+
+
+async def test_worker_client():
+    """AgentWorker 通过 HTTP 心跳接入调度器，排空后退出"""
+    dispatcher = Dispatcher()
+
+    async def heartbeat(request):
+        body = await request.json()
+        return web.json_response(dispatcher.heartbeat(
+            body["worker_id"], body["capacity"], body["rooms"], leaving=body["leaving"]))
+
+    app = web.Application()
+    app.router.add_post("/api/dispatch/heartbeat", heartbeat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    worker = AgentWorker(f"http://127.0.0.1:{port}/api/dispatch", "w1", capacity=2,
+                         heartbeat_interval=0.05, assistant_factory=FakeAssistant)
+    task = asyncio.create_task(worker.run())
+    try:
+        dispatcher.request_agent("voice-room")
+        await asyncio.sleep(0.2)
+        assert worker.rooms == ["voice-room"], worker.rooms
+        assert dispatcher.stats()["workers"]["w1"]["rooms"] == ["voice-room"]
+
+        dispatcher.workers["w1"].draining = True
+        FakeAssistant.instances["voice-room"].stop()
+        await asyncio.wait_for(task, 2)
+        assert "w1" not in dispatcher.workers
+        print("✅ worker 心跳接入 + 排空退出 通过")
+    finally:
+        task.cancel()
+        await runner.cleanup()
+
+
+async def test_local_scaler_does_not_block():
+    """停止 worker 不阻塞事件循环: 忽略 SIGTERM 的进程在之后的周期被强制结束，自行退出的进程不发信号"""
+    hung = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(60)"
+    scaler = LocalWorkerScaler(command=[sys.executable, "-c", hung], stop_timeout=0.3)
+    dispatcher = Dispatcher(scaler=scaler)
+    scaler.start_worker("hung")
+    await asyncio.sleep(0.5)
+
+    started = time.monotonic()
+    scaler.stop_worker("hung")
+    assert time.monotonic() - started < 0.05
+    assert "hung" in scaler.stopping
+    while scaler.stopping:
+        await asyncio.sleep(0.05)
+        dispatcher.tick()
+    assert time.monotonic() - started < 2
+
+    scaler.command = [sys.executable, "-c", "import time; time.sleep(0.3)"]
+    scaler.stop_timeout = 5.0
+    scaler.start_worker("leaving")
+    dispatcher.heartbeat("leaving", 2, [], leaving=True)
+    process, _, terminated = scaler.stopping["leaving"]
+    assert not terminated
+    while scaler.stopping:
+        await asyncio.sleep(0.05)
+        dispatcher.tick()
+    assert process.returncode == 0, process.returncode
+
+    scaler.start_worker("w")
+    await dispatcher.aclose()
+    assert not scaler.processes and not scaler.stopping
+    print("✅ 停止 worker 不阻塞事件循环 通过")
+
+
+async def main():
+    test_least_loaded_placement()
+    test_autoscale_and_failover()
+    await test_worker_client()
+    await test_local_scaler_does_not_block()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
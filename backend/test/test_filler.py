@@ -0,0 +1,163 @@
+"""
+填充音频测试 (阈值 / 打断时不清掉其他参与者的音频 / 回答播完后不再登记为播放中)
+
+用法: python test/test_filler.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents.llm import ChatContext
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.assistant import AIAssistant
+from agent.filler import FillerScheduler, PlaybackTracker
+from integrations.aliyun.resilience import get_breaker
+
+FRAME = rtc.AudioFrame(b"\x00\x00" * 480, 24000, 1, 480)
+
+
+class FakeSource:
+    """代替共享的 rtc.AudioSource: 记录写入和清空"""
+
+    def __init__(self):
+        self.frames = []
+        self.clears = 0
+        self.queued_duration = 0.0
+
+    async def capture_frame(self, frame):
+        self.frames.append(frame)
+        await asyncio.sleep(0.01)
+
+    def clear_queue(self):
+        self.clears += 1
+
+
+def make_filler(playbacks: PlaybackTracker) -> FillerScheduler:
+    filler = FillerScheduler(tts=None, threshold=0.5, playbacks=playbacks)
+    filler._frames = [FRAME] * 50
+    return filler
+
+
+def test_threshold():
+    filler = make_filler(PlaybackTracker())
+    filler.tracker.set_prior("at_threshold", 0.5)
+    filler.tracker.set_prior("slow", 0.6)
+    assert not filler.should_fill(["at_threshold"])
+    assert filler.should_fill(["at_threshold", "slow"])
+    print("✅ 预计耗时超过阈值才播放 通过")
+
+
+async def test_stop_keeps_other_participants_audio():
+    playbacks = PlaybackTracker()
+    source = FakeSource()
+    filler = make_filler(playbacks)
+
+    # 只有自己的回答: 打断时清掉剩余的填充音频
+    playback = filler.play(source, "user-1")
+    await asyncio.sleep(0.03)
+    with playbacks.playing("user-1", source):
+        await playback.stop()
+    assert source.clears == 1
+
+    # user-2 的回答正在写入同一个音源: 只停止写入，不清空队列
+    playback = filler.play(source, "user-1")
+    await asyncio.sleep(0.03)
+    with playbacks.playing("user-2", source):
+        await playback.stop()
+        written = len(source.frames)
+        await asyncio.sleep(0.03)
+    assert source.clears == 1 and len(source.frames) == written
+
+    # user-2 已写完但音频还在队列里排队: 同样不清空
+    source.queued_duration = 0.2
+    with playbacks.playing("user-2", source):
+        pass
+    source.queued_duration = 0.0
+    playback = filler.play(source, "user-1")
+    await asyncio.sleep(0.03)
+    await playback.stop()
+    assert source.clears == 1
+
+    await asyncio.sleep(0.2)
+    playback = filler.play(source, "user-1")
+    await asyncio.sleep(0.03)
+    await playback.stop()
+    assert source.clears == 2
+    print("✅ 打断填充音频不清掉其他参与者的音频 通过")
+
+
+class FakeLLM:
+    def chat(self, *, chat_ctx, **kwargs):
+        self.kwargs = kwargs
+        async def chunks():
+            for text in ("今天", "晴。"):
+                yield text
+        return chunks()
+
+
+class FakeTTSStream:
+    """与 livekit SynthesizeStream 一致: flush 只结束一段，end_input 之后流才结束"""
+
+    def __init__(self):
+        self._flushed = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._sent = False
+
+    def push_text(self, text: str):
+        pass
+
+    def flush(self):
+        self._flushed.set()
+
+    def end_input(self):
+        self._flushed.set()
+        self._ended.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._flushed.wait()
+        if not self._sent:
+            self._sent = True
+            return FRAME
+        await self._ended.wait()
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self._ended.set()
+
+
+class FakeTTS:
+    sample_rate, num_channels = 24000, 1
+
+    def stream(self):
+        return FakeTTSStream()
+
+
+async def test_turn_releases_playback():
+    """一轮回答播完后不再算作播放中，其他参与者的填充音频可以被清掉"""
+    assistant = AIAssistant(room_name="voice-room")
+    assistant.llm, assistant.tts = FakeLLM(), FakeTTS()
+    assistant.tts_breaker = get_breaker("test-tts")
+    assistant.audio_source = FakeSource()
+
+    await asyncio.wait_for(assistant.process_llm_response(ChatContext(), participant="user-1"), 2)
+    assert len(assistant.audio_source.frames) == 1
+    assert not assistant.playbacks.others_active("user-2")
+    # 工具按 livekit LLM.chat 的 tools 参数传入
+    assert set(assistant.llm.kwargs) == {"tools"}, assistant.llm.kwargs
+    print("✅ 回答播完后释放播放登记 通过")
+
+
+async def main():
+    test_threshold()
+    await test_stop_keeps_other_participants_audio()
+    await test_turn_releases_playback()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
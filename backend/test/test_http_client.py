@@ -0,0 +1,115 @@
+"""
+共享 HTTP 连接池测试 (STT 预热与 WebSocket 复用连接 / 工具请求 keep-alive 复用 / 统计 / 关闭)
+
+用法: python test/test_http_client.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from aiohttp import web
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from integrations.aliyun.stt import AliyunSTT
+from integrations.http_client import http_clients
+from integrations.tools.weather import WeatherTool
+from mock_dashscope import MockDashscopeServer, numbered_frames, SAMPLE_RATE
+
+FRAME_MS = 20
+
+WEATHER = {
+    "current_condition": [{
+        "temp_C": "21", "FeelsLikeC": "20", "humidity": "40", "windspeedKmph": "8",
+        "lang_zh": [{"value": "晴"}],
+    }]
+}
+
+
+async def start_weather_server():
+    peers = []
+
+    async def handle(request):
+        peers.append(request.transport.get_extra_info("peername"))
+        return web.json_response(WEATHER)
+
+    app = web.Application()
+    app.router.add_get("/{city}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}", peers
+
+
+async def test_stt_uses_shared_pool():
+    """STT 不再自建 session: 预热连接在共享池中，被识别流的 WebSocket 复用"""
+    server = MockDashscopeServer(sentence_ms=200)
+    await server.start()
+    stt = AliyunSTT(api_key="test-key", url=server.url)
+    try:
+        assert stt._ensure_session() is http_clients.session
+        assert await stt.warm()
+        stream = stt.stream()
+        for data in numbered_frames(300 // FRAME_MS, FRAME_MS):
+            stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+        async for event in stream:
+            if event.type == SpeechEventType.FINAL_TRANSCRIPT:
+                break
+        assert http_clients.stats()["acquired"] == 1
+        await stream.aclose()
+    finally:
+        await stt.aclose()
+        await server.stop()
+
+    assert not http_clients.session.closed, "STT 关闭时不应关闭共享 session"
+    assert len(set(server.peers)) == 1, server.peers
+    stats = http_clients.stats()
+    assert stats["created"] == 1 and stats["reused"] >= 1, stats
+    print(f"✅ STT 使用共享连接池 通过 ({stats})")
+
+
+async def test_tool_requests_reuse_connection():
+    """工具的多次请求复用同一 keep-alive 连接，DNS 结果被缓存"""
+    runner, base_url, peers = await start_weather_server()
+    tool = WeatherTool()
+    tool.base_url = base_url
+    before = http_clients.stats()
+    try:
+        for city in ["北京", "上海", "广州"]:
+            assert "晴" in await tool.fetch(city)
+    finally:
+        await runner.cleanup()
+
+    stats = http_clients.stats()
+    assert len(set(peers)) == 1, peers
+    assert stats["created"] - before["created"] == 1, stats
+    assert stats["reused"] - before["reused"] == 2, stats
+    print(f"✅ 工具请求复用连接 通过 (3 次请求 1 个连接，{stats})")
+
+
+async def test_aclose():
+    """进程退出时关闭共享 session，之后再次使用会重新创建"""
+    session = http_clients.session
+    await http_clients.aclose()
+    assert session.closed
+    assert http_clients.stats()["idle"] == 0
+    assert http_clients.session is not session
+    await http_clients.aclose()
+    print("✅ 关闭与重建 通过")
+
+
+async def main():
+    try:
+        await test_stt_uses_shared_pool()
+        await test_tool_requests_reuse_connection()
+        await test_aclose()
+    finally:
+        await http_clients.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
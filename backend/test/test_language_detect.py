@@ -0,0 +1,114 @@
+"""
+STT 自动语言识别测试 (按文字判定 / 判定早于第一句端点 / 同一连接切换识别参数 / 回复语言和音色)
+
+用法: python test/test_language_detect.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agent.assistant import AIAssistant
+from agent.profiles import AgentProfile, ProfileRegistry
+from integrations.aliyun.stt import AliyunSTT
+from integrations.http_client import http_clients
+from integrations.language import LanguageDetector
+from mock_dashscope import MockDashscopeServer, numbered_frames, SAMPLE_RATE
+
+FRAME_MS = 20
+SENTENCE_MS = 1000
+
+
+def test_detector():
+    cases = [
+        ("今天天气怎么样", "zh"),
+        ("what's the weather like today", "en"),
+        ("今日の天気はどうですか", "ja"),
+        ("오늘 날씨 어때요", "ko"),
+    ]
+    for text, expected in cases:
+        detector = LanguageDetector(["zh", "en", "ja", "ko"])
+        assert detector.observe(text, final=False) == expected, (text, detector.best())
+    print(f"✅ 按文字判定语言 通过 ({', '.join(lang for _, lang in cases)})")
+
+    # 中间结果太短时不判定，第一句结束时强制判定
+    detector = LanguageDetector(["zh", "en"])
+    assert detector.observe("hi", final=False) is None
+    assert detector.observe("hi", final=True) == "en"
+    assert detector.observe("你好", final=True) is None, "只判定一次"
+    print("✅ 第一句结束时强制判定 通过")
+
+
+async def test_stream_switches_route():
+    """中间结果判定为英语 -> 第一句结束后在同一连接上用英语模型/提示开始新的 run-task"""
+    server = MockDashscopeServer(
+        sentence_ms=SENTENCE_MS,
+        texts=["hello what is the weather", "in shanghai tomorrow", "thank you very much"],
+        interim_ms=200,
+    )
+    await server.start()
+    stt = AliyunSTT(api_key="test-key", url=server.url, detect_languages=["zh", "en", "ja"],
+                    language_models={"en": "paraformer-realtime-8k-v2"})
+    stream = stt.stream()
+    finals = []
+    languages = []
+
+    async def collect():
+        async for event in stream:
+            if event.type == SpeechEventType.FINAL_TRANSCRIPT:
+                finals.append(event.alternatives[0].text)
+                languages.append(event.alternatives[0].language)
+
+    collector = asyncio.create_task(collect())
+    try:
+        for data in numbered_frames(3 * SENTENCE_MS // FRAME_MS, FRAME_MS):
+            stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+            await asyncio.sleep(0.002)
+        await stream.aclose()
+        await collector
+    finally:
+        await stt.aclose()
+        await server.stop()
+
+    assert stream.language == "en"
+    assert stream.detected_at_ms < SENTENCE_MS, stream.detected_at_ms
+    assert finals == ["hello what is the weather", "in shanghai tomorrow", "thank you very much"], finals
+    assert languages == ["en"] * 3, languages
+    assert server.connections == 1, "切换语言不应重新建连"
+    (_, model_1, params_1), (_, model_2, params_2) = server.tasks
+    assert params_1["language_hints"] == ["zh", "en", "ja"] and model_1 == "paraformer-realtime-v2"
+    assert params_2["language_hints"] == ["en"] and model_2 == "paraformer-realtime-8k-v2"
+    assert stream.language_switches == 1
+    print(f"✅ 同一连接切换识别参数 通过 (第 {stream.detected_at_ms:.0f}ms 判定为英语，"
+          f"早于第一句端点 {SENTENCE_MS}ms；{model_1}{params_1['language_hints']} -> {model_2}{params_2['language_hints']})")
+
+
+def test_reply_language_and_voice():
+    """判定的语言决定回复语言提示和 TTS 音色"""
+    default = AgentProfile(name="default", system_prompt="你是一个智能语音助手。",
+                           detect_languages=("zh", "en"), voices={"en": "loongstella"})
+    registry = ProfileRegistry(default)
+    assistant = AIAssistant(room_name="voice-room", profiles=registry)
+
+    assert assistant._system_prompt("zh") == "你是一个智能语音助手。"
+    assert assistant._system_prompt("en").endswith("请使用English回答。")
+    assert default.voice_for("en") == "loongstella" and default.voice_for("zh") == "longxiaochun"
+    print("✅ 回复语言提示 + 音色选择 通过")
+
+
+async def main():
+    test_detector()
+    try:
+        await test_stream_switches_route()
+    finally:
+        await http_clients.aclose()
+    test_reply_language_and_voice()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+LLM 路由测试 (模拟后端，无需 API Key)
+
+用法: python test/test_llm_router.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from livekit.agents import llm
+
+from integrations.aliyun.resilience import CircuitBreaker
+from integrations.llm_router import LLMBackend, LLMRouter, StubLLM
+
+
+class FakeStream:
+    def __init__(self, name: str, delay: float, fail: bool):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent == 0:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError(f"{self.name} down")
+        if self.sent >= 2:
+            raise StopAsyncIteration
+        self.sent += 1
+        return llm.ChatChunk(id=self.name, delta=llm.ChoiceDelta(role="assistant", content=self.name))
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeLLM:
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.streams = []
+
+    def chat(self, *, chat_ctx, **kwargs):
+        if "tool_ctx" in kwargs:
+            raise TypeError("unexpected keyword argument 'tool_ctx'")
+        stream = FakeStream(self.name, self.delay, self.fail)
+        self.streams.append(stream)
+        return stream
+
+
+async def collect(router: LLMRouter) -> list:
+    stream = router.chat(chat_ctx=llm.ChatContext())
+    return [chunk.delta.content async for chunk in stream]
+
+
+async def test_hedge_fast_backend_wins():
+    slow, fast = FakeLLM("slow", delay=0.5), FakeLLM("fast", delay=0.02)
+    router = LLMRouter([LLMBackend("slow", slow, prior_ttft=0.1), LLMBackend("fast", fast)], hedge_after=0.1)
+
+    assert await collect(router) == ["fast", "fast"]
+    assert slow.streams[0].closed
+    # 下一次直接选择更快的后端
+    assert router.rank()[0].name == "fast"
+    assert await collect(router) == ["fast", "fast"]
+    assert len(slow.streams) == 1
+    print("✅ 对冲请求 + 延迟排序 通过")
+
+
+async def test_failover_to_stub():
+    down = FakeLLM("down", fail=True)
+    breaker = CircuitBreaker("llm:down", failure_threshold=1)
+    router = LLMRouter([LLMBackend("down", down, breaker=breaker),
+                        LLMBackend("stub", StubLLM(), fallback_only=True)], hedge_after=None)
+
+    text = "".join(await collect(router))
+    assert text == StubLLM().reply, text
+    assert not router.backends[0].healthy
+    # 熔断期间直接走兜底，不再请求故障后端
+    assert router.rank()[0].name == "stub"
+    assert "".join(await collect(router)) == text
+    assert len(down.streams) == 1
+    print(f"✅ 故障转移到本地兜底 + 熔断 通过: {text}")
+
+
+async def test_first_token_timeout():
+    hung = FakeLLM("hung", delay=10)
+    router = LLMRouter([LLMBackend("hung", hung), LLMBackend("stub", StubLLM(), fallback_only=True)],
+                       hedge_after=None, first_token_timeout=0.1)
+
+    text = "".join(await asyncio.wait_for(collect(router), timeout=2))
+    assert text == StubLLM().reply, text
+    assert hung.streams[0].closed
+    print("✅ 首 token 截止时间 通过")
+
+
+async def test_type_error_propagates():
+    router = LLMRouter([LLMBackend("a", FakeLLM("a"))])
+    try:
+        router.chat(chat_ctx=llm.ChatContext(), tool_ctx=None)
+    except TypeError:
+        print("✅ 参数错误直接抛出 (保持调用方降级逻辑) 通过")
+    else:
+        raise AssertionError("TypeError expected")
+
+
+async def main():
+    print("🧪 测试 LLM 路由...")
+    await test_hedge_fast_backend_wins()
+    await test_failover_to_stub()
+    await test_first_token_timeout()
+    await test_type_error_propagates()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+日志管道测试 (各模块 logging.getLogger(__name__) 的日志都经过根日志器上的后台队列)
+
+用法: python test/test_logger.py
+"""
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core import logger as log_module
+
+
+def test_module_loggers_use_pipeline():
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = log_module.setup_logger("agent_test", log_dir=tmp)
+        # 同一进程再次配置不会重复添加处理器
+        assert log_module.setup_logger("agent_other", log_dir=tmp).name == "agent_other"
+        root_handlers = [h for h in logging.getLogger().handlers
+                         if isinstance(h, log_module.NonBlockingQueueHandler)]
+        assert len(root_handlers) == 1 and not logger.handlers
+
+        logging.getLogger("agent.session").info("会话已释放: user-1")
+        logging.getLogger("integrations.tools.executor").warning("工具超时: get_weather")
+        logger.info("启动完成")
+        assert set(log_module.logging_stats()) == {"agent_test"}
+
+        log_module.shutdown_logging()
+        lines = (Path(tmp) / "agent_test.log").read_text(encoding="utf-8").splitlines()
+
+    assert any("agent.session - INFO - 会话已释放" in line for line in lines), lines
+    assert any("integrations.tools.executor - WARNING - 工具超时" in line for line in lines), lines
+    assert any("agent_test - INFO - 启动完成" in line for line in lines), lines
+    assert not logging.getLogger().handlers
+    print(f"✅ 模块日志经过后台队列写入 通过 ({len(lines)} 行)")
+
+
+if __name__ == "__main__":
+    test_module_loggers_use_pipeline()
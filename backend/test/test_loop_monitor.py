@@ -0,0 +1,101 @@
+"""
+事件循环监控测试 (调度延迟 / 阻塞回调调用栈 / 任务统计 / 采样分析 / 调试接口)
+
+用法: python test/test_loop_monitor.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.monitor import LoopMonitor
+
+
+def blocking_parse():
+    """模拟在事件循环中执行的同步调用"""
+    time.sleep(0.3)
+
+
+def busy_work(seconds: float):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+async def idle_worker():
+    await asyncio.sleep(60)
+
+
+async def test_slow_callback(monitor: LoopMonitor):
+    await asyncio.sleep(0.3)
+    blocking_parse()
+    await asyncio.sleep(0.2)
+
+    assert monitor.slow_count == 1, monitor.slow_count
+    event = monitor.slow_callbacks[-1]
+    assert "blocking_parse" in "".join(event["stack"]), event
+    assert event["duration_ms"] >= 250, event
+    assert monitor.lag_stats()["max_ms"] >= 250
+    print(f"✅ 阻塞回调 通过 ({event['duration_ms']:.0f}ms @ {event['where']})")
+
+
+async def test_task_counts(monitor: LoopMonitor):
+    workers = [asyncio.create_task(idle_worker()) for _ in range(3)]
+    await asyncio.sleep(0)
+    counts = monitor.task_counts()
+    assert counts.get("idle_worker") == 3, counts
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    print(f"✅ 任务统计 通过 ({counts})")
+
+
+async def test_debug_endpoint(monitor: LoopMonitor):
+    monitor.add_section("sessions", lambda: {"active": 2})
+    base = (await monitor.serve("127.0.0.1", 0))[0]
+
+    async with aiohttp.ClientSession() as http:
+        async with http.get(f"{base}/debug/loop") as resp:
+            stats = await resp.json()
+        assert stats["sessions"] == {"active": 2}
+        assert stats["slow_callbacks"] == monitor.slow_count
+        assert stats["lag"]["samples"] > 0
+
+        async with http.post(f"{base}/debug/profile/start?interval_ms=2") as resp:
+            assert resp.status == 200
+        async with http.post(f"{base}/debug/profile/start") as resp:
+            assert resp.status == 409
+
+        # 分析期间事件循环在执行 busy_work
+        busy_work(0.3)
+        await asyncio.sleep(0)
+
+        async with http.post(f"{base}/debug/profile/stop") as resp:
+            collapsed = await resp.text()
+        async with http.post(f"{base}/debug/profile/stop") as resp:
+            assert resp.status == 409
+
+    lines = collapsed.splitlines()
+    assert lines and "busy_work" in lines[0], lines[:3]
+    print(f"✅ 调试接口 + 采样分析 通过 ({sum(int(l.rsplit(' ', 1)[1]) for l in lines)} 个样本)")
+
+
+async def main():
+    monitor = LoopMonitor(tick=0.05, slow_threshold=0.1)
+    monitor.start()
+    try:
+        await test_slow_callback(monitor)
+        await test_task_counts(monitor)
+        await test_debug_endpoint(monitor)
+    finally:
+        await monitor.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+批量音频预处理测试 (注销时输出尾部 / 多路流分到多个工作线程 / 格式变化不丢帧 / 轨道结束时 STT 收到完整音频)
+
+用法: python test/test_preprocess.py
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+from livekit import rtc
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.session import ParticipantSession, SessionRegistry
+from audio.preprocess import AudioPreprocessor
+from audio.resampler import PolyphaseResampler
+
+INPUT_RATE = 48000
+
+
+def speech_frames(count: int, rate: int = INPUT_RATE):
+    samples = rate // 100
+    t = np.arange(count * samples) / rate
+    pcm = (6000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16)
+    return [
+        rtc.AudioFrame(pcm[i:i + samples].tobytes(), rate, 1, samples)
+        for i in range(0, len(pcm), samples)
+    ]
+
+
+def expected_samples(frames) -> int:
+    """同样的输入逐帧重采样 + 冲刷得到的样本数 (采样率变化前冲刷旧的尾部)"""
+    resampler = PolyphaseResampler(output_rate=16000)
+    out = []
+    for frame in frames:
+        if resampler.input_rate not in (None, frame.sample_rate):
+            out += resampler.flush()
+        out += resampler.push(frame)
+    out += resampler.flush()
+    return sum(f.samples_per_channel for f in out)
+
+
+async def drain(queue) -> int:
+    total = 0
+    while (frame := await queue.get()) is not None:
+        total += frame.samples_per_channel
+    return total
+
+
+async def test_unregister_flushes_tail():
+    """注销时尚未处理的帧和重采样器尾部仍会输出，然后队列关闭"""
+    preprocessor = AudioPreprocessor(tick_ms=50)
+    preprocessor.start()
+    frames = speech_frames(20)
+    queue = preprocessor.register("user-1")
+    for frame in frames:
+        preprocessor.submit("user-1", frame)
+    # 在下一个 tick 之前注销: 这些帧还在 pending 中
+    preprocessor.unregister("user-1")
+    total = await asyncio.wait_for(drain(queue), 2)
+    await preprocessor.aclose()
+
+    assert total == expected_samples(frames), (total, expected_samples(frames))
+    print(f"✅ 注销时输出剩余帧和重采样尾部 通过 ({total} 个样本)")
+
+
+async def test_streams_fan_out_to_workers():
+    """多路流按工作线程数拆分，在不同线程中并行处理"""
+    threads = set()
+
+    class TracingPreprocessor(AudioPreprocessor):
+        def _process_batch(self, batch):
+            threads.add(threading.current_thread().name)
+            # 让另一个线程有机会同时处理
+            threading.Event().wait(0.01)
+            return super()._process_batch(batch)
+
+    preprocessor = TracingPreprocessor(tick_ms=10, max_workers=2)
+    preprocessor.start()
+    queues = [preprocessor.register(f"user-{i}") for i in range(4)]
+    frames = speech_frames(10)
+    for frame in frames:
+        for i in range(4):
+            preprocessor.submit(f"user-{i}", frame)
+        await asyncio.sleep(0.002)
+    for i in range(4):
+        preprocessor.unregister(f"user-{i}")
+    totals = await asyncio.wait_for(asyncio.gather(*(drain(q) for q in queues)), 2)
+    await preprocessor.aclose()
+
+    assert len(threads) == 2, threads
+    assert totals == [expected_samples(frames)] * 4, totals
+    print(f"✅ 多路流分到 {len(threads)} 个工作线程 通过")
+
+
+async def test_format_change_keeps_frames():
+    """同一 tick 内采样率变化时分段重采样，不丢帧并计入统计"""
+    preprocessor = AudioPreprocessor(tick_ms=50)
+    preprocessor.start()
+    frames = speech_frames(10) + speech_frames(10, rate=24000)
+    queue = preprocessor.register("user-1")
+    for frame in frames:
+        preprocessor.submit("user-1", frame)
+    preprocessor.unregister("user-1")
+    total = await asyncio.wait_for(drain(queue), 2)
+    await preprocessor.aclose()
+
+    assert total == expected_samples(frames), (total, expected_samples(frames))
+    assert preprocessor.stats()["format_changes"] == 1, preprocessor.stats()
+    print(f"✅ 格式变化时分段重采样 通过 ({total} 个样本)")
+
+
+class FiniteAudioStream:
+    """推送固定帧数后结束 (轨道自然结束)"""
+    frames = speech_frames(25)
+
+    def __init__(self, track):
+        pass
+
+    def __aiter__(self):
+        return self._frames()
+
+    async def _frames(self):
+        for frame in self.frames:
+            await asyncio.sleep(0.001)
+            yield rtc.AudioFrameEvent(frame=frame)
+
+    async def aclose(self):
+        pass
+
+
+class CountingSTTStream:
+    def __init__(self):
+        self.samples = 0
+        self._closed = asyncio.Event()
+
+    async def push_frame_wait(self, frame):
+        self.samples += frame.samples_per_channel
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._closed.wait()
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self._closed.set()
+
+
+async def test_track_end_delivers_tail_to_stt():
+    """轨道结束后会话先把尾部音频送进 STT 再释放"""
+    preprocessor = AudioPreprocessor(tick_ms=20)
+    preprocessor.start()
+    stt_stream = CountingSTTStream()
+    session = ParticipantSession(
+        "user-1", None,
+        stt=type("FakeSTT", (), {"stream": lambda self: stt_stream})(),
+        preprocessor=preprocessor,
+        respond=None,
+        audio_stream_factory=FiniteAudioStream,
+    )
+    registry = SessionRegistry()
+    await registry.open(session)
+    await asyncio.wait_for(session.wait(), 2)
+    while not session.closed:
+        await asyncio.sleep(0.01)
+    await preprocessor.aclose()
+
+    assert len(registry) == 0
+    assert stt_stream.samples == expected_samples(FiniteAudioStream.frames), stt_stream.samples
+    print(f"✅ 轨道结束时 STT 收到完整音频 通过 ({stt_stream.samples} 个样本)")
+
+
+async def main():
+    print("🧪 测试音频预处理...")
+    await test_unregister_flushes_tail()
+    await test_streams_fan_out_to_workers()
+    await test_format_change_keeps_frames()
+    await test_track_end_delivers_tail_to_stt()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
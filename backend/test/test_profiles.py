@@ -0,0 +1,115 @@
+"""
+Agent 配置注册表测试 (文件加载 / 按房间选择 / 配置与客户端缓存 / 工具上下文缓存)
+
+用法: python test/test_profiles.py
+"""
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.assistant import AIAssistant
+from agent.profiles import AgentProfile, ProfileRegistry
+from integrations.http_client import http_clients
+
+PROFILES = {
+    "profiles": {
+        "default": {"tts_voice": "longwan"},
+        "support": {
+            "system_prompt": "你是客服助手。",
+            "llm_models": ["qwen-plus"],
+            "tools": [],
+        },
+        "travel": {
+            "system_prompt": "You are a travel assistant.",
+            "language": "en-US",
+            "language_hints": ["en"],
+            "tts_voice": "loongstella",
+        },
+    },
+    "rooms": {"support-*": "support", "travel-*": "travel"},
+}
+
+
+def load_registry() -> ProfileRegistry:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "profiles.json"
+        path.write_text(json.dumps(PROFILES, ensure_ascii=False), encoding="utf-8")
+        base = AgentProfile(name="default", system_prompt="你是一个智能语音助手。")
+        return ProfileRegistry.load(str(path), default=base)
+
+
+def test_load_and_select():
+    registry = load_registry()
+    default = registry.for_room("voice-room")
+    support = registry.for_room("support-42")
+    travel = registry.for_room("travel-7")
+
+    # 文件中的 default 覆盖默认配置，其它配置沿用默认配置未给出的字段
+    assert default.name == "default" and default.tts_voice == "longwan"
+    assert support.system_prompt == "你是客服助手。" and support.tts_voice == "longwan"
+    assert support.llm_models == ("qwen-plus",) and support.tools == ()
+    assert travel.language_hints == ("en",) and travel.tts_voice == "loongstella"
+    assert registry.for_room("support-42") is support
+    print(f"✅ 文件加载 + 按房间选择 通过 ({sorted(registry.profiles)})")
+
+    try:
+        AgentProfile.from_dict("bad", {"voice": "x"})
+    except ValueError as e:
+        print(f"✅ 未知字段报错 通过 ({e})")
+    else:
+        raise AssertionError("unknown field should be rejected")
+
+
+async def test_clients_cached():
+    registry = load_registry()
+    session = http_clients.session
+    support = registry.for_room("support-1")
+    travel = registry.for_room("travel-1")
+
+    started = time.perf_counter()
+    first = registry.clients(support, session)
+    created_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for i in range(1000):
+        assert registry.clients(registry.for_room(f"support-{i % 10}"), session) is first
+    cached_us = (time.perf_counter() - started) * 1000
+
+    other = registry.clients(travel, session)
+    assert other.stt is not first.stt and other.tts is not first.tts
+    assert [b.name for b in first.llm.backends if not b.fallback_only] == ["qwen-plus"]
+    run_task = json.loads(other.stt._protocol.run_task("t"))
+    assert run_task["payload"]["parameters"]["language_hints"] == ["en"], run_task
+    await registry.aclose()
+    print(f"✅ 客户端缓存 通过 (首次创建 {created_ms:.1f}ms，之后每次 {cached_us:.2f}µs)")
+
+
+def test_tool_context_cached():
+    registry = load_registry()
+    support = AIAssistant(room_name="support-1", profiles=registry)
+    assert support.profile.name == "support"
+    assert support._get_tool_ctx() is None, "support 配置不启用工具"
+
+    assistant = AIAssistant(room_name="voice-room", profiles=registry)
+    tool_ctx = assistant._get_tool_ctx()
+    assert tool_ctx is not None and "get_weather" in tool_ctx.function_tools
+    assert assistant._get_tool_ctx() is tool_ctx
+    print(f"✅ 工具上下文缓存 通过 ({sorted(tool_ctx.function_tools)})")
+
+
+async def main():
+    test_load_and_select()
+    try:
+        await test_clients_cached()
+    finally:
+        await http_clients.aclose()
+    test_tool_context_cached()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
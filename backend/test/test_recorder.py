@@ -0,0 +1,150 @@
+"""
+问题录制与重放测试 (二进制格式读写 / 内存映射扩容 / 未关闭文件可读 / 按原始时间重放对比延迟)
+
+用法: python test/test_recorder.py
+"""
+import asyncio
+import math
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents import stt
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.recorder import Recorder, RecordKind, read_recording
+from agent.replay import replay
+from integrations.aliyun.stt import AliyunSpeechData, WordTiming
+
+SAMPLE_RATE = 48000
+FRAME_MS = 20
+SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def tone_frame(index: int, sample_rate: int = SAMPLE_RATE) -> rtc.AudioFrame:
+    samples = sample_rate * FRAME_MS // 1000
+    data = struct.pack(f"<{samples}h", *(
+        int(8000 * math.sin(2 * math.pi * 440 * (index * samples + i) / sample_rate)) for i in range(samples)
+    ))
+    return rtc.AudioFrame(data, sample_rate, 1, samples)
+
+
+def speech_event(event_type, text: str, end_time: float) -> stt.SpeechEvent:
+    return stt.SpeechEvent(type=event_type, alternatives=[AliyunSpeechData(
+        language="zh", text=text, confidence=0.92, start_time=0.0, end_time=end_time,
+        words=[WordTiming(text=ch, start_time=i * 0.2, end_time=(i + 1) * 0.2) for i, ch in enumerate(text)],
+        confidence_reported=True, endpoint_delay_ms=180.0,
+    )])
+
+
+def test_roundtrip_and_growth():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "room.rec")
+        # 4KB 预分配，写入约 100KB 音频，需要多次扩容重新映射
+        recorder = Recorder(path, meta={"room": "voice-room"}, chunk_size=4096)
+        frames = [tone_frame(i) for i in range(50)]
+        for frame in frames:
+            recorder.audio_in("user-1", frame)
+        recorder.stt_event("user-1", speech_event(stt.SpeechEventType.FINAL_TRANSCRIPT, "你好", 1.0))
+        recorder.llm_chunk("user-2", "你好！")
+        recorder.tool_result("user-1", "get_weather", "call_1", "晴 25°C", 210.5)
+
+        # 未关闭 (进程崩溃) 时已写入的记录可读，尾部预分配的 0 区域被忽略
+        recorder._writer.flush()
+        assert len(list(read_recording(path))) == recorder.records
+        assert recorder._writer.remaps > 0
+        recorder.close()
+        size = Path(path).stat().st_size
+
+        records = list(read_recording(path))
+        kinds = [r.kind for r in records]
+        assert kinds[0] == RecordKind.META and records[0].data["room"] == "voice-room"
+        assert kinds.count(RecordKind.PARTICIPANT) == 2
+        audio = [r for r in records if r.kind == RecordKind.AUDIO_IN]
+        assert len(audio) == 50 and all(r.participant == "user-1" for r in audio)
+        assert bytes(audio[7].data.data) == bytes(frames[7].data)
+        assert (audio[7].data.sample_rate, audio[7].data.samples_per_channel) == (SAMPLE_RATE, SAMPLES)
+        t = [r.t_ns for r in records]
+        assert t == sorted(t)
+
+        final = next(r for r in records if r.kind == RecordKind.STT_EVENT)
+        assert final.data["text"] == "你好" and final.data["confidence"] == 0.92
+        assert final.data["words"][1] == {"text": "好", "start_time": 0.2, "end_time": 0.4,
+                                          "punctuation": "", "confidence": None}
+        chunk = next(r for r in records if r.kind == RecordKind.LLM_CHUNK)
+        assert chunk.participant == "user-2" and chunk.data == {"text": "你好！"}
+        assert records[-1].data["latency_ms"] == 210.5
+
+        pcm = 50 * SAMPLES * 2
+        print(f"✅ 读写往返 + 扩容 {recorder._writer.remaps} 次 + 崩溃后可读 通过 "
+              f"({recorder.records} 条记录, {size} 字节, 其中 PCM {pcm} 字节)")
+
+
+async def record_production(path: str) -> dict:
+    """按真实时间写一段线上录制: 用户说一句话 -> LLM 调用工具 -> 工具结果 -> 回答并播放"""
+    recorder = Recorder(path, meta={"room": "voice-room"})
+    for i in range(50):
+        recorder.audio_in("user-1", tone_frame(i))
+        if i == 30:
+            recorder.stt_event("user-1", speech_event(stt.SpeechEventType.INTERIM_TRANSCRIPT, "北京天气", 0.6))
+        await asyncio.sleep(FRAME_MS / 1000)
+    recorder.stt_event("user-1", speech_event(stt.SpeechEventType.FINAL_TRANSCRIPT, "北京天气怎么样", 1.0))
+
+    recorder.llm_start("user-1", 2)
+    await asyncio.sleep(0.3)
+    recorder.tool_call("user-1", "get_weather", '{"city": "北京"}', "call_1")
+    recorder.llm_end("user-1", "")
+    await asyncio.sleep(0.2)
+    recorder.tool_result("user-1", "get_weather", "call_1", "北京: 晴 25°C", 200.0)
+
+    recorder.llm_start("user-1", 4)
+    await asyncio.sleep(0.1)
+    recorder.llm_chunk("user-1", "北京今天")
+    await asyncio.sleep(0.05)
+    recorder.llm_chunk("user-1", "晴，25度。")
+    recorder.llm_end("user-1", "北京今天晴，25度。")
+    recorder.tts_text("user-1", "北京今天晴，25度。")
+    await asyncio.sleep(0.1)
+    for i in range(10):
+        recorder.audio_out("user-1", tone_frame(i, 24000))
+        await asyncio.sleep(FRAME_MS / 1000)
+    recorder.close()
+    return recorder.stats()
+
+
+async def test_replay_timing():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "voice-room.rec")
+        stats = await record_production(path)
+
+        started = time.monotonic()
+        recorded, replayed = await replay(path, tail=3.0)
+        elapsed = time.monotonic() - started
+
+        assert len(recorded) == len(replayed) == 1, (recorded, replayed)
+        before, after = recorded[0], replayed[0]
+        assert after["text"] == "北京天气怎么样"
+        for key in ("first_token_ms", "first_audio_ms"):
+            assert after[key] is not None and abs(after[key] - before[key]) < 100, (key, before, after)
+
+        output = [r for r in read_recording(str(Path(tmp) / "voice-room.replay.rec"))]
+        tool_results = [r.data for r in output if r.kind == RecordKind.TOOL_RESULT]
+        assert [t["result"] for t in tool_results] == ["北京: 晴 25°C"] and tool_results[0]["latency_ms"] >= 190
+        assert sum(r.kind == RecordKind.AUDIO_OUT for r in output) == 10
+        assert output[0].data["replay_of"] == path
+        print(f"✅ 按原始时间重放 通过 ({stats['records']} 条记录，重放耗时 {elapsed:.1f}s；"
+              f"首 token {before['first_token_ms']:.0f}ms -> {after['first_token_ms']:.0f}ms，"
+              f"首帧音频 {before['first_audio_ms']:.0f}ms -> {after['first_audio_ms']:.0f}ms)")
+
+
+async def main():
+    test_roundtrip_and_growth()
+    await test_replay_timing()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,239 @@
+"""
+外部调用容错测试 (重试 / 对冲 / 熔断 / 指标端口 / TTS 不可用时改发文字)
+
+用法: python test/test_resilience.py
+"""
+import asyncio
+import socket
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from livekit import rtc
+from livekit.agents.llm import ChatContext
+
+from core.exceptions import CircuitOpenError
+from agent.assistant import AIAssistant
+from integrations.aliyun.resilience import (CircuitBreaker, RetryPolicy, hedged_stream, retry_first_item,
+                                            start_metrics_server)
+
+
+class FakeStream:
+    def __init__(self, items, first_delay: float = 0.0):
+        self.items = list(items)
+        self.first_delay = first_delay
+        self.closed = False
+        self._started = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._started:
+            self._started = True
+            await asyncio.sleep(self.first_delay)
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def test_breaker_transitions():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.1)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    try:
+        breaker.check()
+        assert False, "熔断期间应直接拒绝"
+    except CircuitOpenError:
+        pass
+
+    await asyncio.sleep(0.15)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # 半开状态只放行一个探测请求
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    print("✅ 熔断器状态转换 通过")
+
+
+def test_metrics_server():
+    """指标端口重复启动无效果，端口被占用时返回 False 而不是抛出"""
+    with socket.socket() as busy:
+        busy.bind(("0.0.0.0", 0))
+        busy.listen()
+        assert start_metrics_server(busy.getsockname()[1]) is False
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    assert start_metrics_server(port) is True
+    assert start_metrics_server(port) is True
+    print("✅ 指标端口 通过")
+
+
+async def test_hedged_stream():
+    breaker = CircuitBreaker("hedge", failure_threshold=3)
+    primary = FakeStream(["slow-1", "slow-2"], first_delay=1.0)
+    backups = []
+
+    def make_backup():
+        backups.append(FakeStream(["fast-1", "fast-2"], first_delay=0.01))
+        return backups[-1]
+
+    items = [item async for item in hedged_stream(primary, make_backup, breaker=breaker,
+                                                  hedge_after=0.05, first_item_timeout=2)]
+    assert items == ["fast-1", "fast-2"], items
+    assert len(backups) == 1 and backups[0].closed
+
+    # 首个结果超时记为失败
+    try:
+        async for _ in hedged_stream(FakeStream(["x"], first_delay=1.0), None, breaker=breaker,
+                                     hedge_after=None, first_item_timeout=0.05):
+            pass
+    except asyncio.TimeoutError:
+        pass
+    assert breaker.failures == 1
+    print("✅ 首帧对冲 + 首帧截止时间 通过")
+
+
+class FailingStream(FakeStream):
+    """产出 items 后抛出错误"""
+
+    def __init__(self, items, error: Exception):
+        super().__init__(items)
+        self.error = error
+
+    async def __anext__(self):
+        if not self.items:
+            raise self.error
+        return self.items.pop(0)
+
+
+async def test_retry_first_item():
+    retry = RetryPolicy(attempts=3, base_delay=0.01)
+    streams = []
+
+    # 首个元素之前失败: 重新请求，失败的流被关闭
+    def flaky():
+        streams.append(FailingStream([], ConnectionError("boom")) if len(streams) < 2 else FakeStream(["ok"]))
+        return streams[-1]
+
+    items = [item async for item in retry_first_item(flaky, name="retry", retry=retry)]
+    assert items == ["ok"] and len(streams) == 3 and all(s.closed for s in streams)
+
+    # 已经产出元素后失败: 不重试，避免重复输出
+    streams.clear()
+
+    def partial():
+        streams.append(FailingStream(["a"], ConnectionError("boom")))
+        return streams[-1]
+
+    items = []
+    try:
+        async for item in retry_first_item(partial, name="retry", retry=retry):
+            items.append(item)
+    except ConnectionError:
+        pass
+    assert items == ["a"] and len(streams) == 1
+
+    # 熔断中直接抛出
+    streams.clear()
+
+    def open_breaker():
+        streams.append(FailingStream([], CircuitOpenError("熔断中")))
+        return streams[-1]
+
+    try:
+        async for _ in retry_first_item(open_breaker, name="retry", retry=retry):
+            pass
+    except CircuitOpenError:
+        pass
+    assert len(streams) == 1
+    print("✅ 首个结果之前有限次重试 通过")
+
+
+class FlakyLLM:
+    """第一次请求在首个 token 之前失败"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, *, chat_ctx, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            return FailingStream([], ConnectionError("reset"))
+        return FakeStream(["北京今天晴。"])
+
+
+class DownTTS:
+    sample_rate, num_channels = 24000, 1
+
+    def stream(self):
+        return DownTTSStream()
+
+
+class DownTTSStream(FailingStream):
+    def __init__(self):
+        super().__init__([], ConnectionError("tts down"))
+
+    def push_text(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+    def end_input(self):
+        pass
+
+
+class FakeSource:
+    queued_duration = 0.0
+
+    async def capture_frame(self, frame: rtc.AudioFrame):
+        pass
+
+
+class FakeParticipant:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text, **kwargs):
+        self.sent.append((text, kwargs))
+
+
+async def test_assistant_retry_and_text_fallback():
+    """LLM 首 token 前失败时重试；TTS 不可用时回答改为文字发送"""
+    assistant = AIAssistant(room_name="voice-room")
+    assistant.llm, assistant.tts = FlakyLLM(), DownTTS()
+    assistant.tts_breaker = CircuitBreaker("tts-test", failure_threshold=1, reset_timeout=60)
+    assistant.retry = RetryPolicy(attempts=2, base_delay=0.01)
+    assistant.audio_source = FakeSource()
+    participant = FakeParticipant()
+    assistant.room = type("FakeRoom", (), {"local_participant": participant})()
+
+    await asyncio.wait_for(assistant.process_llm_response(ChatContext(), participant="user-1"), 5)
+    assert assistant.llm.calls == 2
+    # 第一次合成失败后熔断，不再重试
+    assert assistant.tts_breaker.is_open
+    assert participant.sent == [("北京今天晴。", {"destination_identities": ["user-1"], "topic": "lk.chat"})]
+    print("✅ LLM 重试 + TTS 熔断时改发文字 通过")
+
+
+async def main():
+    print("🧪 测试外部调用容错...")
+    await test_breaker_transitions()
+    await test_retry_first_item()
+    await test_assistant_retry_and_text_fallback()
+    test_metrics_server()
+    await test_hedged_stream()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+参与者会话 soak 测试: 数千次加入/离开后内存与任务数保持平稳
+
+用法: python test/test_session_soak.py [cycles]
+"""
+import asyncio
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents import stt
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.session import ParticipantSession, SessionRegistry
+from audio.preprocess import AudioPreprocessor
+
+FRAME = rtc.AudioFrame(b"\x00\x01" * 480, 48000, 1, 480)
+
+
+class FakeTrack:
+    def __init__(self, sid: str):
+        self.sid = sid
+
+
+class FakeAudioStream:
+    """模拟麦克风: 推送若干帧后保持打开，直到被关闭"""
+
+    def __init__(self, track):
+        self._closed = asyncio.Event()
+
+    def __aiter__(self):
+        return self._frames()
+
+    async def _frames(self):
+        for _ in range(5):
+            await asyncio.sleep(0)
+            yield rtc.AudioFrameEvent(frame=FRAME)
+        await self._closed.wait()
+
+    async def aclose(self):
+        self._closed.set()
+
+
+class FakeSTTStream:
+    """模拟 STT 流: 每收到 10 帧产出一句最终结果"""
+
+    def __init__(self):
+        self._events = asyncio.Queue()
+        self._frames = 0
+
+    async def push_frame_wait(self, frame):
+        self._frames += 1
+        if self._frames % 10 == 0:
+            self._events.put_nowait(stt.SpeechEvent(
+                type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                alternatives=[stt.SpeechData(language="zh", text="你好")]
+            ))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._events.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    async def aclose(self):
+        self._events.put_nowait(None)
+
+
+class FakeSTT:
+    def stream(self):
+        return FakeSTTStream()
+
+
+async def slow_respond(chat_context):
+    """模拟一轮回复: 离开时通常仍在进行"""
+    await asyncio.sleep(10)
+
+
+async def run_cycles(registry, preprocessor, cycles: int):
+    for i in range(cycles):
+        identity = f"user-{i % 50}"
+        session = ParticipantSession(
+            identity,
+            FakeTrack(f"TR_{i}"),
+            stt=FakeSTT(),
+            preprocessor=preprocessor,
+            respond=slow_respond,
+            audio_stream_factory=FakeAudioStream
+        )
+        await registry.open(session)
+        session.spawn(slow_respond(session.chat_context), "respond")
+        await asyncio.sleep(0.001)
+        await registry.close(identity)
+
+
+async def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f"🧪 会话 soak 测试: {cycles} 次加入/离开")
+
+    preprocessor = AudioPreprocessor(tick_ms=5)
+    preprocessor.start()
+    registry = SessionRegistry()
+
+    # 预热后记录基线
+    await run_cycles(registry, preprocessor, 200)
+    gc.collect()
+    tracemalloc.start()
+    baseline_tasks = len(asyncio.all_tasks())
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    checkpoints = []
+    for step in range(5):
+        await run_cycles(registry, preprocessor, cycles // 5)
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        checkpoints.append(current - baseline)
+        print(f"  {(step + 1) * cycles // 5:>6} 次: 内存增长 {(current - baseline) / 1024:8.1f} KB, "
+              f"任务 {len(asyncio.all_tasks())}, 会话 {len(registry)}")
+
+    tasks = len(asyncio.all_tasks())
+    await preprocessor.aclose()
+    tracemalloc.stop()
+
+    assert len(registry) == 0, len(registry)
+    assert tasks <= baseline_tasks, (tasks, baseline_tasks)
+    # 后半程不再增长 (允许少量分配器抖动)
+    assert checkpoints[-1] - checkpoints[1] < 256 * 1024, checkpoints
+    print("✅ 内存与任务数保持平稳")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+启动优化测试 (延迟导入 / 连接预热复用 / 并行初始化计时)
+
+用法: python test/test_startup.py
+"""
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents.stt import SpeechEventType
+
+BACKEND = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.utils import PhaseTimer
+from integrations.aliyun.stt import AliyunSTT
+from mock_dashscope import MockDashscopeServer, numbered_frames, SAMPLE_RATE
+
+FRAME_MS = 20
+
+
+def test_lazy_imports():
+    """导入模块不应加载 supabase / 阿里云插件，第一次使用时才加载"""
+    code = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "from services.auth_service import auth_service\n"
+        "import integrations.aliyun.tts, integrations.aliyun.llm\n"
+        "print(round((time.perf_counter() - started) * 1000))\n"
+        "print('supabase' in sys.modules, 'livekit.plugins.aliyun' in sys.modules)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True,
+                            text=True, check=True).stdout.split()
+    assert output[1:] == ["False", "False"], output
+    print(f"✅ 延迟导入 通过 (导入耗时 {output[0]}ms，未加载 supabase / livekit.plugins.aliyun)")
+
+
+async def test_prewarmed_connection_reused():
+    """预热建立的 keep-alive 连接被第一个识别流的 WebSocket 复用"""
+    server = MockDashscopeServer(sentence_ms=200)
+    await server.start()
+    stt = AliyunSTT(api_key="test-key", url=server.url)
+    try:
+        assert await stt.warm()
+        stream = stt.stream()
+        for data in numbered_frames(300 // FRAME_MS, FRAME_MS):
+            stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+        async for event in stream:
+            if event.type == SpeechEventType.FINAL_TRANSCRIPT:
+                break
+        await stream.aclose()
+    finally:
+        await stt.aclose()
+        await server.stop()
+
+    assert len(server.peers) == 2, server.peers
+    assert server.peers[0] == server.peers[1], server.peers
+    print(f"✅ 连接预热复用 通过 (预热与 WebSocket 使用同一连接 {server.peers[0]})")
+
+
+async def test_parallel_phases():
+    """并行阶段各自计时，总耗时接近最慢的阶段而不是总和"""
+    timer = PhaseTimer()
+    await asyncio.gather(
+        timer.timed("room", asyncio.sleep(0.3)),
+        timer.timed("stt_prewarm", asyncio.sleep(0.2)),
+        timer.timed("tts_prewarm", asyncio.sleep(0.2)),
+    )
+    report = timer.report()
+    assert set(report["phases"]) == {"room", "stt_prewarm", "tts_prewarm"}
+    assert report["total_ms"] < 450, report
+    print(f"✅ 并行初始化计时 通过 ({timer.summary()})")
+
+
+async def main():
+    test_lazy_imports()
+    await test_prewarmed_connection_reused()
+    await test_parallel_phases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""
+STT 断线重连测试 (本地模拟服务，无需 API Key)
+
+用法: python test/test_stt_reconnect.py
+"""
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from livekit import rtc
+from livekit.agents import APIConnectionError
+from livekit.agents.stt import SpeechEventType
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.config import settings
+from agent.assistant import AIAssistant
+from audio.preprocess import AudioPreprocessor
+from integrations.aliyun.stt import AliyunSTT, AliyunSTTStream
+from mock_dashscope import MockDashscopeServer, numbered_frames, SAMPLE_RATE
+
+FRAME_MS = 20
+
+
+async def run_session(server: MockDashscopeServer, seconds: int) -> tuple:
+    """推送 seconds 秒编号音频，返回 (最终结果列表, 重连次数, 事件流结束时的错误)"""
+    AliyunSTTStream.BACKOFF_BASE = 0.05
+    stt = AliyunSTT(api_key="test-key", url=server.url, max_reconnects=5)
+    stream = stt.stream()
+    finals = []
+    error = None
+
+    async def collect():
+        nonlocal error
+        try:
+            async for event in stream:
+                if event.type == SpeechEventType.FINAL_TRANSCRIPT:
+                    finals.append(event.alternatives[0].text)
+        except APIConnectionError as e:
+            error = e
+
+    collector = asyncio.create_task(collect())
+
+    for data in numbered_frames(seconds * 1000 // FRAME_MS, FRAME_MS):
+        stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+        # 按实时速率推送
+        await asyncio.sleep(FRAME_MS / 1000 / 4)
+
+    await stream.aclose()
+    await collector
+    await stt.aclose()
+    return finals, stream.reconnects, error
+
+
+async def test_reconnect_replays_unacknowledged_audio():
+    """连接在句中断开两次: 重连后重放未确认音频，结果不重复也不缺失"""
+    server = MockDashscopeServer(sentence_ms=1000, drop_after_ms=[1500, 1300])
+    await server.start()
+    try:
+        finals, reconnects, error = await run_session(server, seconds=5)
+    finally:
+        await server.stop()
+
+    expected = [f"第{i}句" for i in range(5)]
+    print(f"📝 最终结果: {finals}")
+    print(f"🔁 重连次数: {reconnects}, 服务端连接数: {server.connections}")
+    assert reconnects == 2, reconnects
+    assert finals == expected, finals
+    assert error is None, error
+    print("✅ 断线重连 + 音频重放 + 去重 通过")
+
+
+async def test_no_drop():
+    """不断线时行为不变"""
+    server = MockDashscopeServer(sentence_ms=1000)
+    await server.start()
+    try:
+        finals, reconnects, error = await run_session(server, seconds=3)
+    finally:
+        await server.stop()
+
+    assert reconnects == 0 and error is None, (reconnects, error)
+    assert finals == ["第0句", "第1句", "第2句"], finals
+    print("✅ 正常连接 通过")
+
+
+async def test_give_up_after_max_reconnects():
+    """服务端持续断开时有限次重连后放弃，不会卡住"""
+    server = MockDashscopeServer(sentence_ms=1000, drop_after_ms=[100] * 20)
+    await server.start()
+    try:
+        # 输入持续到重连次数用尽之后
+        finals, reconnects, error = await asyncio.wait_for(run_session(server, seconds=12), timeout=30)
+    finally:
+        await server.stop()
+
+    assert reconnects == 5, reconnects
+    assert server.connections == 6, server.connections
+    # 放弃时事件流以错误结束，使用方能感知
+    assert isinstance(error, APIConnectionError), error
+    print(f"✅ 重连上限 通过 (连接 {server.connections} 次，{type(error).__name__}: {error})")
+
+
+class FakeAudioStream:
+    """持续推送麦克风音频，直到被关闭"""
+
+    def __init__(self, track):
+        self._closed = False
+
+    def __aiter__(self):
+        return self._frames()
+
+    async def _frames(self):
+        for data in itertools.cycle(numbered_frames(500, FRAME_MS)):
+            if self._closed:
+                return
+            yield rtc.AudioFrameEvent(frame=rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+            await asyncio.sleep(FRAME_MS / 1000 / 4)
+
+    async def aclose(self):
+        self._closed = True
+
+
+async def test_session_released_and_reattached():
+    """STT 放弃后: 阻塞策略下输入不卡住，会话被释放，熔断器放行后用同一轨道重建"""
+    settings.BREAKER_RESET_SECONDS = 0.2
+    server = MockDashscopeServer(sentence_ms=1000, drop_after_ms=[100] * 100)
+    await server.start()
+    AliyunSTTStream.BACKOFF_BASE = 0.02
+    assistant = AIAssistant(room_name="voice-room")
+    assistant.stt = AliyunSTT(api_key="test-key", url=server.url, max_reconnects=2, overflow_policy="block",
+                              queue_max_ms=200)
+    assistant.preprocessor = AudioPreprocessor(output_rate=16000)
+    assistant.preprocessor.start()
+    assistant.audio_stream_factory = FakeAudioStream
+
+    track = SimpleNamespace(sid="TR_mic")
+    participant = SimpleNamespace(identity="user-1",
+                                  track_publications={"TR_mic": SimpleNamespace(track=track)})
+    try:
+        first = await assistant.process_participant_audio(participant, track)
+        await asyncio.wait_for(first.wait(), 10)
+        assert first.failed is not None, "STT 放弃后会话应标记为失败"
+        while assistant.sessions.get("user-1") in (None, first):
+            await asyncio.sleep(0.02)
+        second = assistant.sessions.get("user-1")
+        assert first.closed and second is not first and second.track_sid == "TR_mic"
+        print(f"✅ STT 不可用时释放并重建会话 通过 ({type(first.failed).__name__}，连接 {server.connections} 次)")
+    finally:
+        await assistant.cleanup()
+        await assistant.stt.aclose()
+        await server.stop()
+
+
+async def main():
+    print("🧪 测试 STT 断线重连...")
+    await test_no_drop()
+    await test_reconnect_replays_unacknowledged_audio()
+    await test_give_up_after_max_reconnects()
+    await test_session_released_and_reattached()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
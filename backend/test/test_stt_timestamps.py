@@ -0,0 +1,137 @@
+"""
+STT 置信度与词级时间戳测试 (解析 / 重连后的时间线对齐 / 低置信度重问)
+
+用法: python test/test_stt_timestamps.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from livekit import rtc
+from livekit.agents import stt
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agent.session import ParticipantSession
+from integrations.aliyun.stt import AliyunSpeechData, AliyunSTT, DEFAULT_CONFIDENCE
+from integrations.http_client import http_clients
+from mock_dashscope import MockDashscopeServer, numbered_frames, SAMPLE_RATE
+
+FRAME_MS = 20
+
+
+async def recognize(server: MockDashscopeServer, sentences: int, pace: float = 0.001) -> list:
+    await server.start()
+    stt_client = AliyunSTT(api_key="test-key", url=server.url)
+    stream = stt_client.stream()
+    finals = []
+
+    async def collect():
+        async for event in stream:
+            if event.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+                finals.append(event.alternatives[0])
+
+    collector = asyncio.create_task(collect())
+    try:
+        for data in numbered_frames(sentences * server.sentence_ms // FRAME_MS, FRAME_MS):
+            stream.push_frame(rtc.AudioFrame(data, SAMPLE_RATE, 1, SAMPLE_RATE * FRAME_MS // 1000))
+            await asyncio.sleep(pace)
+        await stream.aclose()
+        await collector
+    finally:
+        await stt_client.aclose()
+        await server.stop()
+    return finals
+
+
+async def test_confidence_and_words():
+    server = MockDashscopeServer(sentence_ms=1000, texts=["今天天气", "明天呢"], confidences=[0.95, 0.35])
+    finals = await recognize(server, 2)
+
+    assert [f.text for f in finals] == ["今天天气", "明天呢"]
+    assert all(isinstance(f, AliyunSpeechData) and f.confidence_reported for f in finals)
+    assert [f.confidence for f in finals] == [0.95, 0.35]
+    first, second = finals
+    assert (first.start_time, first.end_time) == (0.0, 1.0)
+    assert (second.start_time, second.end_time) == (1.0, 2.0)
+    assert [w.text for w in first.words] == list("今天天气")
+    for data in finals:
+        starts = [w.start_time for w in data.words]
+        assert starts == sorted(starts) and data.start_time <= starts[0] and data.words[-1].end_time <= data.end_time
+    assert first.endpoint_delay_ms is not None and first.endpoint_delay_ms >= 0
+    print(f"✅ 置信度 + 词级时间戳 通过 ({[(w.text, w.start_time) for w in first.words]})")
+
+    # 模型不返回置信度时使用默认值并标记
+    finals = await recognize(MockDashscopeServer(sentence_ms=500), 1)
+    assert finals[0].confidence == DEFAULT_CONFIDENCE and not finals[0].confidence_reported
+    print("✅ 未返回置信度时标记为未上报 通过")
+
+
+async def test_timeline_after_reconnect():
+    """重连重放后，时间戳仍对齐到整段音频的时间线"""
+    server = MockDashscopeServer(sentence_ms=1000, drop_after_ms=[1500])
+    # 按实时速率推送，保证断线重连期间输入尚未结束
+    finals = await recognize(server, 3, pace=FRAME_MS / 1000)
+
+    assert [f.text for f in finals] == ["第0句", "第1句", "第2句"], [f.text for f in finals]
+    assert [(f.start_time, f.end_time) for f in finals] == [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)], \
+        [(f.start_time, f.end_time) for f in finals]
+    assert finals[2].words[0].start_time == 2.0
+    print(f"✅ 重连后时间线对齐 通过 (连接 {server.connections} 次)")
+
+
+class ScriptedSTTStream:
+    def __init__(self, results):
+        self._results = results
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for text, confidence in self._results:
+            # 让上一句的回复任务先执行
+            await asyncio.sleep(0)
+            yield stt.SpeechEvent(
+                type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                alternatives=[AliyunSpeechData(language="zh", text=text, confidence=confidence,
+                                               confidence_reported=True)]
+            )
+
+
+async def test_reask_flow():
+    """低置信度结果不调用 LLM 而是请用户重复；连续第二次低置信度时照常回答"""
+    responded = []
+    reasked = []
+
+    async def respond(chat_context):
+        responded.append(chat_context.items[-1].text_content)
+
+    async def reask():
+        reasked.append(True)
+
+    session = ParticipantSession("user-1", None, stt=None, preprocessor=None, respond=respond,
+                                 reask=reask, min_confidence=0.5)
+    session.stt_stream = ScriptedSTTStream([
+        ("天汽", 0.3), ("天气", 0.2), ("上海天气", 0.9), ("明田", 0.1), ("明天", 0.95),
+    ])
+    await session._handle_stt()
+    await asyncio.sleep(0)
+
+    assert len(reasked) == 2 and session.reasks == 2
+    assert responded == ["天气", "上海天气", "明天"], responded
+    assert session.turns == 3
+    print(f"✅ 低置信度重问 通过 (5 句话，重问 {len(reasked)} 次，调用 LLM {len(responded)} 次)")
+
+
+async def main():
+    try:
+        await test_confidence_and_words()
+        await test_timeline_after_reconnect()
+    finally:
+        await http_clients.aclose()
+    await test_reask_flow()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+工具结果缓存测试 (规范化键 / TTL / 内存上限 / 单飞 / 执行者取消 / SQLite 持久化)
+
+用法: python test/test_tool_cache.py
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from integrations.tools.cache import ToolResultCache, cache_key
+from integrations.tools.manager import ToolManager
+from integrations.tools.registry import ToolRegistry
+
+
+def test_canonical_key():
+    assert cache_key("w", {"city": " 北京 ", "days": 1.0}) == cache_key("w", {"days": 1, "city": "北京"})
+    assert cache_key("w", {"city": "ＡＢＣ"}) == cache_key("w", {"city": "ABC"})
+    assert cache_key("w", {"city": "北京"}) != cache_key("x", {"city": "北京"})
+    print("✅ 参数规范化 通过")
+
+
+def test_ttl_and_lru():
+    cache = ToolResultCache(max_bytes=1000)
+    cache.set("a", "x" * 300, ttl=60)
+    cache.set("b", "x" * 300, ttl=60)
+    assert cache.get("a") is not None  # a 变为最近使用
+    cache.set("c", "x" * 300, ttl=60)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert cache.bytes <= 1000 and cache.evictions == 1
+
+    cache.set("short", "v", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    print("✅ TTL + 按字节 LRU 通过")
+
+
+async def test_single_flight_through_manager():
+    registry = ToolRegistry(use_entry_points=False)
+    calls = 0
+
+    @registry.tool(cacheable=True, cache_ttl=60)
+    async def lookup(city: str) -> str:
+        """查询"""
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return f"{city}: 晴"
+
+    @registry.tool(cacheable=True, cache_ttl=60)
+    async def broken(city: str) -> str:
+        """总是失败"""
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("upstream down")
+
+    manager = ToolManager(registry, cache=ToolResultCache())
+    results = await asyncio.gather(*(manager.execute_tool("lookup", {"city": "北京"}) for _ in range(10)))
+    assert results == ["北京: 晴"] * 10 and calls == 1, calls
+    assert await manager.execute_tool("lookup", {"city": " 北京"}) == "北京: 晴" and calls == 1
+    assert manager.cache.coalesced == 9 and manager.cache.hits == 1
+
+    # 失败结果不缓存
+    calls = 0
+    for _ in range(2):
+        assert (await manager.execute_tool("broken", {"city": "北京"})).startswith("工具执行出错")
+    assert calls == 2
+    print("✅ 单飞去重 + 失败不缓存 通过")
+
+
+async def test_leader_cancelled():
+    """执行者被取消 (例如打断) 时，等待同一结果的其它调用重新执行而不是一起被取消"""
+    cache = ToolResultCache()
+    calls = 0
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "晴"
+
+    leader = asyncio.create_task(cache.get_or_call("k", 60, slow))
+    await asyncio.sleep(0.01)
+    waiters = [asyncio.create_task(cache.get_or_call("k", 60, slow)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert results == ["晴"] * 3, results
+    assert leader.cancelled() and calls == 2, calls
+    assert cache.get("k") == "晴" and not cache._inflight
+    print(f"✅ 执行者取消后等待者重新执行 通过 ({results}，共执行 {calls} 次)")
+
+
+def test_persistence():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "cache.sqlite3")
+        cache = ToolResultCache(path=path)
+        cache.set("k", "v", ttl=60)
+        cache.set("gone", "v", ttl=0.01)
+        cache.close()
+        time.sleep(0.02)
+
+        restored = ToolResultCache(path=path)
+        assert restored.get("k") == "v"
+        assert restored.get("gone") is None and len(restored) == 1
+        restored.close()
+    print("✅ SQLite 持久化 通过")
+
+
+async def main():
+    print("🧪 测试工具结果缓存...")
+    test_canonical_key()
+    test_ttl_and_lru()
+    await test_single_flight_through_manager()
+    await test_leader_cancelled()
+    test_persistence()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
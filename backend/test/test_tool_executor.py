@@ -0,0 +1,102 @@
+"""
+工具执行器测试 (参数校验 / 截止时间 / 并发上限 / 进程池隔离 / 延迟直方图)
+
+用法: python test/test_tool_executor.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.exceptions import ToolArgumentError, ToolTimeoutError
+from integrations.tools.executor import ToolExecutor, validate_arguments
+from integrations.tools.manager import ToolManager
+from integrations.tools.registry import ToolRegistry
+
+registry = ToolRegistry(use_entry_points=False)
+
+
+@registry.tool(timeout=0.1)
+async def hang(city: str) -> str:
+    """永不返回"""
+    await asyncio.sleep(60)
+    return city
+
+
+@registry.tool(cpu_bound=True, timeout=10)
+def burn(n: int) -> str:
+    """CPU 密集计算 (在子进程中执行)"""
+    total = 0
+    for i in range(n):
+        total += i * i
+    return str(total)
+
+
+def test_validation():
+    schema = registry.get("burn").parameters
+    assert validate_arguments(schema, {"n": 3}) == []
+    assert validate_arguments(schema, {}) == ["缺少参数 n"]
+    assert validate_arguments(schema, {"n": "3"}) == ["n 应为 integer，实际为 str"]
+    assert validate_arguments(schema, {"n": True}) == ["n 应为 integer，实际为 bool"]
+    assert validate_arguments(schema, {"n": 1, "x": 2}) == ["未知参数 x"]
+    print("✅ 参数校验 通过")
+
+
+async def test_timeout_and_errors():
+    executor = ToolExecutor(default_timeout=1)
+    started = time.perf_counter()
+    try:
+        await executor.run(registry.get("hang"), {"city": "北京"})
+    except ToolTimeoutError:
+        pass
+    else:
+        raise AssertionError("timeout expected")
+    assert time.perf_counter() - started < 0.5
+
+    try:
+        await executor.run(registry.get("hang"), {"town": "北京"})
+    except ToolArgumentError as e:
+        assert "缺少参数 city" in str(e)
+
+    manager = ToolManager(registry, executor=executor)
+    assert "超时" in await manager.execute_tool("hang", {"city": "北京"})
+    assert executor.stats()["hang"]["outcomes"] == {"timeout": 2, "invalid": 1}
+    print("✅ 截止时间 + 参数错误 通过")
+
+
+async def test_cpu_bound_does_not_block_loop():
+    executor = ToolExecutor(process_workers=2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(executor.run(registry.get("burn"), {"n": 3_000_000}) for _ in range(2)))
+    elapsed = time.perf_counter() - started
+    task.cancel()
+    executor.close()
+
+    assert results[0] == str(sum(i * i for i in range(3_000_000)))
+    # 计算期间事件循环仍在正常调度
+    assert ticks >= elapsed / 0.01 * 0.5, (ticks, elapsed)
+    stats = executor.stats()["burn"]
+    assert stats["count"] == 2 and stats["outcomes"] == {"ok": 2}
+    print(f"✅ 进程池隔离 通过 ({elapsed:.2f}s, 期间事件循环调度 {ticks} 次, p50={stats['p50']}s)")
+
+
+async def main():
+    print("🧪 测试工具执行器...")
+    test_validation()
+    await test_timeout_and_errors()
+    await test_cpu_bound_does_not_block_loop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+工具注册表测试 (装饰器注册 / Schema 生成 / 延迟加载 / 并发限制)
+
+用法: python test/test_tool_registry.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+from typing import List, Literal, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from integrations.tools.manager import ToolManager
+from integrations.tools.registry import ToolRegistry
+
+
+def test_schema_from_type_hints():
+    registry = ToolRegistry(use_entry_points=False)
+
+    @registry.tool(expected_latency=0.2, cacheable=True, idempotent=False, max_concurrency=2)
+    async def search(query: str, limit: int = 5, mode: Literal["fast", "full"] = "fast",
+                     tags: Optional[List[str]] = None) -> str:
+        """搜索资料库
+
+        Args:
+            query: 搜索关键词
+            limit: 最多返回条数
+        """
+        return query
+
+    spec = registry.get("search")
+    assert spec.description == "搜索资料库"
+    assert spec.parameters == {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "搜索关键词"},
+            "limit": {"type": "integer", "description": "最多返回条数", "default": 5},
+            "mode": {"type": "string", "enum": ["fast", "full"], "default": "fast"},
+            "tags": {"type": "array", "items": {"type": "string"}, "default": None},
+        },
+        "required": ["query"],
+    }, spec.parameters
+    assert spec.cacheable and not spec.idempotent and spec.max_concurrency == 2
+    assert search.tool_spec is spec
+
+    # 未声明时不视为幂等 (不会被并行执行)
+    @registry.tool()
+    async def send_sms(phone: str) -> str:
+        """发送短信"""
+        return phone
+
+    assert not registry.get("send_sms").idempotent
+    print("✅ 类型注解 + docstring 生成 Schema 通过")
+
+
+def test_lazy_loading():
+    from integrations.tools import tool_registry
+
+    # 导入工具包本身不会导入工具模块
+    assert "integrations.tools.weather" not in sys.modules
+    spec = tool_registry.get("get_weather")
+    assert "integrations.tools.weather" in sys.modules
+
+    assert spec.parameters["required"] == ["city"]
+    assert spec.parameters["properties"]["city"]["description"] == "城市名称,例如:北京、上海、深圳"
+    assert spec.cacheable and spec.idempotent
+    print("✅ 工具模块延迟加载 通过")
+
+
+async def test_max_concurrency():
+    registry = ToolRegistry(use_entry_points=False)
+    running = peak = 0
+
+    @registry.tool(max_concurrency=2)
+    async def slow(n: int) -> str:
+        """慢工具"""
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return str(n)
+
+    manager = ToolManager(registry)
+    results = await asyncio.gather(*(manager.execute_tool("slow", {"n": i}) for i in range(6)))
+    assert results == [str(i) for i in range(6)]
+    assert peak == 2, peak
+    assert (await manager.execute_tool("missing", {})).startswith("错误")
+    print("✅ 并发上限 通过")
+
+
+async def main():
+    print("🧪 测试工具注册表...")
+    test_schema_from_type_hints()
+    test_lazy_loading()
+    await test_max_concurrency()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+同一 worker 进程内运行多个房间 (进程级资源只启动一次 / 一个房间结束不影响其它房间)
+
+用法: python test/test_worker.py
+"""
+import asyncio
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.config import settings
+from agent.assistant import AIAssistant
+from agent.runtime import agent_runtime
+from agent.worker import AgentWorker
+from integrations.tools.cache import ToolResultCache
+from integrations.tools.manager import tool_manager
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeRoom:
+    remote_participants = {}
+
+    def on(self, event: str):
+        return lambda handler: handler
+
+    async def disconnect(self):
+        pass
+
+
+class OfflineAssistant(AIAssistant):
+    """不连接 LiveKit / 不预热的 AIAssistant，其余初始化和清理与线上相同"""
+    instances = {}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ready = asyncio.Event()
+        OfflineAssistant.instances[self.room_name] = self
+
+    async def connect_to_room(self):
+        self.room = FakeRoom()
+        self.ready.set()
+
+    async def _prewarm(self):
+        pass
+
+
+async def test_two_rooms_one_process():
+    settings.METRICS_PORT = free_port()
+    settings.LOOP_MONITOR_ENABLED = True
+    settings.LOOP_MONITOR_PORT = 0
+    settings.CONVERSATION_STORE_ENABLED = False
+    settings.FILLER_ENABLED = False
+    settings.STT_REASK_CONFIDENCE = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tool_manager.cache = ToolResultCache(path=str(Path(tmp) / "tool_cache.sqlite3"))
+        pool = tool_manager.executor._pool()
+        await agent_runtime.start()
+
+        worker = AgentWorker("http://127.0.0.1:1/api/dispatch", "w1", capacity=2,
+                             assistant_factory=OfflineAssistant)
+        try:
+            worker._launch("room-a")
+            worker._launch("room-b")
+            room_a, room_b = OfflineAssistant.instances["room-a"], OfflineAssistant.instances["room-b"]
+            await asyncio.wait_for(asyncio.gather(room_a.ready.wait(), room_b.ready.wait()), 5)
+
+            # 指标端口只绑定一次，第二个房间也能启动；监控线程只有一个
+            assert worker.rooms == ["room-a", "room-b"]
+            assert sorted(agent_runtime.room_stats()) == ["room-a", "room-b"]
+            watchdogs = [t for t in threading.enumerate() if t.name == "loop-watchdog"]
+            assert len(watchdogs) == 1, watchdogs
+
+            # 一个房间结束: 共享的工具执行器和缓存持久化不受影响
+            room_a.stop()
+            while "room-a" in worker.rooms:
+                await asyncio.sleep(0.01)
+            assert worker.rooms == ["room-b"]
+            assert sorted(agent_runtime.room_stats()) == ["room-b"]
+            assert tool_manager.executor._process_pool is pool
+            assert tool_manager.cache._store is not None
+            assert agent_runtime.monitor is not None
+            print("✅ 同一进程两个房间 通过 (指标端口/监控只启动一次，房间结束不关闭共享工具执行器和缓存)")
+
+            room_b.stop()
+            while worker.rooms:
+                await asyncio.sleep(0.01)
+        finally:
+            for task in list(worker._rooms.values()):
+                task.cancel()
+            await agent_runtime.aclose()
+
+        assert tool_manager.cache._store is None and tool_manager.executor._process_pool is None
+        assert not [t for t in threading.enumerate() if t.name == "loop-watchdog"]
+        print("✅ 进程退出时统一关闭 通过")
+
+
+async def main():
+    await test_two_rooms_one_process()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())